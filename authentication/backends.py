@@ -0,0 +1,115 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.urls import Resolver404, resolve
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from restaurant_management import tenancy
+
+from . import revocation
+from .users import UserService
+
+
+class MongoUserBackend:
+    """Authenticate API logins (email and password) against the users in MongoDB"""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = UserService.get_user_by_email(email)
+        if user is None:
+            # Hash anyway, so a missing user takes as long as a wrong password
+            make_password(password)
+            return None
+        if user.check_password(password) and user.is_active:
+            return user
+        return None
+
+    def get_user(self, user_id):
+        return UserService.get_user(user_id)
+
+
+class AdminModelBackend(ModelBackend):
+    """Admin site logins (by username) against the local database; API logins by email never reach it"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            return None
+        return super().authenticate(request, username=username, password=password)
+
+
+class MongoJWTAuthentication(JWTAuthentication):
+    """JWT authentication that looks the token's user up in MongoDB instead of the ORM and rejects revoked tokens"""
+
+    def authenticate(self, request):
+        # TenantMiddleware may have authenticated this request already
+        authenticated = getattr(request._request, 'tenant_authentication', None)
+        if authenticated is not None:
+            return authenticated
+        return super().authenticate(request)
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation.is_revoked(validated_token):
+            raise InvalidToken(_("Token has been revoked"))
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = UserService.get_user_for_claim(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+def is_read(request):
+    """Safe methods, plus the batch-get routes, which read but take their IDs in a POST body"""
+    if request.method in SAFE_METHODS:
+        return True
+    if request.method != 'POST':
+        return False
+    try:
+        url_name = resolve(request.path_info).url_name
+    except Resolver404:
+        return False
+    return bool(url_name) and url_name.startswith('batch-get-')
+
+
+def can_access_restaurant(request, restaurant_id):
+    """
+    Whether a request may act for restaurant_id: members and superusers
+    always, anyone else only for reads of a public restaurant. Runs in
+    TenantMiddleware before DRF, so the result of authenticating is kept on
+    the request for MongoJWTAuthentication to reuse.
+    """
+    if restaurant_id in tenancy.tenancy_settings().get('public_restaurant_ids', ()) and is_read(request):
+        return True
+    authenticator = MongoJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return False
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        user = authenticator.get_user(validated_token)
+    except AuthenticationFailed:
+        # DRF authenticates again and answers 401, which tells the client to refresh
+        return True
+    request.tenant_authentication = (user, validated_token)
+    return user.can_access_restaurant(restaurant_id)
@@ -0,0 +1,76 @@
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from authentication.models import User
+from restaurant_management.database import UserModel
+
+
+def user_document(user):
+    """A SQLite user as a MongoDB user document; the password hash is copied as-is"""
+    object_id = ObjectId()
+    return {
+        '_id': object_id,
+        'user_id': user.user_id or f"user_{user.pk}",
+        'legacy_id': user.pk,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'phone': user.phone,
+        'avatar': user.avatar,
+        'password': user.password,
+        'token': user.token,
+        'refresh_token': user.refresh_token,
+        'is_active': user.is_active,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        # Restaurant memberships are granted with set_user_restaurants
+        'restaurant_ids': [],
+        'last_login': user.last_login,
+        'created_at': user.created_at,
+        'updated_at': user.updated_at,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Copy users from the local SQLite database into the MongoDB user collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Count the users that would be copied, write nothing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if not options['dry_run']:
+            # The unique email index makes reruns and concurrent signups safe
+            UserModel.ensure_indexes()
+
+        copied = existing = 0
+        batch = []
+
+        def flush():
+            nonlocal copied, existing
+            emails = [document['email'] for document in batch]
+            if options['dry_run']:
+                found = UserModel.count({'email': {'$in': emails}})
+                copied += len(batch) - found
+                existing += found
+            else:
+                # $setOnInsert: a user already in MongoDB (migrated before, or signed up since) is left alone
+                result = UserModel.bulk_write([
+                    UpdateOne({'email': document['email']}, {'$setOnInsert': document}, upsert=True)
+                    for document in batch
+                ])
+                copied += result.upserted_count
+                existing += len(batch) - result.upserted_count
+            batch.clear()
+
+        for user in User.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(user_document(user))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        verb = 'Would copy' if options['dry_run'] else 'Copied'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {copied} user(s), {existing} already in MongoDB"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.users import UserService
+from restaurant_management import tenancy
+
+
+class Command(BaseCommand):
+    help = 'Grant or remove a user\'s membership of restaurants, which decides the X-Restaurant-Id values they may use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--add', action='append', default=[], metavar='RESTAURANT_ID', help='Restaurant to grant (repeatable)')
+        parser.add_argument('--remove', action='append', default=[], metavar='RESTAURANT_ID', help='Restaurant to remove (repeatable)')
+
+    def handle(self, *args, **options):
+        for restaurant_id in options['add']:
+            if not tenancy.re_restaurant_id.match(restaurant_id):
+                raise CommandError(f"Invalid restaurant ID: {restaurant_id}")
+        user = UserService.get_user_by_email(options['email'])
+        if user is None:
+            raise CommandError(f"No user with email {options['email']}")
+
+        restaurant_ids = [restaurant_id for restaurant_id in user.restaurant_ids if restaurant_id not in options['remove']]
+        restaurant_ids += [restaurant_id for restaurant_id in options['add'] if restaurant_id not in restaurant_ids]
+        if restaurant_ids != user.restaurant_ids:
+            user.restaurant_ids = restaurant_ids
+            user.save()
+        self.stdout.write(self.style.SUCCESS(
+            f"{user.email} is a member of: {', '.join(restaurant_ids) or 'no restaurants'}"
+        ))
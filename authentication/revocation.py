@@ -0,0 +1,237 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+
+from restaurant_management import warmup
+from restaurant_management.database import RevokedTokenModel
+
+logger = logging.getLogger(__name__)
+
+# Each poll re-reads this far back from the newest revocation it has seen, so
+# a write that commits after a later one is still picked up
+SYNC_OVERLAP = timedelta(seconds=5)
+# Tokens that hit the filter but are not revoked; cleared when it fills up
+MAX_FALSE_POSITIVES = 10000
+
+
+def revocation_settings():
+    return getattr(settings, 'TOKEN_REVOCATION_SETTINGS', {})
+
+
+def is_enabled():
+    return revocation_settings().get('enabled', True)
+
+
+class BloomFilter:
+    """A fixed-size set of strings that can answer "definitely not present" with no false negatives"""
+
+    def __init__(self, capacity, false_positive_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    This worker's view of the revoked token IDs. The Bloom filter holds every
+    unexpired revocation, so a token that was never revoked is let through
+    without I/O; a filter hit is confirmed in MongoDB once and remembered. A
+    background thread adds other workers' revocations every poll interval and
+    rebuilds the filter periodically so expired entries drop out.
+    """
+
+    def __init__(self, conf):
+        self.conf = conf
+        self.bloom = None
+        self.last_revoked_at = None
+        self.built_at = self.synced_at = 0.0
+        self.pid = None
+        self._confirmed = {}
+        self._false_positives = set()
+        self._lock = threading.Lock()
+        self.checks = self.filter_hits = self.lookups = 0
+
+    def rebuild(self):
+        """Load every unexpired revocation into a new filter with room to spare"""
+        now = datetime.utcnow()
+        filter_dict = {'expires_at': {'$gt': now}}
+        count = RevokedTokenModel.count(filter_dict)
+        bloom = BloomFilter(
+            max(self.conf.get('capacity', 100000), 2 * count),
+            self.conf.get('false_positive_rate', 0.001),
+        )
+        last_revoked_at = None
+        for document in RevokedTokenModel.iter_many(filter_dict, projection={'_id': 0, 'jti': 1, 'revoked_at': 1}):
+            bloom.add(document['jti'])
+            if last_revoked_at is None or document['revoked_at'] > last_revoked_at:
+                last_revoked_at = document['revoked_at']
+
+        with self._lock:
+            self.bloom = bloom
+            if last_revoked_at is not None:
+                self.last_revoked_at = max(last_revoked_at, self.last_revoked_at or last_revoked_at)
+            self._confirmed = {jti: expires_at for jti, expires_at in self._confirmed.items() if expires_at > now}
+            self._false_positives = set()
+            self.built_at = time.monotonic()
+        # Revocations made while loading went into the old filter; read them again
+        self.sync()
+
+    def sync(self):
+        """Add the revocations made since the last sync, by any worker"""
+        filter_dict = None
+        if self.last_revoked_at is not None:
+            filter_dict = {'revoked_at': {'$gte': self.last_revoked_at - SYNC_OVERLAP}}
+        cursor = RevokedTokenModel.iter_many(
+            filter_dict, sort=[('revoked_at', 1)], projection={'_id': 0, 'jti': 1, 'revoked_at': 1},
+        )
+        for document in cursor:
+            self.add(document['jti'])
+            self.last_revoked_at = max(document['revoked_at'], self.last_revoked_at or document['revoked_at'])
+        self.synced_at = time.monotonic()
+
+    def add(self, jti, expires_at=None):
+        with self._lock:
+            if jti not in self.bloom:
+                self.bloom.add(jti)
+            self._false_positives.discard(jti)
+            if expires_at is not None:
+                self._confirmed[jti] = expires_at
+
+    def is_revoked(self, jti):
+        self.checks += 1
+        if jti not in self.bloom:
+            return False
+        self.filter_hits += 1
+        if jti in self._confirmed:
+            return True
+        if jti in self._false_positives:
+            return False
+
+        self.lookups += 1
+        try:
+            document = RevokedTokenModel.find_one({'jti': jti}, projection={'_id': 0, 'expires_at': 1})
+        except Exception:
+            # Fail closed: a token the filter may hold is not accepted unchecked
+            return True
+        if document is None:
+            if len(self._false_positives) >= MAX_FALSE_POSITIVES:
+                self._false_positives.clear()
+            self._false_positives.add(jti)
+            return False
+        self._confirmed[jti] = document['expires_at']
+        return True
+
+    def start(self):
+        """Start polling for revocations in this process"""
+        self.pid = os.getpid()
+        threading.Thread(target=self._poll, name='token-revocation', daemon=True).start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.conf.get('poll_interval_seconds', 1.0))
+            try:
+                stale = time.monotonic() - self.built_at > self.conf.get('rebuild_seconds', 3600)
+                if stale or self.bloom.count > self.bloom.capacity:
+                    self.rebuild()
+                else:
+                    self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync revoked tokens: {e}")
+
+    def stats(self):
+        return {
+            'entries': self.bloom.count,
+            'capacity': self.bloom.capacity,
+            'filter_bytes': len(self.bloom.bits),
+            'checks': self.checks,
+            'filter_hits': self.filter_hits,
+            'lookups': self.lookups,
+            'synced_seconds_ago': round(time.monotonic() - self.synced_at, 3),
+        }
+
+
+_revocations = None
+_revocations_lock = threading.Lock()
+
+
+def get_revocation_list():
+    """This worker's revocation list, loaded on first use; None when TOKEN_REVOCATION_SETTINGS disables it"""
+    global _revocations
+    if not is_enabled():
+        return None
+    revocations = _revocations
+    # A list loaded before the server forked has no poller in this process
+    if revocations is None or revocations.pid != os.getpid():
+        with _revocations_lock:
+            if _revocations is None or _revocations.pid != os.getpid():
+                revocations = RevocationList(revocation_settings())
+                revocations.rebuild()
+                revocations.start()
+                _revocations = revocations
+            revocations = _revocations
+    return revocations
+
+
+def revoke(token):
+    """
+    Revoke a validated access or refresh token until it expires. Returns
+    False if it was already revoked: the upsert is atomic, so of two
+    concurrent calls for one token exactly one gets True.
+    """
+    revocations = get_revocation_list()
+    if revocations is None:
+        return True
+    jti = token[api_settings.JTI_CLAIM]
+    expires_at = datetime.utcfromtimestamp(token['exp'])
+    # revoked_at comes from the server clock, so every worker polls against the same timeline
+    existing = RevokedTokenModel.find_one_and_update(
+        {'jti': jti},
+        {
+            '$currentDate': {'revoked_at': True},
+            '$setOnInsert': {
+                'jti': jti,
+                'token_type': token.get(api_settings.TOKEN_TYPE_CLAIM),
+                'user_id': token.get(api_settings.USER_ID_CLAIM),
+                'expires_at': expires_at,
+            },
+        },
+        upsert=True, return_new=False,
+    )
+    revocations.add(jti, expires_at)
+    return existing is None
+
+
+def is_revoked(token):
+    revocations = get_revocation_list()
+    jti = token.get(api_settings.JTI_CLAIM)
+    return revocations is not None and jti is not None and revocations.is_revoked(jti)
+
+
+@warmup.register
+def load_revocation_list():
+    get_revocation_list()
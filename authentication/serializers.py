@@ -1,11 +1,21 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from .models import User
+from django.utils.translation import gettext_lazy as _
+from . import revocation
+from .users import UserService
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(serializers.Serializer):
+    first_name = serializers.CharField(min_length=2, max_length=100)
+    last_name = serializers.CharField(min_length=2, max_length=100)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=20, required=False, allow_null=True, allow_blank=True)
+    avatar = serializers.URLField(required=False, allow_null=True, allow_blank=True)
     password = serializers.CharField(
         write_only=True,
         min_length=6,
@@ -19,16 +29,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         style={'input_type': 'password'}
     )
 
-    class Meta:
-        model = User
-        fields = ('first_name', 'last_name', 'email', 'phone', 'avatar', 'password', 'password_confirm')
-        extra_kwargs = {
-            'first_name': {'required': True, 'min_length': 2, 'max_length': 100},
-            'last_name': {'required': True, 'min_length': 2, 'max_length': 100},
-            'email': {'required': True},
-            'phone': {'required': False},
-            'avatar': {'required': False}
-        }
+    def validate_email(self, value):
+        if UserService.get_user_by_email(value):
+            raise serializers.ValidationError("A user with this email already exists.")
+        return value
 
     def validate(self, attrs):
         password = attrs.get('password')
@@ -50,7 +54,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         validated_data.pop('password_confirm', None)
         
         # Create user
-        user = User.objects.create_user(**validated_data)
+        try:
+            user = UserService.create_user(**validated_data)
+        except ValueError as e:
+            raise serializers.ValidationError({"email": str(e)})
         return user
 
 
@@ -95,27 +102,25 @@ class UserLoginSerializer(serializers.Serializer):
             )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(serializers.Serializer):
+    user_id = serializers.CharField(read_only=True)
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
     full_name = serializers.ReadOnlyField(source='get_full_name')
-    
-    class Meta:
-        model = User
-        fields = (
-            'user_id', 'first_name', 'last_name', 'full_name', 
-            'email', 'phone', 'avatar', 'is_active',
-            'created_at', 'updated_at'
-        )
-        read_only_fields = ('user_id', 'created_at', 'updated_at')
-
-
-class UserUpdateSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = User
-        fields = ('first_name', 'last_name', 'phone', 'avatar')
-        extra_kwargs = {
-            'first_name': {'required': False, 'min_length': 2, 'max_length': 100},
-            'last_name': {'required': False, 'min_length': 2, 'max_length': 100},
-        }
+    email = serializers.EmailField()
+    phone = serializers.CharField(allow_null=True)
+    avatar = serializers.URLField(allow_null=True)
+    is_active = serializers.BooleanField()
+    restaurant_ids = serializers.ListField(child=serializers.CharField(), read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+
+class UserUpdateSerializer(serializers.Serializer):
+    first_name = serializers.CharField(required=False, min_length=2, max_length=100)
+    last_name = serializers.CharField(required=False, min_length=2, max_length=100)
+    phone = serializers.CharField(max_length=20, required=False, allow_null=True, allow_blank=True)
+    avatar = serializers.URLField(required=False, allow_null=True, allow_blank=True)
 
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
@@ -170,4 +175,40 @@ class PasswordChangeSerializer(serializers.Serializer):
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+
+class MongoTokenRefreshSerializer(TokenRefreshSerializer):
+    """TokenRefreshSerializer with the token's user checked in MongoDB and revocation in place of the blacklist app"""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if revocation.is_revoked(refresh):
+            raise TokenError(_("Token has been revoked"))
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        if user_id:
+            user = UserService.get_user_for_claim(user_id)
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(
+                    self.error_messages["no_active_account"],
+                    "no_active_account",
+                )
+
+        # Revoking the rotated-out token is the gate: of two refreshes racing
+        # with the same token, only the one that revokes it gets new tokens
+        rotate = api_settings.ROTATE_REFRESH_TOKENS
+        if rotate and api_settings.BLACKLIST_AFTER_ROTATION and not revocation.revoke(refresh):
+            raise TokenError(_("Token has been revoked"))
+
+        data = {"access": str(refresh.access_token)}
+
+        if rotate:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data["refresh"] = str(refresh)
+
+        return data
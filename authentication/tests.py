@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from restaurant_management.testing import MongoTestCase
+
+from . import revocation
+from .serializers import MongoTokenRefreshSerializer
+from .users import UserService
+
+
+class RestaurantAccessTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = UserService.create_user('member@example.com', 'secret-pass', restaurant_ids=['north'])
+        self.admin = UserService.create_user('admin@example.com', 'secret-pass', is_superuser=True)
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+    def test_members_and_superusers(self):
+        self.assertTrue(self.member.can_access_restaurant('north'))
+        self.assertFalse(self.member.can_access_restaurant('south'))
+        self.assertTrue(self.admin.can_access_restaurant('south'))
+        self.member.is_active = False
+        self.assertFalse(self.member.can_access_restaurant('north'))
+
+    @override_settings(TENANCY_SETTINGS={**settings.TENANCY_SETTINGS, 'enabled': True, 'public_restaurant_ids': ['south']})
+    def test_middleware_only_lets_members_in(self):
+        self.authenticate(self.member)
+        self.assertEqual(self.client.get('/api/menus/', HTTP_X_RESTAURANT_ID='north').status_code, 200)
+        response = self.client.get('/api/menus/', HTTP_X_RESTAURANT_ID='west')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['message'], 'Access to this restaurant is not allowed')
+        self.assertEqual(self.client.get('/api/menus/').status_code, 400)
+
+        self.authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/menus/', HTTP_X_RESTAURANT_ID='west').status_code, 200)
+
+    @override_settings(TENANCY_SETTINGS={**settings.TENANCY_SETTINGS, 'enabled': True, 'public_restaurant_ids': ['south']})
+    def test_anyone_may_read_a_public_restaurant(self):
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get('/api/menus/', HTTP_X_RESTAURANT_ID='south').status_code, 200)
+        response = anonymous.post('/api/menus/batch-get/', {'ids': ['a']}, format='json', HTTP_X_RESTAURANT_ID='south')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(anonymous.get('/api/menus/', HTTP_X_RESTAURANT_ID='north').status_code, 403)
+        # Writes to a public restaurant still need a member
+        menu = {'name': 'Lunch', 'category': 'Main Course', 'start_date': '2026-01-01', 'end_date': '2026-12-31'}
+        self.assertEqual(anonymous.post('/api/menus/', menu, format='json', HTTP_X_RESTAURANT_ID='south').status_code, 403)
+
+
+class TokenRevocationTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = UserService.create_user('cook@example.com', 'secret-pass')
+        self.client = APIClient()
+
+    def refresh(self, token):
+        serializer = MongoTokenRefreshSerializer(data={'refresh': token})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def test_revoke_reports_whether_it_was_first(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertFalse(revocation.is_revoked(token))
+        self.assertTrue(revocation.revoke(token))
+        self.assertFalse(revocation.revoke(token))
+        self.assertTrue(revocation.is_revoked(token))
+
+    def test_refresh_token_can_be_rotated_once(self):
+        token = str(RefreshToken.for_user(self.user))
+        rotated = self.refresh(token)
+        self.assertNotEqual(rotated['refresh'], token)
+        with self.assertRaises(TokenError):
+            self.refresh(token)
+        # The replacement still works
+        self.assertIn('access', self.refresh(rotated['refresh']))
+
+    def test_logout_revokes_both_tokens(self):
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'cook@example.com', 'password': 'secret-pass'}, format='json'
+        )
+        tokens = response.json()['tokens']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        response = self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        self.client.credentials()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
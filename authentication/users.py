@@ -0,0 +1,267 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from pymongo.errors import DuplicateKeyError
+
+from restaurant_management import read_cache, warmup
+from restaurant_management.database import UserModel
+
+logger = logging.getLogger(__name__)
+
+# Fields a user document may carry, and the ones save() writes back
+USER_FIELDS = (
+    'user_id', 'email', 'first_name', 'last_name', 'phone', 'avatar', 'password',
+    'token', 'refresh_token', 'is_active', 'is_staff', 'is_superuser',
+    'restaurant_ids', 'last_login', 'created_at', 'updated_at',
+)
+MUTABLE_FIELDS = (
+    'first_name', 'last_name', 'phone', 'avatar', 'password',
+    'token', 'refresh_token', 'is_active', 'is_staff', 'is_superuser', 'restaurant_ids', 'last_login',
+)
+
+# Each poll re-reads this far back, so a save from a worker whose clock is behind is still seen
+SYNC_OVERLAP = timedelta(seconds=5)
+# Legacy SQLite IDs remembered per worker; cleared when it fills up
+MAX_LEGACY_IDS = 10000
+
+
+class MongoUser:
+    """A user document with the attributes and methods Django and DRF expect of request.user"""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, document):
+        for field in USER_FIELDS:
+            setattr(self, field, document.get(field))
+        self.is_active = document.get('is_active', True)
+        self.is_staff = bool(document.get('is_staff'))
+        self.is_superuser = bool(document.get('is_superuser'))
+        self.restaurant_ids = list(document.get('restaurant_ids') or [])
+
+    @property
+    def pk(self):
+        return self.user_id
+
+    @property
+    def id(self):
+        return self.user_id
+
+    @property
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    @property
+    def get_short_name(self):
+        return self.first_name
+
+    def get_username(self):
+        return self.email
+
+    def set_password(self, raw_password):
+        self.password = make_password(raw_password)
+
+    def check_password(self, raw_password):
+        """Check a password, re-hashing it when the hasher settings have changed"""
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self.save()
+        return check_password(raw_password, self.password, setter)
+
+    def can_access_restaurant(self, restaurant_id):
+        """Members may act for a restaurant; superusers for every restaurant"""
+        return self.is_active and (self.is_superuser or restaurant_id in self.restaurant_ids)
+
+    def has_perm(self, perm, obj=None):
+        return self.is_active and self.is_superuser
+
+    def save(self):
+        UserService.save_user(self)
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name} ({self.email})"
+
+
+class UserService:
+    @staticmethod
+    def normalize_email(email):
+        return BaseUserManager.normalize_email(email)
+
+    @staticmethod
+    def create_user(email, password=None, **extra_fields):
+        """Create a user; raises ValueError for a missing, invalid or taken email"""
+        if not email:
+            raise ValueError('Email is required')
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValueError('Please enter a valid email address')
+
+        object_id = ObjectId()
+        now = datetime.utcnow()
+        user_data = {
+            '_id': object_id,
+            'user_id': f"user_{object_id}",
+            'email': UserService.normalize_email(email),
+            'first_name': extra_fields.get('first_name', ''),
+            'last_name': extra_fields.get('last_name', ''),
+            'phone': extra_fields.get('phone'),
+            'avatar': extra_fields.get('avatar'),
+            'password': make_password(password),
+            'is_active': extra_fields.get('is_active', True),
+            'is_staff': extra_fields.get('is_staff', False),
+            'is_superuser': extra_fields.get('is_superuser', False),
+            'restaurant_ids': list(extra_fields.get('restaurant_ids', [])),
+            'last_login': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        try:
+            UserModel.create(user_data)
+        except DuplicateKeyError:
+            raise ValueError('A user with this email already exists')
+        return MongoUser(user_data)
+
+    @staticmethod
+    def get_user(user_id):
+        """User by user_id through the per-worker read cache, None if not found"""
+        cache = read_cache.get_read_cache()
+        if cache is not None:
+            # Cached users are only as fresh as the last poll for changes
+            watch_user_changes()
+        document = UserModel.find_by_ids([user_id], cache=cache)[0]
+        return MongoUser(document) if document else None
+
+    @staticmethod
+    def get_user_by_email(email):
+        """User by email, always read from MongoDB so logins see the current password"""
+        document = UserModel.find_one({'email': UserService.normalize_email(email)})
+        return MongoUser(document) if document else None
+
+    @staticmethod
+    def get_user_for_claim(user_id):
+        """
+        User a token's user_id claim refers to. Tokens issued before users
+        moved to MongoDB carry the SQLite primary key, kept as legacy_id.
+        """
+        # A user_id is "user_" and a hex ID, never all digits; a number is a SQLite key
+        if str(user_id).isdigit():
+            user_id = _legacy_user_id(int(user_id))
+            if user_id is None:
+                return None
+        return UserService.get_user(user_id)
+
+    @staticmethod
+    def get_users(skip=0, limit=None):
+        """Get all users with pagination, oldest first"""
+        return [MongoUser(document) for document in UserModel.find_many(skip=skip, limit=limit, sort=[('created_at', 1)])]
+
+    @staticmethod
+    def count_users():
+        """Count total users"""
+        return UserModel.count()
+
+    @staticmethod
+    def save_user(user):
+        """Write a user's mutable fields back"""
+        user.updated_at = datetime.utcnow()
+        update_data = {field: getattr(user, field) for field in MUTABLE_FIELDS}
+        update_data['updated_at'] = user.updated_at
+        UserModel.update_one({'user_id': user.user_id}, update_data)
+        read_cache.invalidate(UserModel, [user.user_id])
+
+
+_legacy_user_ids = {}
+_legacy_lock = threading.Lock()
+
+
+def _legacy_user_id(legacy_id):
+    """
+    user_id of the user migrated with this SQLite primary key, None if there
+    is none. The mapping never changes, so it is remembered; a miss is
+    remembered for the read cache TTL, in case the migration runs later.
+    """
+    now = time.monotonic()
+    entry = _legacy_user_ids.get(legacy_id)
+    ttl = read_cache.read_cache_settings().get('ttl_seconds', 30)
+    if entry is not None and (entry[0] is not None or now - entry[1] < ttl):
+        return entry[0]
+    document = UserModel.find_one({'legacy_id': legacy_id}, projection={'_id': 0, 'user_id': 1})
+    user_id = document['user_id'] if document else None
+    with _legacy_lock:
+        if len(_legacy_user_ids) >= MAX_LEGACY_IDS:
+            _legacy_user_ids.clear()
+        _legacy_user_ids[legacy_id] = (user_id, now)
+    return user_id
+
+
+class UserChangeWatcher:
+    """
+    Drops users saved through any worker from this worker's read cache, so
+    a deactivated user or a changed membership stops applying within one
+    poll interval instead of the cache TTL.
+    """
+
+    def __init__(self, interval, since=None):
+        self.interval = interval
+        self.since = since or datetime.utcnow()
+        self.pid = None
+
+    def sync(self):
+        started = datetime.utcnow()
+        user_ids = [
+            document['user_id'] for document in UserModel.iter_many(
+                {'updated_at': {'$gte': self.since - SYNC_OVERLAP}}, projection={'_id': 0, 'user_id': 1}
+            )
+        ]
+        if user_ids:
+            read_cache.invalidate(UserModel, user_ids)
+        self.since = started
+
+    def start(self):
+        """Start polling for user changes in this process"""
+        self.pid = os.getpid()
+        threading.Thread(target=self._poll, name='user-changes', daemon=True).start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync user changes: {e}")
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def watch_user_changes():
+    """Start this worker's user change poller, once per process"""
+    global _watcher
+    # A poller started before the server forked does not run in this process
+    if _watcher is None or _watcher.pid != os.getpid():
+        with _watcher_lock:
+            if _watcher is None or _watcher.pid != os.getpid():
+                # Continue from the parent's last poll; its cached users came along with the fork
+                watcher = UserChangeWatcher(
+                    read_cache.read_cache_settings().get('user_sync_seconds', 1.0),
+                    since=_watcher.since if _watcher is not None else None,
+                )
+                watcher.start()
+                _watcher = watcher
+    return _watcher
+
+
+@warmup.register
+def start_user_change_watcher():
+    if read_cache.get_read_cache() is not None:
+        watch_user_changes()
@@ -2,23 +2,22 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from django.contrib.auth import authenticate
-from django.shortcuts import get_object_or_404
-
-from .models import User
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
     UserSerializer,
     UserUpdateSerializer,
-    PasswordChangeSerializer
+    PasswordChangeSerializer,
+    MongoTokenRefreshSerializer
 )
+from . import revocation
+from .users import UserService
 
 
 class UserRegistrationView(generics.CreateAPIView):
-    queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -80,6 +79,14 @@ class UserLogoutView(APIView):
     def post(self, request):
         try:
             user = request.user
+            # Revoke the access token this request used, and the refresh token when one is sent
+            revocation.revoke(request.auth)
+            refresh_token = request.data.get('refresh')
+            if refresh_token:
+                try:
+                    revocation.revoke(RefreshToken(refresh_token))
+                except TokenError:
+                    pass
             user.token = None
             user.refresh_token = None
             user.save()
@@ -96,6 +103,8 @@ class UserLogoutView(APIView):
 
 
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = MongoTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         
@@ -104,7 +113,7 @@ class CustomTokenRefreshView(TokenRefreshView):
             refresh_token = request.data.get('refresh')
             try:
                 refresh = RefreshToken(refresh_token)
-                user = User.objects.get(id=refresh['user_id'])
+                user = UserService.get_user_for_claim(refresh['user_id'])
                 user.token = response.data['access']
                 user.save()
             except:
@@ -120,13 +129,8 @@ def get_all_users(request):
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('recordPerPage', 10))
         
-        users = User.objects.all()
-        total_count = users.count()
-        
-        # Pagination
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_users = users[start_index:end_index]
+        total_count = UserService.count_users()
+        paginated_users = UserService.get_users(skip=(page - 1) * per_page, limit=per_page)
         
         users_data = UserSerializer(paginated_users, many=True).data
         
@@ -150,7 +154,13 @@ def get_all_users(request):
 @permission_classes([permissions.AllowAny])
 def get_user(request, user_id):
     try:
-        user = get_object_or_404(User, user_id=user_id)
+        user = UserService.get_user(user_id)
+        if not user:
+            return Response({
+                'success': False,
+                'message': 'User not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         user_data = UserSerializer(user).data
         
         return Response({
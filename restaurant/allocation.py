@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from restaurant_management import tenancy, warmup
+from restaurant_management.database import ReservationModel, TableModel
+
+BOOKED = 'BOOKED'
+SEATED = 'SEATED'
+CANCELLED = 'CANCELLED'
+COMPLETED = 'COMPLETED'
+ACTIVE_STATUSES = (BOOKED, SEATED)
+
+
+def allocation_settings():
+    return getattr(settings, 'ALLOCATION_SETTINGS', {})
+
+
+class TableSchedule:
+    """
+    Reservations held by one table, as (start, end, reservation_id) sorted by
+    start. A table never holds overlapping reservations, so the list is also
+    sorted by end and a conflict check is a single bisect.
+    """
+
+    def __init__(self):
+        self.intervals = []
+
+    def conflicts(self, start, end):
+        """True when [start, end) overlaps a reservation on this table"""
+        i = bisect.bisect_left(self.intervals, (end,))
+        return i > 0 and self.intervals[i - 1][1] > start
+
+    def add(self, start, end, reservation_id):
+        bisect.insort(self.intervals, (start, end, reservation_id))
+
+    def remove(self, start, end, reservation_id):
+        i = bisect.bisect_left(self.intervals, (start, end, reservation_id))
+        if i < len(self.intervals) and self.intervals[i][2] == reservation_id:
+            del self.intervals[i]
+
+
+class TableAllocator:
+    """
+    Seating engine for one restaurant. Tables are kept sorted by capacity so
+    the smallest table that fits a party is found with a bisect, and each
+    table's reservations are kept in a TableSchedule. Joined tables are runs
+    of consecutively numbered tables in the same zone. MongoDB stays the
+    source of truth: the allocator only suggests, and bookings are
+    re-checked inside a transaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = {}
+        self.by_capacity = []
+        self.by_zone = {}
+        self.schedules = {}
+        self.reservations = {}
+        self._synced_at = None
+        self._refreshed = 0.0
+        # Tables reload on their own, slower clock than the reservation sync
+        self._tables_loaded_at = 0.0
+
+    def load_tables(self, tables):
+        with self._lock:
+            self._tables_loaded_at = time.monotonic()
+            self.tables = {table['table_id']: table for table in tables}
+            self.by_capacity = sorted(
+                (int(table.get('number_of_guests') or 0), table.get('table_number') or 0, table_id)
+                for table_id, table in self.tables.items()
+            )
+            self.by_zone = {}
+            for table_id, table in self.tables.items():
+                self.by_zone.setdefault(table.get('zone'), []).append(
+                    (table.get('table_number') or 0, int(table.get('number_of_guests') or 0), table_id)
+                )
+            for zone_tables in self.by_zone.values():
+                zone_tables.sort()
+            for table_id in self.tables:
+                self.schedules.setdefault(table_id, TableSchedule())
+
+    def _forget(self, reservation_id):
+        previous = self.reservations.pop(reservation_id, None)
+        if previous is not None:
+            for table_id in previous['table_ids']:
+                schedule = self.schedules.get(table_id)
+                if schedule is not None:
+                    schedule.remove(previous['start_time'], previous['end_time'], reservation_id)
+
+    def _apply(self, reservation):
+        reservation_id = reservation['reservation_id']
+        self._forget(reservation_id)
+        if reservation.get('status') not in ACTIVE_STATUSES:
+            return
+        self.reservations[reservation_id] = {
+            'table_ids': list(reservation['table_ids']),
+            'start_time': reservation['start_time'],
+            'end_time': reservation['end_time'],
+        }
+        for table_id in reservation['table_ids']:
+            self.schedules.setdefault(table_id, TableSchedule()).add(
+                reservation['start_time'], reservation['end_time'], reservation_id
+            )
+
+    def apply(self, reservations):
+        with self._lock:
+            for reservation in reservations:
+                self._apply(reservation)
+
+    def refresh(self, force=False):
+        """Load tables and upcoming reservations on first use, then apply reservations changed since the last sync"""
+        conf = allocation_settings()
+        if not force and time.monotonic() - self._refreshed < conf.get('refresh_seconds', 5.0):
+            return
+        now = datetime.utcnow()
+        if self._synced_at is None or time.monotonic() - self._tables_loaded_at > conf.get('table_refresh_seconds', 300):
+            self.load_tables(TableModel.find_many())
+        if self._synced_at is None:
+            reservations = ReservationModel.find_many({'status': {'$in': list(ACTIVE_STATUSES)}, 'end_time': {'$gt': now}})
+        else:
+            # Overlap the window slightly to tolerate clock skew between workers
+            reservations = ReservationModel.find_many({'updated_at': {'$gte': self._synced_at - timedelta(seconds=5)}})
+        with self._lock:
+            for reservation in reservations:
+                self._apply(reservation)
+            for reservation_id in [rid for rid, r in self.reservations.items() if r['end_time'] <= now]:
+                self._forget(reservation_id)
+            self._synced_at = now
+            self._refreshed = time.monotonic()
+
+    def is_free(self, table_id, start, end):
+        schedule = self.schedules.get(table_id)
+        return schedule is None or not schedule.conflicts(start, end)
+
+    def _single_tables(self, party_size, start, end, limit):
+        """Smallest free tables that seat the party on their own"""
+        found = []
+        for capacity, table_number, table_id in self.by_capacity[bisect.bisect_left(self.by_capacity, (party_size,)):]:
+            if self.is_free(table_id, start, end):
+                found.append((capacity - party_size, [table_id]))
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _joined_tables(self, party_size, start, end, max_join):
+        """Shortest runs of adjacent free tables in each zone that seat the party together"""
+        found = []
+        for zone_tables in self.by_zone.values():
+            for i in range(len(zone_tables)):
+                seats = 0
+                table_ids = []
+                previous_number = None
+                for table_number, capacity, table_id in zone_tables[i:i + max_join]:
+                    if previous_number is not None and table_number != previous_number + 1:
+                        break
+                    if not self.is_free(table_id, start, end):
+                        break
+                    previous_number = table_number
+                    seats += capacity
+                    table_ids.append(table_id)
+                    if seats >= party_size:
+                        if len(table_ids) > 1:
+                            found.append((seats - party_size, table_ids))
+                        break
+        return found
+
+    def suggest(self, party_size, start, end, limit=3):
+        """
+        Best seating options for a party over [start, end), best first. Each
+        option is ranked by empty seats, with every extra joined table
+        counted as `join_penalty_seats` empty seats.
+        """
+        self.refresh()
+        return self.options(party_size, start, end, limit=limit)
+
+    def options(self, party_size, start, end, limit=3):
+        """suggest() against the state already in memory"""
+        conf = allocation_settings()
+        max_join = conf.get('max_join', 3)
+        join_penalty = conf.get('join_penalty_seats', 2)
+        with self._lock:
+            options = self._single_tables(party_size, start, end, limit)
+            # A joined option never ranks better than join_penalty, so skip the scan when singles already beat it
+            if max_join > 1 and not (len(options) >= limit and options[-1][0] <= join_penalty):
+                options += self._joined_tables(party_size, start, end, max_join)
+            options.sort(key=lambda option: (option[0] + join_penalty * (len(option[1]) - 1), len(option[1])))
+            return [{
+                'table_ids': table_ids,
+                'table_numbers': [self.tables[table_id].get('table_number') for table_id in table_ids],
+                'seats': party_size + empty_seats,
+                'empty_seats': empty_seats,
+            } for empty_seats, table_ids in options[:limit]]
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_allocator():
+    """Table allocator for the current restaurant, loaded from MongoDB on first use"""
+    restaurant_id = tenancy.get_restaurant_id()
+    allocator = _allocators.get(restaurant_id)
+    if allocator is None:
+        with _allocators_lock:
+            allocator = _allocators.get(restaurant_id)
+            if allocator is None:
+                allocator = TableAllocator()
+                allocator.refresh(force=True)
+                _allocators[restaurant_id] = allocator
+    return allocator
+
+
+def reservations_changed(reservations):
+    """Apply reservation writes to this worker's allocator right away"""
+    allocator = _allocators.get(tenancy.get_restaurant_id())
+    if allocator is not None:
+        allocator.apply(reservations)
+
+
+def tables_changed():
+    """Reload this worker's tables after a table write"""
+    allocator = _allocators.get(tenancy.get_restaurant_id())
+    if allocator is not None:
+        allocator.load_tables(TableModel.find_many())
+
+
+@warmup.register_per_restaurant
+def load_table_allocator():
+    get_allocator()
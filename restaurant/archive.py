@@ -0,0 +1,103 @@
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReplaceOne
+
+from restaurant_management.database import (
+    mongodb, OrderModel, OrderItemModel, InvoiceModel,
+    OrderArchiveModel, OrderItemArchiveModel, InvoiceArchiveModel
+)
+
+logger = logging.getLogger(__name__)
+
+
+def archive_settings():
+    return getattr(settings, 'ARCHIVE_SETTINGS', {})
+
+
+def _copy(documents, archive_model, archived_at, session=None):
+    """Upsert by _id so a re-run after a crash never duplicates documents"""
+    if not documents:
+        return []
+    requests = []
+    for document in documents:
+        document['archived_at'] = archived_at
+        requests.append(ReplaceOne({'_id': document['_id']}, document, upsert=True))
+    archive_model.bulk_write(requests, session=session)
+    return [document['_id'] for document in documents]
+
+
+def _archivable_order_ids(order_ids, session=None):
+    """Orders with at least one invoice, all of them paid"""
+    statuses = {}
+    invoices = InvoiceModel.find_many(
+        {'order_id': {'$in': order_ids}}, projection={'order_id': 1, 'payment_status': 1}, session=session
+    )
+    for invoice in invoices:
+        statuses.setdefault(invoice['order_id'], set()).add(invoice.get('payment_status'))
+    return [order_id for order_id in order_ids if statuses.get(order_id) == {'PAID'}]
+
+
+def archive_batch(orders, archived_at, dry_run=False):
+    """
+    Move one batch of paid orders, with their items and invoices, to the
+    archive collections. Everything is read again, copied and deleted in one
+    transaction, and only the documents copied are deleted, so an item added
+    or an invoice un-paid after the batch was listed is never lost.
+    """
+    order_ids = [order['order_id'] for order in orders]
+    if dry_run:
+        return len(_archivable_order_ids(order_ids))
+
+    def move(session):
+        archivable = _archivable_order_ids(order_ids, session=session)
+        if not archivable:
+            return 0
+        id_filter = {'order_id': {'$in': archivable}}
+        order_object_ids = _copy(OrderModel.find_many(id_filter, session=session), OrderArchiveModel, archived_at, session)
+        item_object_ids = _copy(OrderItemModel.find_many(id_filter, session=session), OrderItemArchiveModel, archived_at, session)
+        invoice_object_ids = _copy(
+            InvoiceModel.find_many({**id_filter, 'payment_status': 'PAID'}, session=session),
+            InvoiceArchiveModel, archived_at, session,
+        )
+
+        InvoiceModel.delete_many({'_id': {'$in': invoice_object_ids}, 'payment_status': 'PAID'}, session=session)
+        OrderItemModel.delete_many({'_id': {'$in': item_object_ids}}, session=session)
+        OrderModel.delete_many({'_id': {'$in': order_object_ids}}, session=session)
+        return len(order_object_ids)
+
+    return mongodb.run_transaction(move)
+
+
+def archive_orders(older_than_days=None, batch_size=None, dry_run=False):
+    """
+    Move paid orders older than the cutoff into the archive collections in
+    batches. Returns the number of orders archived (or that would be).
+    """
+    conf = archive_settings()
+    if older_than_days is None:
+        older_than_days = conf.get('older_than_days', 90)
+    if batch_size is None:
+        batch_size = conf.get('batch_size', 500)
+
+    archived_at = datetime.utcnow()
+    cutoff = archived_at - timedelta(days=older_than_days)
+    total = 0
+    last_seen = None
+    while True:
+        # Page by (order_date, _id) so batches never re-read archived or skipped orders
+        filter_dict = {'order_date': {'$lt': cutoff}}
+        if last_seen is not None:
+            filter_dict['$or'] = [
+                {'order_date': {'$gt': last_seen['order_date']}},
+                {'order_date': last_seen['order_date'], '_id': {'$gt': last_seen['_id']}},
+            ]
+        orders = OrderModel.find_many(filter_dict, limit=batch_size, sort=[('order_date', 1), ('_id', 1)])
+        if not orders:
+            break
+        last_seen = orders[-1]
+        archived = archive_batch(orders, archived_at, dry_run=dry_run)
+        total += archived
+        logger.info(f"Archived {archived} of {len(orders)} orders up to {last_seen['order_date']}")
+    return total
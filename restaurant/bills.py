@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from restaurant_management import tenancy
+from restaurant_management.database import OrderModel, OrderItemModel, InvoiceModel, TableModel
+
+from .reports import split_tax
+
+
+def bill_settings():
+    return getattr(settings, 'BILL_SETTINGS', {})
+
+
+class BillCache:
+    """
+    Composed bills in process memory, least recently used dropped first.
+    An entry is keyed by table and day and remembers the order_id and
+    version it was built from. Every item and invoice write bumps the
+    order's version, so a stale entry is detected by any worker.
+    """
+
+    def __init__(self, max_entries, max_age_seconds):
+        self.max_entries = max_entries
+        self.max_age = max_age_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, stamp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_stamp, bill, built_at = entry
+            if entry_stamp != stamp or time.monotonic() - built_at > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return bill
+
+    def put(self, key, stamp, bill):
+        with self._lock:
+            self._entries[key] = (stamp, bill, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = bill_settings()
+                _cache = BillCache(conf.get('max_entries', 1000), conf.get('max_age_seconds', 300))
+    return _cache
+
+
+def current_order(table_id, day):
+    """order_id and version of the table's latest order on a day, from the order_day index alone"""
+    orders = OrderModel.find_many(
+        {'order_day': day, 'table_id': table_id}, sort=[('order_date', -1)], limit=1,
+        projection={'_id': 0, 'order_id': 1, 'version': 1}
+    )
+    return orders[0] if orders else None
+
+
+def _pipeline():
+    return [
+        {'$lookup': {'from': OrderItemModel.collection_name, 'localField': 'order_id',
+                     'foreignField': 'order_id', 'as': 'items'}},
+        {'$lookup': {'from': InvoiceModel.collection_name, 'localField': 'order_id',
+                     'foreignField': 'order_id', 'as': 'invoices'}},
+        {'$lookup': {'from': TableModel.collection_name, 'localField': 'table_id',
+                     'foreignField': 'table_id', 'as': 'tables'}},
+    ]
+
+
+def compose_bill(order):
+    """Bill from an order joined to its items, invoices and table"""
+    lines = []
+    for item in sorted(order['items'], key=lambda item: item['created_at']):
+        lines.append({
+            'order_item_id': item['order_item_id'],
+            'food_id': item['food_id'],
+            'food_name': item.get('food_name'),
+            'category': item.get('category'),
+            'quantity': item['quantity'],
+            'unit_price': item['unit_price'],
+            'line_total': round(item['quantity'] * item['unit_price'], 2),
+        })
+    net, tax, gross = split_tax(sum(item['quantity'] * item['unit_price'] for item in order['items']))
+    invoice = max(order['invoices'], key=lambda invoice: invoice['created_at']) if order['invoices'] else None
+    table = order['tables'][0] if order['tables'] else {}
+    return {
+        'table': {
+            'table_id': order.get('table_id'),
+            'table_number': table.get('table_number'),
+            'zone': table.get('zone'),
+        },
+        'order': {
+            'order_id': order['order_id'],
+            'order_date': order['order_date'],
+            'server_id': order.get('server_id'),
+            'version': order.get('version') or 0,
+        },
+        'lines': lines,
+        'totals': {
+            'item_count': sum(line['quantity'] for line in lines),
+            'net': round(net, 2),
+            'tax': round(tax, 2),
+            'total': round(gross, 2),
+        },
+        'payment': {
+            'invoice_id': invoice['invoice_id'],
+            'payment_method': invoice.get('payment_method'),
+            'payment_status': invoice.get('payment_status'),
+            'payment_due_date': invoice.get('payment_due_date'),
+        } if invoice else None,
+    }
+
+
+def _etag(order_id, version):
+    return f"\"{order_id}-{version}\""
+
+
+def get_table_bill(table_id, day, if_none_match=None):
+    """
+    The bill for a table's latest order on `day` (YYYY-MM-DD), as
+    (etag, bill). A cached bill, or a client's copy sent as if_none_match,
+    costs one indexed read to check its version; otherwise one aggregation
+    builds it. bill is None when the client's copy is current, and both are
+    None when the table has no order that day.
+    """
+    current = current_order(table_id, day)
+    if current is None:
+        return None, None
+    stamp = (current['order_id'], current.get('version') or 0)
+    if if_none_match == _etag(*stamp):
+        return if_none_match, None
+    key = (tenancy.get_restaurant_id(), table_id, day)
+    cache = get_cache()
+    bill = cache.get(key, stamp)
+    if bill is None:
+        orders = OrderModel.aggregate({'order_id': current['order_id']}, _pipeline())
+        if not orders:
+            return None, None
+        bill = compose_bill(orders[0])
+        # The aggregation may have read a newer version than the stamp
+        stamp = (bill['order']['order_id'], bill['order']['version'])
+        cache.put(key, stamp, bill)
+    return _etag(*stamp), bill
@@ -0,0 +1,297 @@
+import codecs
+import csv
+import io
+import logging
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+from django.conf import settings
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from restaurant_management import read_cache
+from restaurant_management.database import FoodModel, MenuModel
+from restaurant_management.renderers import ORJSON_OPTIONS, encode_default
+
+from . import catalog_store, search
+from .models import parse_datetime_value
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson', 'json')
+MENU_FIELDS = ('name', 'category', 'start_date', 'end_date', 'menu_id')
+FOOD_FIELDS = ('name', 'price', 'food_image', 'menu', 'menu_id', 'food_id')
+
+
+def catalog_settings():
+    return getattr(settings, 'CATALOG_SETTINGS', {})
+
+
+def format_for(filename, default='csv'):
+    """Guess the file format from its extension"""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'ndjson'
+    return extension if extension in FORMATS else default
+
+
+def read_rows(lines, fmt, kind=None):
+    """
+    Yield row dicts from an iterable of byte lines (an open file, an upload
+    or a request body). CSV and NDJSON are read one line at a time; JSON is
+    either a list of rows or an object with a `menus`/`foods` list.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    elif fmt == 'ndjson':
+        for line in lines:
+            if line.strip():
+                yield orjson.loads(line)
+    elif fmt == 'json':
+        data = orjson.loads(b''.join(lines))
+        yield from (data.get(kind, []) if isinstance(data, dict) else data)
+    else:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+
+class ImportReport:
+    """Counts per outcome plus the first max_errors row errors (row numbers start at 1)"""
+
+    def __init__(self, kind, max_errors=None):
+        self.kind = kind
+        self.max_errors = max_errors if max_errors is not None else catalog_settings().get('max_reported_errors', 1000)
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'error': str(message)})
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def _batches(rows, size):
+    batch = []
+    for row_number, row in enumerate(rows, start=1):
+        batch.append((row_number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _text(row, field, required=False):
+    value = row.get(field)
+    value = value.strip() if isinstance(value, str) else value
+    if required and not value:
+        raise ValueError(f"{field} is required")
+    return value or None
+
+
+def clean_menu(row):
+    menu = {
+        'name': _text(row, 'name', required=True),
+        'category': _text(row, 'category', required=True),
+        'start_date': parse_datetime_value(_text(row, 'start_date', required=True), 'start_date'),
+        'end_date': parse_datetime_value(_text(row, 'end_date', required=True), 'end_date'),
+    }
+    if menu['start_date'] >= menu['end_date']:
+        raise ValueError('Start date must be before end date.')
+    return menu
+
+
+def clean_food(row):
+    try:
+        price = round(float(row.get('price')), 2)
+    except (TypeError, ValueError):
+        raise ValueError('price must be a number')
+    if price <= 0:
+        raise ValueError('Price must be greater than 0.')
+    food = {
+        'name': _text(row, 'name', required=True),
+        'price': price,
+        'food_image': _text(row, 'food_image'),
+    }
+    menu_id = _text(row, 'menu_id')
+    menu_name = _text(row, 'menu')
+    if not menu_id and not menu_name:
+        raise ValueError('menu or menu_id is required')
+    return food, menu_id, menu_name
+
+
+def _upsert(model, key, fields, now):
+    """Upsert by natural key; IDs and created_at are only set when the document is new"""
+    object_id = ObjectId()
+    return UpdateOne(model.scope(key), {
+        '$set': {**fields, 'updated_at': now},
+        '$setOnInsert': {'_id': object_id, model.id_field: str(object_id), 'created_at': now},
+    }, upsert=True)
+
+
+def _write(model, operations, report):
+    """Send one batch and fold the result (or per-operation errors) into the report"""
+    if not operations:
+        return
+    row_numbers = [row_number for row_number, _ in operations]
+    try:
+        result = model.bulk_write([operation for _, operation in operations]).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        for write_error in result.get('writeErrors', []):
+            report.error(row_numbers[write_error['index']], write_error.get('errmsg'))
+    report.inserted += result.get('nUpserted', 0)
+    report.updated += result.get('nMatched', 0)
+
+
+def _dedupe(operations):
+    """Keep the last row for each natural key so a batch never upserts the same key twice"""
+    latest = {}
+    for row_number, key, operation in operations:
+        latest[key] = (row_number, operation)
+    return sorted(latest.values(), key=lambda item: item[0])
+
+
+def import_menus(rows, batch_size=None, dry_run=False):
+    """Upsert menus by name in batches. Returns an ImportReport"""
+    batch_size = batch_size or catalog_settings().get('import_batch_size', 1000)
+    report = ImportReport('menus')
+    for batch in _batches(rows, batch_size):
+        report.rows += len(batch)
+        now = datetime.utcnow()
+        operations = []
+        for row_number, row in batch:
+            try:
+                menu = clean_menu(row)
+            except (ValueError, AttributeError) as e:
+                report.error(row_number, e)
+                continue
+            operations.append((row_number, menu['name'], _upsert(MenuModel, {'name': menu['name']}, menu, now)))
+        if not dry_run:
+            _write(MenuModel, _dedupe(operations), report)
+    if not dry_run:
+        search.invalidate()
+        catalog_store.invalidate()
+        read_cache.invalidate(MenuModel)
+    return report
+
+
+def _resolve_menus(batch_refs, menu_ids, menu_names):
+    """Add the batch's unseen menu names and IDs to the caches with one query each"""
+    names = list({name for _, name in batch_refs if name and name not in menu_names})
+    if names:
+        for menu in MenuModel.find_many({'name': {'$in': names}}, projection={'menu_id': 1, 'name': 1}):
+            menu_names[menu['name']] = menu['menu_id']
+            menu_ids.add(menu['menu_id'])
+    ids = list({menu_id for menu_id, _ in batch_refs if menu_id and menu_id not in menu_ids})
+    if ids:
+        menu_ids.update(menu['menu_id'] for menu in MenuModel.find_many({'menu_id': {'$in': ids}}, projection={'menu_id': 1}))
+
+
+def import_foods(rows, batch_size=None, dry_run=False):
+    """
+    Upsert foods by (menu, name) in batches. Menus are referenced by
+    menu_id or by menu name, and every batch resolves its references with
+    one query per kind.
+    """
+    batch_size = batch_size or catalog_settings().get('import_batch_size', 1000)
+    report = ImportReport('foods')
+    menu_ids = set()
+    menu_names = {}
+    for batch in _batches(rows, batch_size):
+        report.rows += len(batch)
+        now = datetime.utcnow()
+        cleaned = []
+        for row_number, row in batch:
+            try:
+                cleaned.append((row_number, *clean_food(row)))
+            except (ValueError, AttributeError) as e:
+                report.error(row_number, e)
+        _resolve_menus([(menu_id, menu_name) for _, _, menu_id, menu_name in cleaned], menu_ids, menu_names)
+
+        operations = []
+        for row_number, food, menu_id, menu_name in cleaned:
+            menu_id = menu_id or menu_names.get(menu_name)
+            if menu_id not in menu_ids:
+                report.error(row_number, f"Menu not found: {menu_id or menu_name}")
+                continue
+            food['menu_id'] = menu_id
+            key = {'menu_id': menu_id, 'name': food['name']}
+            operations.append((row_number, (menu_id, food['name']), _upsert(FoodModel, key, food, now)))
+        if not dry_run:
+            _write(FoodModel, _dedupe(operations), report)
+    if not dry_run:
+        search.invalidate()
+        catalog_store.invalidate()
+        read_cache.invalidate(FoodModel)
+    return report
+
+
+def import_rows(kind, rows, batch_size=None, dry_run=False):
+    if kind == 'menus':
+        return import_menus(rows, batch_size=batch_size, dry_run=dry_run)
+    if kind == 'foods':
+        return import_foods(rows, batch_size=batch_size, dry_run=dry_run)
+    raise ValueError('kind must be menus or foods')
+
+
+def export_rows(kind):
+    """
+    Rows in the import format, read from a cursor opened up front. Food
+    rows name their menu as well, so an export re-imports into another
+    restaurant whose menu IDs differ.
+    """
+    if kind == 'menus':
+        cursor = MenuModel.iter_many(sort=[('name', 1)], projection={field: 1 for field in MENU_FIELDS})
+        return ({field: menu.get(field) for field in MENU_FIELDS} for menu in cursor)
+    if kind == 'foods':
+        menu_names = {menu['menu_id']: menu.get('name') for menu in MenuModel.find_many(projection={'menu_id': 1, 'name': 1})}
+        cursor = FoodModel.iter_many(sort=[('menu_id', 1), ('name', 1)], projection={field: 1 for field in FOOD_FIELDS})
+        return ({
+            'name': food.get('name'),
+            'price': food.get('price'),
+            'food_image': food.get('food_image'),
+            'menu': menu_names.get(food.get('menu_id')),
+            'menu_id': food.get('menu_id'),
+            'food_id': food.get('food_id'),
+        } for food in cursor)
+    raise ValueError('kind must be menus or foods')
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_lines(kind, fmt):
+    """Encoded export, one chunk of bytes per row (after a header row for CSV)"""
+    rows = export_rows(kind)
+    if fmt == 'ndjson':
+        return (orjson.dumps(row, default=encode_default, option=ORJSON_OPTIONS) + b'\n' for row in rows)
+    if fmt == 'csv':
+        return _csv_lines(MENU_FIELDS if kind == 'menus' else FOOD_FIELDS, rows)
+    raise ValueError('export format must be csv or ndjson')
+
+
+def _csv_lines(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(field)) for field in fields])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
@@ -0,0 +1,196 @@
+import heapq
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import islice
+
+import orjson
+
+# magic, generation, meta offset, meta length
+HEADER = struct.Struct('<8sQQQ')
+MAGIC = b'RMCATv01'
+
+
+def snapshot_path(directory, restaurant_id):
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', str(restaurant_id)) if restaurant_id is not None else 'default'
+    return os.path.join(directory, f"catalog-{name}.snap")
+
+
+def read_generation(path):
+    """Generation of the snapshot at path, 0 when there is none"""
+    try:
+        with open(path, 'rb') as f:
+            magic, generation, _, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return generation if magic == MAGIC else 0
+
+
+def _timestamp(value):
+    return value.timestamp() if isinstance(value, datetime) else None
+
+
+def write_snapshot(store, path, generation):
+    """
+    Write a CatalogStore to path as a snapshot file, atomically replacing
+    any previous one. Layout: header, every document's encoded JSON back to
+    back, fixed-width arrays for the food indexes, then a small JSON meta
+    block with menus, tables, food groups and where each array starts.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+
+        def put(data):
+            offset = f.tell()
+            f.write(data)
+            return offset
+
+        menus = [
+            [record.menu_id, record.category, _timestamp(record.start_date), _timestamp(record.end_date),
+             put(record.json), len(record.json)]
+            for record in store.menu_list
+        ]
+        tables = [[put(record.json), len(record.json)] for record in store.table_list]
+
+        # Foods in newest-first order; a food is referred to by its position
+        positions = {}
+        offsets, lengths, prices = array('Q'), array('I'), array('d')
+        for position, record in enumerate(store.food_list):
+            positions[record.food_id] = position
+            offsets.append(put(record.json))
+            lengths.append(len(record.json))
+            prices.append(record.price)
+
+        groups, by_menu, group_prices = {}, array('I'), array('d')
+        for menu_id, records in store.foods_by_menu.items():
+            if not records:
+                continue
+            groups[menu_id] = [len(by_menu), len(records)]
+            by_menu.extend(positions[record.food_id] for record in records)
+            group_prices.extend(store.prices_by_menu[menu_id])
+
+        sections = {}
+        for name, values in (('offsets', offsets), ('lengths', lengths), ('prices', prices),
+                             ('sorted_prices', array('d', store.prices)), ('by_menu', by_menu),
+                             ('group_prices', group_prices)):
+            put(b'\0' * (-f.tell() % 8))
+            sections[name] = [put(values.tobytes()), len(values), values.typecode]
+
+        meta = orjson.dumps({
+            'menus': menus,
+            'tables': tables,
+            'groups': groups,
+            'sections': sections,
+        })
+        meta_offset = put(meta)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, generation, meta_offset, len(meta)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CatalogSnapshot:
+    """
+    A snapshot file mapped read-only. Documents and food indexes are read
+    straight from the mapping, so every worker shares one copy through the
+    page cache; only the menu and table lists are decoded per worker. Pages
+    match CatalogStore's.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.generation, meta_offset, meta_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {path}")
+        self.path = path
+        self.inode = stat.st_ino
+        self.written_at = stat.st_mtime
+        meta = orjson.loads(self._map[meta_offset:meta_offset + meta_length])
+        self.menus = meta['menus']
+        self.tables = meta['tables']
+        self.groups = meta['groups']
+        view = memoryview(self._map)
+        for name, (offset, count, typecode) in meta['sections'].items():
+            size = array(typecode).itemsize
+            setattr(self, name, view[offset:offset + count * size].cast(typecode))
+
+    def is_current(self):
+        """False once a newer snapshot has replaced the mapped file"""
+        try:
+            return os.stat(self.path).st_ino == self.inode
+        except OSError:
+            return True
+
+    def _document(self, offset, length):
+        return orjson.Fragment(self._map[offset:offset + length])
+
+    def _food(self, position):
+        return self._document(self.offsets[position], self.lengths[position])
+
+    def _matching_menus(self, category=None, active_from=None, active_to=None):
+        active_from, active_to = _timestamp(active_from), _timestamp(active_to)
+        return [
+            menu for menu in self.menus
+            if (not category or menu[1] == category)
+            and (active_to is None or (menu[2] is not None and menu[2] <= active_to))
+            and (active_from is None or (menu[3] is not None and menu[3] >= active_from))
+        ]
+
+    def menu_page(self, skip=0, limit=None, category=None, active_from=None, active_to=None):
+        """(total_count, encoded menus) for one page, newest first"""
+        menus = self._matching_menus(category, active_from, active_to)
+        end = skip + limit if limit else None
+        return len(menus), [self._document(menu[4], menu[5]) for menu in menus[skip:end]]
+
+    def food_page(self, skip=0, limit=None, menu_id=None, min_price=None, max_price=None,
+                  category=None, active_from=None, active_to=None):
+        """(total_count, encoded foods) for one page, newest first"""
+        if category or active_from is not None or active_to is not None:
+            menu_ids = [menu[0] for menu in self._matching_menus(category, active_from, active_to)]
+            if menu_id:
+                menu_ids = [menu_id] if menu_id in menu_ids else []
+        else:
+            menu_ids = [menu_id] if menu_id else None
+
+        if menu_ids is None:
+            groups, price_lists = [range(len(self.offsets))], [self.sorted_prices]
+        else:
+            ranges = [self.groups[i] for i in menu_ids if i in self.groups]
+            groups = [self.by_menu[start:start + count] for start, count in ranges]
+            price_lists = [self.group_prices[start:start + count] for start, count in ranges]
+        # Positions are in newest-first order, so merging them keeps that order
+        positions = groups[0] if len(groups) == 1 else heapq.merge(*groups)
+
+        if min_price is not None or max_price is not None:
+            low = float('-inf') if min_price is None else min_price
+            high = float('inf') if max_price is None else max_price
+            total = sum(bisect_right(prices, high) - bisect_left(prices, low) for prices in price_lists)
+            prices = self.prices
+            positions = (position for position in positions if low <= prices[position] <= high)
+        else:
+            total = sum(len(group) for group in groups)
+        end = skip + limit if limit else None
+        page = positions[skip:end] if isinstance(positions, (range, memoryview)) else islice(positions, skip, end)
+        return total, [self._food(position) for position in page]
+
+    def table_page(self, skip=0, limit=None):
+        """(total_count, encoded tables) for one page, by table number"""
+        end = skip + limit if limit else None
+        return len(self.tables), [self._document(offset, length) for offset, length in self.tables[skip:end]]
+
+    def stats(self):
+        return {
+            'menus': len(self.menus),
+            'foods': len(self.offsets),
+            'tables': len(self.tables),
+            'generation': self.generation,
+            'mapped_bytes': len(self._map),
+        }
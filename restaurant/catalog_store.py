@@ -0,0 +1,511 @@
+import bisect
+import fcntl
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+
+import orjson
+from django.conf import settings
+
+from restaurant_management import tenancy, warmup
+from restaurant_management.database import FoodModel, MenuModel, TableModel
+from restaurant_management.fast_serializers import row_function
+from restaurant_management.renderers import ORJSON_OPTIONS, encode_default
+
+from .catalog_snapshot import CatalogSnapshot, read_generation, snapshot_path, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def catalog_store_settings():
+    return getattr(settings, 'CATALOG_STORE_SETTINGS', {})
+
+
+_row_functions = {}
+
+
+def _row_function(serializer_name):
+    """Compiled row function of a restaurant.serializers class, looked up on first use"""
+    to_row = _row_functions.get(serializer_name)
+    if to_row is None:
+        # Imported here: restaurant.serializers imports restaurant.models, which imports this module
+        from . import serializers
+        to_row = _row_functions[serializer_name] = row_function(getattr(serializers, serializer_name)())
+    return to_row
+
+
+def encode(document, serializer_name):
+    """The document as its serializer renders it, encoded once and embedded as-is in every response"""
+    # orjson over-allocates its output; copying trims the buffer to the encoded length
+    row = _row_function(serializer_name)(document)
+    return bytes(memoryview(orjson.dumps(row, default=encode_default, option=ORJSON_OPTIONS)))
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _timestamp(value):
+    return value.timestamp() if isinstance(value, datetime) else 0.0
+
+
+def _menu_date(value, field):
+    """A menu's start or end date as a datetime; menus written before dates were parsed may hold ISO strings"""
+    # Imported here: restaurant.models imports this module
+    from .models import parse_datetime_value
+    if value is None:
+        return None
+    try:
+        return parse_datetime_value(value, field)
+    except ValueError:
+        return None
+
+
+# Records keep only what list filters and sorting need, plus the encoded document.
+# Repeated strings (menu IDs on foods, menu categories) are interned.
+
+class MenuRecord:
+    __slots__ = ('menu_id', 'category', 'start_date', 'end_date', 'created', 'json')
+
+    def __init__(self, menu):
+        self.menu_id = _intern(menu['menu_id'])
+        self.category = _intern(menu.get('category'))
+        self.start_date = _menu_date(menu.get('start_date'), 'start_date')
+        self.end_date = _menu_date(menu.get('end_date'), 'end_date')
+        self.created = _timestamp(menu.get('created_at'))
+        self.json = encode(menu, 'MenuSerializer')
+
+
+class FoodRecord:
+    __slots__ = ('food_id', 'menu_id', 'price', 'created', 'json')
+
+    def __init__(self, food):
+        self.food_id = food['food_id']
+        self.menu_id = _intern(food.get('menu_id'))
+        self.price = float(food.get('price') or 0)
+        self.created = _timestamp(food.get('created_at'))
+        self.json = encode(food, 'FoodSerializer')
+
+
+class TableRecord:
+    __slots__ = ('table_id', 'table_number', 'json')
+
+    def __init__(self, table):
+        self.table_id = table['table_id']
+        self.table_number = table.get('table_number') or 0
+        self.json = encode(table, 'TableSerializer')
+
+
+def _newest_first(record):
+    return -record.created
+
+
+def _by_number(record):
+    return record.table_number
+
+
+def _encoded(records, skip, limit):
+    """Encoded documents of one page of a sorted list or iterator"""
+    end = skip + limit if limit else None
+    page = records[skip:end] if isinstance(records, list) else islice(records, skip, end)
+    return [orjson.Fragment(record.json) for record in page]
+
+
+def _insert(records, record, key):
+    bisect.insort(records, record, key=key)
+
+
+def _remove(records, record, key):
+    """Remove a record from a list sorted by key, looking only at entries with an equal key"""
+    i = bisect.bisect_left(records, key(record), key=key)
+    while i < len(records) and key(records[i]) == key(record):
+        if records[i] is record:
+            del records[i]
+            return
+        i += 1
+
+
+class CatalogStore:
+    """
+    Menus, foods and tables of one restaurant as compact records, each
+    holding its serializer output pre-encoded as JSON. List pages are slices of presorted lists,
+    so serving one costs neither a query nor a per-field encode. Foods are
+    also grouped by menu so menu, category and active-window filters only
+    walk the matching menus' foods.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.menus = {}
+        self.menu_list = []
+        self.foods = {}
+        self.food_list = []
+        self.foods_by_menu = {}
+        # Sorted prices, overall and per menu, so a price range is counted with two bisects
+        self.prices = []
+        self.prices_by_menu = {}
+        self.tables = {}
+        self.table_list = []
+        self.built_at = time.monotonic()
+
+    def build(self, menus, foods, tables):
+        with self._lock:
+            for menu in menus:
+                record = MenuRecord(menu)
+                self.menus[record.menu_id] = record
+            for food in foods:
+                record = FoodRecord(food)
+                self.foods[record.food_id] = record
+            for table in tables:
+                record = TableRecord(table)
+                self.tables[record.table_id] = record
+            self.menu_list = sorted(self.menus.values(), key=_newest_first)
+            self.food_list = sorted(self.foods.values(), key=_newest_first)
+            self.foods_by_menu = {}
+            self.prices_by_menu = {}
+            for record in self.food_list:
+                self.foods_by_menu.setdefault(record.menu_id, []).append(record)
+                self.prices_by_menu.setdefault(record.menu_id, []).append(record.price)
+            self.prices = sorted(record.price for record in self.food_list)
+            for prices in self.prices_by_menu.values():
+                prices.sort()
+            self.table_list = sorted(self.tables.values(), key=_by_number)
+            self.built_at = time.monotonic()
+
+    def upsert_menu(self, menu):
+        record = MenuRecord(menu)
+        with self._lock:
+            old = self.menus.get(record.menu_id)
+            if old is not None:
+                _remove(self.menu_list, old, _newest_first)
+            self.menus[record.menu_id] = record
+            _insert(self.menu_list, record, _newest_first)
+
+    def upsert_food(self, food):
+        record = FoodRecord(food)
+        with self._lock:
+            self.remove_food(record.food_id)
+            self.foods[record.food_id] = record
+            _insert(self.food_list, record, _newest_first)
+            _insert(self.foods_by_menu.setdefault(record.menu_id, []), record, _newest_first)
+            bisect.insort(self.prices, record.price)
+            bisect.insort(self.prices_by_menu.setdefault(record.menu_id, []), record.price)
+
+    def remove_food(self, food_id):
+        with self._lock:
+            old = self.foods.pop(food_id, None)
+            if old is not None:
+                _remove(self.food_list, old, _newest_first)
+                _remove(self.foods_by_menu.get(old.menu_id, []), old, _newest_first)
+                for prices in (self.prices, self.prices_by_menu.get(old.menu_id, [])):
+                    i = bisect.bisect_left(prices, old.price)
+                    if i < len(prices) and prices[i] == old.price:
+                        del prices[i]
+
+    def upsert_table(self, table):
+        record = TableRecord(table)
+        with self._lock:
+            old = self.tables.get(record.table_id)
+            if old is not None:
+                _remove(self.table_list, old, _by_number)
+            self.tables[record.table_id] = record
+            _insert(self.table_list, record, _by_number)
+
+    def _matching_menus(self, category=None, active_from=None, active_to=None):
+        """Menus in a category and/or active at some point in [active_from, active_to], newest first"""
+        return [
+            record for record in self.menu_list
+            if (not category or record.category == category)
+            and (active_to is None or (record.start_date is not None and record.start_date <= active_to))
+            and (active_from is None or (record.end_date is not None and record.end_date >= active_from))
+        ]
+
+    def menu_page(self, skip=0, limit=None, category=None, active_from=None, active_to=None):
+        """(total_count, encoded menus) for one page, newest first"""
+        with self._lock:
+            if not category and active_from is None and active_to is None:
+                return len(self.menu_list), _encoded(self.menu_list, skip, limit)
+            menus = self._matching_menus(category, active_from, active_to)
+            return len(menus), _encoded(menus, skip, limit)
+
+    def food_page(self, skip=0, limit=None, menu_id=None, min_price=None, max_price=None,
+                  category=None, active_from=None, active_to=None):
+        """(total_count, encoded foods) for one page, newest first"""
+        with self._lock:
+            if category or active_from is not None or active_to is not None:
+                menu_ids = [record.menu_id for record in self._matching_menus(category, active_from, active_to)]
+                if menu_id:
+                    menu_ids = [menu_id] if menu_id in menu_ids else []
+            else:
+                menu_ids = [menu_id] if menu_id else None
+
+            if menu_ids is None:
+                groups, price_lists = [self.food_list], [self.prices]
+            else:
+                menu_ids = [i for i in menu_ids if self.foods_by_menu.get(i)]
+                groups = [self.foods_by_menu[i] for i in menu_ids]
+                price_lists = [self.prices_by_menu[i] for i in menu_ids]
+            foods = groups[0] if len(groups) == 1 else heapq.merge(*groups, key=_newest_first)
+            if min_price is None and max_price is None:
+                return sum(len(group) for group in groups), _encoded(foods, skip, limit)
+
+            low = float('-inf') if min_price is None else min_price
+            high = float('inf') if max_price is None else max_price
+            total = sum(bisect.bisect_right(prices, high) - bisect.bisect_left(prices, low) for prices in price_lists)
+            # Walk newest first and stop once the page is full
+            foods = (record for record in foods if low <= record.price <= high)
+            return total, _encoded(foods, skip, limit)
+
+    def table_page(self, skip=0, limit=None):
+        """(total_count, encoded tables) for one page, by table number"""
+        with self._lock:
+            return len(self.table_list), _encoded(self.table_list, skip, limit)
+
+    def stats(self):
+        return {
+            'menus': len(self.menus),
+            'foods': len(self.foods),
+            'tables': len(self.tables),
+            'encoded_bytes': sum(
+                len(record.json)
+                for records in (self.menus, self.foods, self.tables) for record in records.values()
+            ),
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+# Writes made while a store is being built, replayed onto it before it is installed
+_pending = {}
+_pending_lock = threading.Lock()
+# Bumped by invalidate(), so a build that started before a bulk change is not installed
+_generations = {}
+# Restaurants with a snapshot regeneration running in this worker -> whether another is wanted after it
+_regenerating = {}
+# Set when the snapshot directory cannot be written or read; this worker then keeps its own stores
+_snapshot_error = None
+
+
+def is_enabled():
+    return catalog_store_settings().get('enabled', False)
+
+
+def snapshot_dir():
+    """Directory of the shared snapshot files, None when each worker keeps its own store"""
+    if _snapshot_error is not None:
+        return None
+    return catalog_store_settings().get('snapshot_dir') or None
+
+
+def _snapshot_failed(error):
+    """Stop using the snapshot directory in this worker and fall back to per-worker stores"""
+    global _snapshot_error
+    logger.error(
+        f"Catalog snapshot directory {snapshot_dir()} is not usable, keeping a store per worker instead: {error}"
+    )
+    with _stores_lock, _pending_lock:
+        _snapshot_error = error
+        _stores.clear()
+
+
+def _build_store():
+    store = CatalogStore()
+    # Streamed, so the raw documents are never all held at once
+    store.build(
+        MenuModel.iter_many(profile='catalog_read'),
+        FoodModel.iter_many(profile='catalog_read'),
+        TableModel.iter_many(profile='catalog_read'),
+    )
+    return store
+
+
+def _build_and_install(restaurant_id):
+    """Build a fresh store for the current restaurant and install it with the writes made meanwhile"""
+    buffer = []
+    with _pending_lock:
+        _pending.setdefault(restaurant_id, []).append(buffer)
+        generation = _generations.get(restaurant_id, 0)
+    store = None
+    try:
+        store = _build_store()
+    finally:
+        with _pending_lock:
+            _pending[restaurant_id].remove(buffer)
+            if not _pending[restaurant_id]:
+                del _pending[restaurant_id]
+            if store is not None:
+                for apply in buffer:
+                    apply(store)
+                if _generations.get(restaurant_id, 0) == generation:
+                    _stores[restaurant_id] = store
+    return store
+
+
+def regenerate_snapshot(restaurant_id, wait=True, if_missing=False):
+    """
+    Rebuild the restaurant's shared snapshot from MongoDB with the next
+    generation number. Workers regenerating at the same time take turns on
+    a lock file; with wait=False this returns False instead of queueing
+    behind one already running.
+    """
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(directory, restaurant_id)
+    with open(f"{path}.lock", 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            if if_missing and os.path.exists(path):
+                return True
+            with tenancy.use_restaurant(restaurant_id):
+                store = _build_store()
+            write_snapshot(store, path, read_generation(path) + 1)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return True
+
+
+def _regenerate_in_background(restaurant_id):
+    """Regenerate after a write; writes landing during a run are picked up by one more run"""
+    with _stores_lock:
+        if restaurant_id in _regenerating:
+            _regenerating[restaurant_id] = True
+            return
+        _regenerating[restaurant_id] = False
+
+    def regenerate():
+        while True:
+            try:
+                regenerate_snapshot(restaurant_id)
+            except Exception as e:
+                logger.error(f"Failed to regenerate catalog snapshot: {e}")
+            with _stores_lock:
+                if not _regenerating[restaurant_id]:
+                    del _regenerating[restaurant_id]
+                    return
+                _regenerating[restaurant_id] = False
+
+    threading.Thread(target=regenerate, daemon=True).start()
+
+
+def _refresh_in_background(restaurant_id):
+    def refresh():
+        with tenancy.use_restaurant(restaurant_id):
+            try:
+                if snapshot_dir():
+                    # Every worker sees the snapshot age out at once; one of them rebuilds it
+                    regenerate_snapshot(restaurant_id, wait=False)
+                else:
+                    _build_and_install(restaurant_id)
+            except Exception as e:
+                logger.error(f"Failed to rebuild catalog store: {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(restaurant_id)
+
+    with _refreshing_lock:
+        if restaurant_id in _refreshing:
+            return
+        _refreshing.add(restaurant_id)
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def _get_snapshot(restaurant_id):
+    """This worker's mapping of the shared snapshot, remapped once a newer generation replaces the file"""
+    snapshot = _stores.get(restaurant_id)
+    if snapshot is not None and snapshot.is_current():
+        if time.time() - snapshot.written_at > catalog_store_settings().get('max_age_seconds', 60):
+            _refresh_in_background(restaurant_id)
+        return snapshot
+    path = snapshot_path(snapshot_dir(), restaurant_id)
+    if not os.path.exists(path):
+        regenerate_snapshot(restaurant_id, if_missing=True)
+    snapshot = _stores[restaurant_id] = CatalogSnapshot(path)
+    return snapshot
+
+
+def get_store():
+    """
+    Catalog store for the current restaurant, built on first use. Stores
+    older than CATALOG_STORE_SETTINGS['max_age_seconds'] are rebuilt in the
+    background to pick up writes made through other workers. With a
+    snapshot_dir, this is the shared snapshot mapped into this worker, unless
+    the directory cannot be used.
+    """
+    restaurant_id = tenancy.get_restaurant_id()
+    if snapshot_dir():
+        try:
+            return _get_snapshot(restaurant_id)
+        except OSError as e:
+            _snapshot_failed(e)
+    store = _stores.get(restaurant_id)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(restaurant_id)
+            if store is None:
+                store = _build_and_install(restaurant_id)
+        return store
+
+    if time.monotonic() - store.built_at > catalog_store_settings().get('max_age_seconds', 60):
+        _refresh_in_background(restaurant_id)
+    return store
+
+
+def _changed(apply):
+    """Apply a write to this worker's store and any store being built, or regenerate the shared snapshot once"""
+    restaurant_id = tenancy.get_restaurant_id()
+    if snapshot_dir():
+        if is_enabled():
+            _regenerate_in_background(restaurant_id)
+        return
+    with _pending_lock:
+        store = _stores.get(restaurant_id)
+        if store is not None:
+            apply(store)
+        for buffer in _pending.get(restaurant_id, ()):
+            buffer.append(apply)
+
+
+def menu_changed(menu):
+    """Keep the store in sync with a menu write"""
+    if menu:
+        _changed(lambda store: store.upsert_menu(menu))
+
+
+def food_changed(food):
+    """Keep the store in sync with a food write"""
+    if food:
+        _changed(lambda store: store.upsert_food(food))
+
+
+def table_changed(table):
+    """Keep the store in sync with a table write"""
+    if table:
+        _changed(lambda store: store.upsert_table(table))
+
+
+def invalidate():
+    """Rebuild the current restaurant's store from scratch, e.g. after a bulk import"""
+    restaurant_id = tenancy.get_restaurant_id()
+    if snapshot_dir():
+        if is_enabled():
+            _regenerate_in_background(restaurant_id)
+        return
+    with _pending_lock:
+        _generations[restaurant_id] = _generations.get(restaurant_id, 0) + 1
+        _stores.pop(restaurant_id, None)
+
+
+@warmup.register_per_restaurant
+def build_catalog_store():
+    if is_enabled():
+        get_store()
@@ -0,0 +1,280 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from restaurant_management import tenancy, warmup
+from restaurant_management.database import FoodModel, MenuModel, OrderModel, OrderItemModel
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'QUEUED'
+CLAIMED = 'CLAIMED'
+DONE = 'DONE'
+
+
+def kitchen_settings():
+    return getattr(settings, 'KITCHEN_SETTINGS', {})
+
+
+def routing_for_categories(categories):
+    """Station and course for each menu category, from KITCHEN_SETTINGS"""
+    conf = kitchen_settings()
+    stations = conf.get('stations', {})
+    courses = conf.get('courses', {})
+    return {
+        category: (
+            stations.get(category, conf.get('default_station', 'main')),
+            courses.get(category, conf.get('default_course', 2)),
+        )
+        for category in categories
+    }
+
+
+def _lookup_categories(items):
+    """Menu category per food, for items created without a food snapshot"""
+    foods = {
+        food['food_id']: food
+        for food in FoodModel.find_many({'food_id': {'$in': list({item['food_id'] for item in items})}},
+                                        projection={'food_id': 1, 'menu_id': 1})
+    }
+    menu_ids = list({food.get('menu_id') for food in foods.values()})
+    categories = {
+        menu['menu_id']: menu.get('category')
+        for menu in MenuModel.find_many({'menu_id': {'$in': menu_ids}}, projection={'menu_id': 1, 'category': 1})
+    }
+    return {food_id: categories.get(food.get('menu_id')) for food_id, food in foods.items()}
+
+
+def route_items(items):
+    """
+    Add kitchen routing fields to new order item documents in place. Items
+    carrying a food snapshot are routed by its category without any lookup.
+    """
+    if not items:
+        return items
+    unsnapshotted = [item for item in items if 'category' not in item]
+    food_categories = _lookup_categories(unsnapshotted) if unsnapshotted else {}
+    # The table has been waiting since its order was placed
+    missing_order_ids = list({item['order_id'] for item in items if not item.get('order_date')})
+    order_dates = {
+        order['order_id']: order.get('order_date')
+        for order in OrderModel.find_many({'order_id': {'$in': missing_order_ids}},
+                                          projection={'order_id': 1, 'order_date': 1})
+    } if missing_order_ids else {}
+    categories = [item['category'] if 'category' in item else food_categories.get(item['food_id']) for item in items]
+    routing = routing_for_categories(set(categories))
+    for item, category in zip(items, categories):
+        station, course = routing[category]
+        item.update({
+            'station': station,
+            'course': course,
+            'kitchen_status': QUEUED,
+            'priority': 0,
+            'order_date': item.get('order_date') or order_dates.get(item['order_id']) or item['created_at'],
+            'kitchen_version': 0,
+        })
+    return items
+
+
+def queue_key(item):
+    """Bumped items first, then earlier courses, then tables waiting longest, then oldest items"""
+    return (-item.get('priority', 0), item.get('course', 0), item['order_date'], item['created_at'], item['order_item_id'])
+
+
+class StationQueue:
+    """
+    Priority queue for one station. Re-prioritised or removed items leave
+    stale heap entries behind, which are skipped when they reach the top,
+    so push, remove and pop are all O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._versions = {}
+
+    def __len__(self):
+        return len(self._versions)
+
+    def push(self, item):
+        order_item_id = item['order_item_id']
+        version = item.get('kitchen_version', 0)
+        if self._versions.get(order_item_id) == version:
+            return
+        self._versions[order_item_id] = version
+        heapq.heappush(self._heap, (queue_key(item), version, order_item_id))
+        if len(self._heap) > 2 * len(self._versions) + 64:
+            self._compact()
+
+    def _compact(self):
+        """Drop stale entries once they outnumber live ones"""
+        self._heap = [entry for entry in self._heap if self._is_live(entry)]
+        heapq.heapify(self._heap)
+
+    def remove(self, order_item_id):
+        self._versions.pop(order_item_id, None)
+
+    def _is_live(self, entry):
+        return self._versions.get(entry[2]) == entry[1]
+
+    def pop(self):
+        """Remove and return (order_item_id, version) of the top item, or None"""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._is_live(entry):
+                del self._versions[entry[2]]
+                return entry[2], entry[1]
+        return None
+
+    def peek(self, limit):
+        return [entry[2] for entry in heapq.nsmallest(limit, filter(self._is_live, self._heap))]
+
+
+class KitchenScheduler:
+    """
+    In-memory per-station queues for one restaurant, with the orderItem
+    collection as the durable copy. Claims are compare-and-set updates in
+    MongoDB, so several workers can share the same queues safely. Each
+    worker pulls changes made elsewhere at most every refresh_seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queues = {}
+        self._synced_at = None
+        self._refreshed = 0.0
+        self._swept = 0.0
+
+    def _queue(self, station):
+        queue = self.queues.get(station)
+        if queue is None:
+            queue = self.queues[station] = StationQueue()
+        return queue
+
+    def _apply(self, item):
+        queue = self._queue(item['station'])
+        if item.get('kitchen_status') == QUEUED:
+            queue.push(item)
+        else:
+            queue.remove(item['order_item_id'])
+
+    def refresh(self, force=False):
+        """Load queued items on first use, then apply items changed since the last sync"""
+        conf = kitchen_settings()
+        if not force and time.monotonic() - self._refreshed < conf.get('refresh_seconds', 1.0):
+            return
+        now = datetime.utcnow()
+
+        # Items claimed by a cook who never completed them go back to the queue.
+        # Claims time out after minutes, so sweeping far less often than refreshing is enough
+        if force or time.monotonic() - self._swept >= conf.get('sweep_seconds', 30):
+            self._swept = time.monotonic()
+            stale = now - timedelta(seconds=conf.get('claim_timeout_seconds', 900))
+            OrderItemModel.update_many(
+                {'kitchen_status': CLAIMED, 'claimed_at': {'$lt': stale}},
+                {'$set': {'kitchen_status': QUEUED, 'claimed_by': None, 'updated_at': now}, '$inc': {'kitchen_version': 1}},
+            )
+
+        if self._synced_at is None:
+            filter_dict = {'kitchen_status': QUEUED}
+        else:
+            # Overlap the window slightly to tolerate clock skew between workers
+            filter_dict = {
+                'kitchen_status': {'$in': [QUEUED, CLAIMED, DONE]},
+                'updated_at': {'$gte': self._synced_at - timedelta(seconds=5)},
+            }
+        items = OrderItemModel.find_many(filter_dict)
+        with self._lock:
+            for item in items:
+                self._apply(item)
+            self._synced_at = now
+            self._refreshed = time.monotonic()
+
+    def enqueue(self, items):
+        with self._lock:
+            for item in items:
+                self._apply(item)
+
+    def queue(self, station, limit=20):
+        """Items waiting at a station, in the order they will be claimed"""
+        self.refresh()
+        with self._lock:
+            order_item_ids = self._queue(station).peek(limit)
+        items = {item['order_item_id']: item for item in OrderItemModel.find_many({'order_item_id': {'$in': order_item_ids}})}
+        return [items[order_item_id] for order_item_id in order_item_ids if order_item_id in items]
+
+    def claim(self, station, cook):
+        """Claim the top item at a station, skipping items another worker got to first"""
+        self.refresh()
+        while True:
+            with self._lock:
+                top = self._queue(station).pop()
+            if top is None:
+                return None
+            order_item_id, version = top
+            now = datetime.utcnow()
+            item = OrderItemModel.find_one_and_update(
+                {'order_item_id': order_item_id, 'kitchen_status': QUEUED, 'kitchen_version': version},
+                {'$set': {'kitchen_status': CLAIMED, 'claimed_by': cook, 'claimed_at': now, 'updated_at': now},
+                 '$inc': {'kitchen_version': 1}},
+            )
+            if item is not None:
+                return item
+            # Changed by another worker since it was queued here: requeue its current state,
+            # so a bumped item is not lost until the next refresh
+            current = OrderItemModel.find_one({'order_item_id': order_item_id})
+            if current is not None and current.get('kitchen_version', 0) != version:
+                self.enqueue([current])
+
+    def bump(self, order_item_id):
+        """Move an item ahead of everything not bumped as often"""
+        item = OrderItemModel.find_one_and_update(
+            {'order_item_id': order_item_id, 'kitchen_status': QUEUED},
+            {'$inc': {'priority': 1, 'kitchen_version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+        )
+        if item is not None:
+            self.enqueue([item])
+        return item
+
+    def complete(self, order_item_id):
+        item = OrderItemModel.find_one_and_update(
+            {'order_item_id': order_item_id, 'kitchen_status': {'$in': [QUEUED, CLAIMED]}},
+            {'$set': {'kitchen_status': DONE, 'completed_at': datetime.utcnow(), 'updated_at': datetime.utcnow()},
+             '$inc': {'kitchen_version': 1}},
+        )
+        if item is not None:
+            self.enqueue([item])
+        return item
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Kitchen scheduler for the current restaurant, loaded from MongoDB on first use"""
+    restaurant_id = tenancy.get_restaurant_id()
+    scheduler = _schedulers.get(restaurant_id)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(restaurant_id)
+            if scheduler is None:
+                scheduler = KitchenScheduler()
+                scheduler.refresh(force=True)
+                _schedulers[restaurant_id] = scheduler
+    return scheduler
+
+
+def items_created(items):
+    """Put new order items on this worker's queues right away"""
+    scheduler = _schedulers.get(tenancy.get_restaurant_id())
+    if scheduler is not None:
+        scheduler.enqueue(items)
+
+
+@warmup.register_per_restaurant
+def load_kitchen_queues():
+    get_scheduler()
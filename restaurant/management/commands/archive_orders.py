@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from restaurant import archive
+from restaurant_management import tenancy
+
+
+class Command(BaseCommand):
+    help = 'Move paid orders older than the cutoff, with their items and invoices, to archive collections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None, help='Override ARCHIVE_SETTINGS older_than_days')
+        parser.add_argument('--batch-size', type=int, default=None, help='Override ARCHIVE_SETTINGS batch_size')
+        parser.add_argument('--restaurant-id', action='append', default=[], help='Restaurant to archive (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Count archivable orders without moving them')
+
+    def handle(self, *args, **options):
+        for restaurant_id in options['restaurant_id'] or tenancy.restaurant_ids():
+            with tenancy.use_restaurant(restaurant_id):
+                total = archive.archive_orders(
+                    older_than_days=options['older_than_days'],
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+            label = f" for {restaurant_id}" if restaurant_id else ''
+            verb = 'Would archive' if options['dry_run'] else 'Archived'
+            self.stdout.write(self.style.SUCCESS(f"{verb} {total} order(s){label}"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from restaurant import catalog_store
+from restaurant.models import parse_datetime_value
+from restaurant_management import read_cache, tenancy
+from restaurant_management.database import MenuModel
+
+DATE_FIELDS = ('start_date', 'end_date')
+
+
+class Command(BaseCommand):
+    help = 'Convert menu start and end dates stored as ISO strings to dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant-id', action='append', default=[], help='Restaurant to backfill (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def convert_string_dates(self, batch_size):
+        """Rewrite ISO string menu dates as dates. Returns (converted, unparseable)"""
+        converted = unparseable = 0
+        batch = []
+        cursor = MenuModel.iter_many(
+            {'$or': [{field: {'$type': 'string'}} for field in DATE_FIELDS]},
+            batch_size=batch_size, projection={field: 1 for field in DATE_FIELDS},
+        )
+        for menu in cursor:
+            update = {}
+            for field in DATE_FIELDS:
+                if isinstance(menu.get(field), str):
+                    try:
+                        update[field] = parse_datetime_value(menu[field], field)
+                    except ValueError:
+                        unparseable += 1
+            if not update:
+                continue
+            batch.append(UpdateOne(
+                # Only if the dates were not rewritten since they were read
+                {'_id': menu['_id'], **{field: menu[field] for field in update}},
+                {'$set': update},
+            ))
+            if len(batch) >= batch_size:
+                converted += MenuModel.bulk_write(batch).modified_count
+                batch = []
+        if batch:
+            converted += MenuModel.bulk_write(batch).modified_count
+        return converted, unparseable
+
+    def handle(self, *args, **options):
+        for restaurant_id in options['restaurant_id'] or tenancy.restaurant_ids():
+            with tenancy.use_restaurant(restaurant_id):
+                converted, unparseable = self.convert_string_dates(options['batch_size'])
+                if converted:
+                    catalog_store.invalidate()
+                    read_cache.invalidate(MenuModel)
+            label = f" for {restaurant_id}" if restaurant_id else ''
+            self.stdout.write(self.style.SUCCESS(f"Converted the string dates of {converted} menu(s){label}"))
+            if unparseable:
+                self.stderr.write(f"{unparseable} menu date(s){label} are not ISO dates and were left as they are")
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from restaurant.models import order_day, parse_datetime_value
+from restaurant_management import tenancy
+from restaurant_management.database import OrderModel
+
+
+class Command(BaseCommand):
+    help = 'Set the order_day bucket on orders created before it existed, converting string order dates to dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant-id', action='append', default=[], help='Restaurant to backfill (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def convert_string_dates(self, batch_size):
+        """Rewrite ISO string order dates as dates with their day bucket. Returns (converted, unparseable)"""
+        converted = unparseable = 0
+        batch = []
+        cursor = OrderModel.iter_many(
+            {'order_date': {'$type': 'string'}}, batch_size=batch_size, projection={'order_date': 1}
+        )
+        for order in cursor:
+            try:
+                order_date = parse_datetime_value(order['order_date'], 'order_date')
+            except ValueError:
+                unparseable += 1
+                continue
+            batch.append(UpdateOne(
+                # Only if the date was not rewritten since it was read
+                {'_id': order['_id'], 'order_date': order['order_date']},
+                {'$set': {'order_date': order_date, 'order_day': order_day(order_date)}},
+            ))
+            if len(batch) >= batch_size:
+                converted += OrderModel.bulk_write(batch).modified_count
+                batch = []
+        if batch:
+            converted += OrderModel.bulk_write(batch).modified_count
+        return converted, unparseable
+
+    def handle(self, *args, **options):
+        for restaurant_id in options['restaurant_id'] or tenancy.restaurant_ids():
+            with tenancy.use_restaurant(restaurant_id):
+                # One server-side update, no documents travel to the client
+                result = OrderModel.collection.update_many(
+                    OrderModel.scope({'order_day': {'$exists': False}, 'order_date': {'$type': 'date'}}),
+                    [{'$set': {'order_day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$order_date'}}}}],
+                )
+                converted, unparseable = self.convert_string_dates(options['batch_size'])
+            label = f" for {restaurant_id}" if restaurant_id else ''
+            self.stdout.write(self.style.SUCCESS(
+                f"Bucketed {result.modified_count + converted} order(s) by day{label}, "
+                f"{converted} of them from string dates"
+            ))
+            if unparseable:
+                self.stderr.write(f"{unparseable} order(s){label} have an order_date that is not an ISO date")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from restaurant.models import food_snapshots
+from restaurant_management import tenancy
+from restaurant_management.database import OrderItemModel, OrderItemArchiveModel
+
+
+class Command(BaseCommand):
+    help = 'Add food name, menu and category snapshots to order items created before snapshots existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--restaurant-id', action='append', default=[], help='Restaurant to backfill (repeatable)')
+
+    def backfill(self, model, batch_size):
+        updated = missing = 0
+        last_id = None
+        while True:
+            # Page by _id: items whose food no longer exists keep matching the filter
+            filter_dict = {'food_name': {'$exists': False}}
+            if last_id is not None:
+                filter_dict['_id'] = {'$gt': last_id}
+            items = model.find_many(filter_dict, limit=batch_size, sort=[('_id', 1)], projection={'food_id': 1})
+            if not items:
+                return updated, missing
+            last_id = items[-1]['_id']
+
+            snapshots = food_snapshots({item['food_id'] for item in items})
+            requests = []
+            for item in items:
+                snapshot = snapshots.get(item['food_id'])
+                if snapshot is None:
+                    missing += 1
+                    continue
+                # Keep the price that was charged; only the descriptive fields are backfilled
+                fields = {field: value for field, value in snapshot.items() if field != 'unit_price'}
+                requests.append(UpdateOne({'_id': item['_id']}, {'$set': fields}))
+            if requests:
+                updated += model.bulk_write(requests).modified_count
+
+    def handle(self, *args, **options):
+        for restaurant_id in options['restaurant_id'] or tenancy.restaurant_ids():
+            with tenancy.use_restaurant(restaurant_id):
+                for model in (OrderItemModel, OrderItemArchiveModel):
+                    updated, missing = self.backfill(model, options['batch_size'])
+                    label = f" for {restaurant_id}" if restaurant_id else ''
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{model.collection_name}: snapshotted {updated} item(s){label}, {missing} with a deleted food"
+                    ))
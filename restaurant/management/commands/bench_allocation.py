@@ -0,0 +1,95 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from restaurant.allocation import BOOKED, TableAllocator
+
+
+def build_tables(count, zones):
+    """Tables of 2 to 8 seats, numbered consecutively within each zone"""
+    tables = []
+    for i in range(count):
+        tables.append({
+            'table_id': f"table_{i}",
+            'table_number': i + 1,
+            'number_of_guests': random.choice([2, 2, 2, 4, 4, 4, 6, 8]),
+            'zone': f"zone_{i * zones // count}",
+        })
+    return tables
+
+
+def build_requests(count, day):
+    """Parties of 1 to 12 arriving in 15 minute slots between 11:00 and 22:00"""
+    opening = day.replace(hour=11)
+    requests = []
+    for _ in range(count):
+        start = opening + timedelta(minutes=15 * random.randrange(44))
+        party_size = random.choice([1, 2, 2, 2, 3, 4, 4, 5, 6, 8, 10, 12])
+        requests.append((party_size, start, start + timedelta(minutes=random.choice([60, 90, 120]))))
+    return requests
+
+
+def naive_free(reservations, table_id, start, end):
+    """Baseline: scan every reservation of the day"""
+    for reservation in reservations:
+        if table_id in reservation['table_ids'] and reservation['start_time'] < end and reservation['end_time'] > start:
+            return False
+    return True
+
+
+def percentile(samples, quantile):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark table suggestions and conflict checks on a synthetic day of reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', type=int, default=300, help='Number of tables')
+        parser.add_argument('--zones', type=int, default=6, help='Number of dining zones')
+        parser.add_argument('--requests', type=int, default=5000, help='Booking requests in the day')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        allocator = TableAllocator()
+        allocator.load_tables(build_tables(options['tables'], options['zones']))
+        requests = build_requests(options['requests'], day)
+
+        suggest_us = []
+        booked = []
+        for party_size, start, end in requests:
+            began = time.perf_counter()
+            suggestions = allocator.options(party_size, start, end, limit=3)
+            suggest_us.append((time.perf_counter() - began) * 1e6)
+            if suggestions:
+                reservation = {
+                    'reservation_id': f"reservation_{len(booked)}",
+                    'table_ids': suggestions[0]['table_ids'],
+                    'start_time': start,
+                    'end_time': end,
+                    'status': BOOKED,
+                }
+                allocator.apply([reservation])
+                booked.append(reservation)
+
+        checks = [(random.choice(list(allocator.tables)), start, end) for _, start, end in requests[:1000]]
+        began = time.perf_counter()
+        for table_id, start, end in checks:
+            allocator.is_free(table_id, start, end)
+        indexed_us = (time.perf_counter() - began) / len(checks) * 1e6
+        began = time.perf_counter()
+        for table_id, start, end in checks:
+            naive_free(booked, table_id, start, end)
+        naive_us = (time.perf_counter() - began) / len(checks) * 1e6
+
+        joined = sum(1 for reservation in booked if len(reservation['table_ids']) > 1)
+        self.stdout.write(f"tables: {options['tables']}, requests: {len(requests)}, "
+                          f"booked: {len(booked)} ({joined} on joined tables)")
+        self.stdout.write(f"suggest: p50 {percentile(suggest_us, 0.5):.1f} us, "
+                          f"p99 {percentile(suggest_us, 0.99):.1f} us, max {max(suggest_us):.1f} us")
+        self.stdout.write(f"conflict check: indexed {indexed_us:.2f} us, linear scan {naive_us:.2f} us")
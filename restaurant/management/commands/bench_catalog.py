@@ -0,0 +1,195 @@
+import gc
+import multiprocessing
+import random
+import os
+import resource
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+
+from restaurant.catalog_snapshot import CatalogSnapshot, write_snapshot
+from restaurant.catalog_store import CatalogStore
+from restaurant_management.renderers import ORJSONRenderer
+
+CATEGORIES = ['Starters', 'Mains', 'Desserts', 'Drinks', 'Specials', 'Kids', 'Breakfast', 'Sides']
+
+
+def build_catalog(menus, foods, tables):
+    """Documents shaped like find_many results: ObjectIds, datetimes and all"""
+    now = datetime.utcnow()
+    menu_docs = []
+    for i in range(menus):
+        object_id = ObjectId()
+        start = now - timedelta(days=random.randrange(365))
+        menu_docs.append({
+            '_id': object_id,
+            'menu_id': str(object_id),
+            'name': f"Menu {i}",
+            'category': random.choice(CATEGORIES),
+            'start_date': start,
+            'end_date': start + timedelta(days=random.randrange(30, 365)),
+            'created_at': now - timedelta(seconds=i),
+            'updated_at': now - timedelta(seconds=i),
+        })
+    food_docs = []
+    for i in range(foods):
+        object_id = ObjectId()
+        food_docs.append({
+            '_id': object_id,
+            'food_id': str(object_id),
+            'name': f"Food item {i}",
+            'price': round(random.uniform(1, 60), 2),
+            'food_image': f"https://images.example.com/foods/{object_id}.jpg",
+            'menu_id': random.choice(menu_docs)['menu_id'],
+            'created_at': now - timedelta(seconds=i),
+            'updated_at': now - timedelta(seconds=i),
+        })
+    table_docs = []
+    for i in range(tables):
+        object_id = ObjectId()
+        table_docs.append({
+            '_id': object_id,
+            'table_id': str(object_id),
+            'table_number': i + 1,
+            'number_of_guests': random.choice([2, 4, 6, 8]),
+            'zone': f"zone_{i % 6}",
+            'created_at': now,
+            'updated_at': now,
+        })
+    return menu_docs, food_docs, table_docs
+
+
+def rss_mb():
+    """Resident set size of this process, from /proc where available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def anonymous_mb():
+    """Memory not backed by a file, which every worker holds its own copy of; mapped file pages are not counted"""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            return sum(int(line.split()[1]) for line in f if line.startswith('Anonymous:')) / 1024
+    except OSError:
+        return rss_mb()
+
+
+def measure_rss(kind, menus, foods, tables, seed, snapshot, results):
+    """Run in a fresh child: memory growth from holding the catalog as decoded dicts, a store or a mapped snapshot"""
+    random.seed(seed)
+    # Keep the documents as BSON, the way they arrive from MongoDB
+    encoded = [[bson.encode(doc) for doc in docs] for docs in build_catalog(menus, foods, tables)]
+    gc.collect()
+    before, anonymous_before = rss_mb(), anonymous_mb()
+    if kind == 'store':
+        # Decoded one at a time, as the store streams them from a cursor
+        held = CatalogStore()
+        held.build(*((bson.decode(raw) for raw in docs) for docs in encoded))
+    elif kind == 'snapshot':
+        held = CatalogSnapshot(snapshot)
+        # Touch every document, as serving every page would
+        held.food_page()
+    else:
+        held = [[bson.decode(raw) for raw in docs] for docs in encoded]
+    gc.collect()
+    results.put((kind, (rss_mb() - before, anonymous_mb() - anonymous_before)))
+
+
+def percentile(samples, quantile):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark memory and list-page latency of the catalog store and shared snapshot against decoding documents per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--foods', type=int, default=100000)
+        parser.add_argument('--menus', type=int, default=200)
+        parser.add_argument('--tables', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint')
+        parser.add_argument('--per-page', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        menus, foods, tables = options['menus'], options['foods'], options['tables']
+        per_page = options['per_page']
+
+        random.seed(options['seed'])
+        menu_docs, food_docs, table_docs = build_catalog(menus, foods, tables)
+        store = CatalogStore()
+        store.build(menu_docs, food_docs, table_docs)
+        snapshot_dir = tempfile.mkdtemp()
+        snapshot_file = os.path.join(snapshot_dir, 'catalog.snap')
+        write_snapshot(store, snapshot_file, 1)
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        kinds = ('dicts', 'store', 'snapshot')
+        for kind in kinds:
+            child = context.Process(
+                target=measure_rss, args=(kind, menus, foods, tables, options['seed'], snapshot_file, results)
+            )
+            child.start()
+            child.join()
+        held = dict(results.get() for _ in kinds)
+        self.stdout.write(f"catalog: {menus} menus, {foods} foods, {tables} tables")
+        self.stdout.write("memory held per worker (MB):     RSS    own copy")
+        for kind, label in (('dicts', 'decoded dicts'), ('store', 'catalog store'), ('snapshot', 'mapped snapshot')):
+            self.stdout.write(f"  {label:<28} {held[kind][0]:>7.1f} {held[kind][1]:>9.1f}")
+        self.stdout.write(
+            f"snapshot file: {os.path.getsize(snapshot_file) / 2 ** 20:.1f} MB, shared by every worker through the page cache"
+        )
+        stats = store.stats()
+        self.stdout.write(f"encoded JSON held by the store: {stats['encoded_bytes'] / 2 ** 20:.1f} MB")
+
+        # Baseline per request: the page arrives as BSON (MongoDB already filtered and sorted it),
+        # is decoded to dicts and encoded field by field. Network time is left out of both sides.
+        foods_by_menu = {}
+        for food in food_docs:
+            foods_by_menu.setdefault(food['menu_id'], []).append(food)
+        category = menu_docs[0]['category']
+        category_menu_ids = {menu['menu_id'] for menu in menu_docs if menu['category'] == category}
+        category_foods = [food for food in food_docs if food['menu_id'] in category_menu_ids]
+        priced_foods = [food for food in food_docs if 10 <= food['price'] <= 20]
+        busiest_menu = max(foods_by_menu, key=lambda menu_id: len(foods_by_menu[menu_id]))
+        endpoints = [
+            ('foods page 1', food_docs[:per_page], lambda catalog: catalog.food_page(0, per_page)),
+            ('foods page 200', food_docs[199 * per_page:200 * per_page], lambda catalog: catalog.food_page(199 * per_page, per_page)),
+            ('foods by menu', foods_by_menu[busiest_menu][:per_page], lambda catalog: catalog.food_page(0, per_page, menu_id=busiest_menu)),
+            ('foods by category', category_foods[:per_page], lambda catalog: catalog.food_page(0, per_page, category=category)),
+            ('foods by price', priced_foods[:per_page], lambda catalog: catalog.food_page(0, per_page, min_price=10, max_price=20)),
+            ('menus page 1', menu_docs[:per_page], lambda catalog: catalog.menu_page(0, per_page)),
+            ('tables page 1', table_docs[:per_page], lambda catalog: catalog.table_page(0, per_page)),
+        ]
+
+        renderer = ORJSONRenderer()
+        header = f"{'endpoint':<18} {'path':<8} {'p50 us':>9} {'p99 us':>9} {'bytes':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        catalogs = {'store': store, 'snapshot': CatalogSnapshot(snapshot_file)}
+        for name, page_docs, catalog_page in endpoints:
+            encoded_page = [bson.encode(doc) for doc in page_docs]
+            for path in ('decode', 'store', 'snapshot'):
+                samples = []
+                for _ in range(options['requests']):
+                    began = time.perf_counter()
+                    if path == 'decode':
+                        items = [bson.decode(raw) for raw in encoded_page]
+                        total = foods
+                    else:
+                        total, items = catalog_page(catalogs[path])
+                    body = renderer.render({'success': True, 'total_count': total, 'items': items, 'page': 1})
+                    samples.append((time.perf_counter() - began) * 1e6)
+                self.stdout.write(
+                    f"{name:<18} {path:<8} {percentile(samples, 0.5):>9.1f} {percentile(samples, 0.99):>9.1f} {len(body):>8}"
+                )
+        shutil.rmtree(snapshot_dir)
@@ -0,0 +1,99 @@
+import gzip
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from restaurant_management.middleware import brotli
+from restaurant_management.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+def build_order_items_page(rows):
+    """Build a page shaped like the get_order_items response"""
+    now = datetime.utcnow()
+    items = []
+    for i in range(rows):
+        quantity = random.randint(1, 6)
+        unit_price = round(random.uniform(2, 40), 2)
+        items.append({
+            '_id': ObjectId(),
+            'order_item_id': str(ObjectId()),
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total_price': quantity * unit_price,
+            'food_id': str(ObjectId()),
+            'order_id': str(ObjectId()),
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now - timedelta(minutes=i),
+        })
+    return {'success': True, 'total_count': rows * 20, 'order_items': items, 'page': 1, 'per_page': rows}
+
+
+def build_invoices_page(rows):
+    """Build a page shaped like the get_invoices response"""
+    now = datetime.utcnow()
+    invoices = []
+    for i in range(rows):
+        invoices.append({
+            '_id': ObjectId(),
+            'invoice_id': str(ObjectId()),
+            'order_id': str(ObjectId()),
+            'payment_method': random.choice(['CARD', 'CASH', 'UPI', 'NET_BANKING']),
+            'payment_status': random.choice(['PENDING', 'PAID', 'FAILED', 'REFUNDED']),
+            'payment_due_date': (now + timedelta(days=7)).date(),
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now - timedelta(minutes=i),
+        })
+    return {'success': True, 'total_count': rows * 20, 'invoices': invoices, 'page': 1, 'per_page': rows}
+
+
+def stdlib_ready(data):
+    """The stdlib encoder can't handle ObjectId, so stringify it the way the views do"""
+    if isinstance(data, dict):
+        return {k: stdlib_ready(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [stdlib_ready(v) for v in data]
+    if isinstance(data, ObjectId):
+        return str(data)
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark encode time and payload size of each response format on representative pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--iterations', type=int, default=200, help='Encodes per measurement')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        iterations = options['iterations']
+        pages = {
+            'order_items': build_order_items_page(rows),
+            'invoices': build_invoices_page(rows),
+        }
+        renderers = [
+            ('json (stdlib)', JSONRenderer(), True),
+            ('json (orjson)', ORJSONRenderer(), False),
+            ('msgpack', MessagePackRenderer(), False),
+        ]
+
+        header = f"{'page':<12} {'format':<15} {'encode us':>10} {'bytes':>9} {'gzip':>9} {'br':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for page_name, page in pages.items():
+            for name, renderer, needs_stringify in renderers:
+                data = stdlib_ready(page) if needs_stringify else page
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    body = renderer.render(data)
+                elapsed_us = (time.perf_counter() - start) / iterations * 1e6
+
+                gzip_size = len(gzip.compress(body, compresslevel=6))
+                br_size = len(brotli.compress(body, quality=4)) if brotli else '-'
+                self.stdout.write(
+                    f"{page_name:<12} {name:<15} {elapsed_us:>10.1f} {len(body):>9} {gzip_size:>9} {br_size:>9}"
+                )
@@ -0,0 +1,93 @@
+import time
+from types import ModuleType
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.client import FakePayload, RequestFactory
+from django.test.utils import override_settings
+from django.urls import path
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.response import Response
+
+from restaurant_management import settings as full_settings, settings_api
+from restaurant_management.metrics import middleware_latency
+from restaurant_management.middleware_timing import instrument
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+# No rate limit bucket, so the benchmark needs no database
+@throttle_classes([])
+def ping(request):
+    return Response({'success': True}, status=status.HTTP_200_OK)
+
+
+def ping_urlconf():
+    urlconf = ModuleType('bench_middleware_urls')
+    urlconf.urlpatterns = [path('api/ping/', ping)]
+    return urlconf
+
+
+def without_probes(middleware):
+    return [entry for entry in middleware if not entry.startswith('restaurant_management.middleware_timing.')]
+
+
+def percentile(samples, quantile):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request cost of the full and API-only middleware stacks, and of each middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+
+    def run(self, middleware, requests):
+        """Per-request times in microseconds for GET /api/ping/ through a fresh handler with this middleware"""
+        with override_settings(MIDDLEWARE=middleware, ROOT_URLCONF=ping_urlconf()):
+            handler = WSGIHandler()
+            environ = RequestFactory()._base_environ(
+                PATH_INFO='/api/ping/', REQUEST_METHOD='GET', HTTP_HOST='localhost', HTTP_X_RESTAURANT_ID='bench',
+            )
+            samples = []
+            for _ in range(requests):
+                request_environ = dict(environ, **{'wsgi.input': FakePayload(b'')})
+                began = time.perf_counter()
+                response = handler(request_environ, lambda status, headers, exc_info=None: None)
+                b''.join(response)
+                response.close()
+                samples.append((time.perf_counter() - began) * 1e6)
+            return samples
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        profiles = {
+            'full': without_probes(full_settings.MIDDLEWARE),
+            'api': without_probes(settings_api.MIDDLEWARE),
+        }
+        self.stdout.write(f"{requests} requests to a no-op DRF view per profile, handler and response included")
+        header = f"{'profile':<8} {'middleware':>10} {'p50 us':>9} {'p99 us':>9} {'mean us':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        means = {}
+        for name, middleware in profiles.items():
+            # Warm up imports and URL resolution before timing
+            self.run(middleware, 200)
+            samples = self.run(middleware, requests)
+            means[name] = sum(samples) / len(samples)
+            self.stdout.write(
+                f"{name:<8} {len(middleware):>10} {percentile(samples, 0.5):>9.1f} "
+                f"{percentile(samples, 0.99):>9.1f} {means[name]:>9.1f}"
+            )
+        self.stdout.write(f"API-only profile saves {means['full'] - means['api']:.1f} us per request")
+
+        self.stdout.write('')
+        self.stdout.write('Own time per middleware, full profile (us):')
+        middleware_latency.reset()
+        self.run(instrument(profiles['full']), requests)
+        timings = middleware_latency.snapshot().get('middleware', {})
+        for label, stats in sorted(timings.items(), key=lambda item: -item[1]['avg_ms']):
+            flag = '' if label == 'view' or any(entry.endswith(label) for entry in profiles['api']) else '  (dropped by api)'
+            self.stdout.write(f"  {label:<28} {stats['avg_ms'] * 1000:>7.1f}{flag}")
@@ -0,0 +1,79 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from restaurant.serializers import FoodSerializer, InvoiceSerializer, OrderItemSerializer, OrderSerializer
+from restaurant_management.renderers import ORJSONRenderer
+
+
+def build_documents(rows):
+    """Documents shaped like find_many results for each list endpoint"""
+    now = datetime.utcnow()
+    foods, orders, items, invoices = [], [], [], []
+    for i in range(rows):
+        created = now - timedelta(seconds=i, microseconds=random.randrange(1000000))
+        food_id, order_id = str(ObjectId()), str(ObjectId())
+        quantity, unit_price = random.randint(1, 5), round(random.uniform(1, 60), 2)
+        foods.append({
+            '_id': ObjectId(), 'food_id': food_id, 'name': f"Food item {i}", 'price': unit_price,
+            'food_image': None if i % 3 else f"https://images.example.com/foods/{food_id}.jpg",
+            'menu_id': str(ObjectId()), 'created_at': created, 'updated_at': created,
+        })
+        orders.append({
+            '_id': ObjectId(), 'order_id': order_id, 'order_date': created, 'order_day': created.strftime('%Y-%m-%d'),
+            'table_id': str(ObjectId()), 'server_id': None, 'subtotal': quantity * unit_price,
+            'item_count': quantity, 'version': i % 7, 'created_at': created, 'updated_at': created,
+        })
+        items.append({
+            '_id': ObjectId(), 'order_item_id': str(ObjectId()), 'order_id': order_id, 'food_id': food_id,
+            'quantity': quantity, 'food_name': f"Food item {i}", 'menu_id': str(ObjectId()), 'menu_name': 'Dinner',
+            'category': 'Mains', 'unit_price': unit_price, 'total_price': quantity * unit_price,
+            'station': 'grill', 'course': 2, 'kitchen_status': 'queued', 'created_at': created, 'updated_at': created,
+        })
+        invoices.append({
+            '_id': ObjectId(), 'invoice_id': str(ObjectId()), 'order_id': order_id, 'payment_method': 'card',
+            'payment_status': 'PENDING', 'payment_due_date': created + timedelta(days=7),
+            'created_at': created, 'updated_at': created,
+        })
+    return [('foods', FoodSerializer, foods), ('orders', OrderSerializer, orders),
+            ('order items', OrderItemSerializer, items), ('invoices', InvoiceSerializer, invoices)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rows per second of the compiled many=True serializers against the DRF field-by-field path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--pages', type=int, default=500, help='Pages serialized per endpoint and path')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        page_size, pages = options['page_size'], options['pages']
+        renderer = ORJSONRenderer()
+        header = f"{'endpoint':<12} {'drf rows/s':>12} {'fast rows/s':>12} {'speedup':>8}"
+        self.stdout.write(f"{pages} pages of {page_size} rows, serialized and rendered")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, serializer_class, documents in build_documents(page_size):
+            paths = {
+                'drf': lambda: serializers.ListSerializer(documents, child=serializer_class()).data,
+                'fast': lambda: serializer_class(documents, many=True).data,
+            }
+            rendered = {path: renderer.render(serialize()) for path, serialize in paths.items()}
+            if rendered['drf'] != rendered['fast']:
+                raise CommandError(f"{name}: compiled serializer output differs from DRF")
+
+            rates = {}
+            for path, serialize in paths.items():
+                began = time.perf_counter()
+                for _ in range(pages):
+                    renderer.render(serialize())
+                rates[path] = pages * page_size / (time.perf_counter() - began)
+            self.stdout.write(
+                f"{name:<12} {rates['drf']:>12,.0f} {rates['fast']:>12,.0f} {rates['fast'] / rates['drf']:>7.1f}x"
+            )
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed_ms = (time.perf_counter() - start) * 1000
+from restaurant_management.database import mongodb
+print(f"{elapsed_ms:.1f} {int(mongodb.is_connected)}")
+"""
+
+
+class Command(BaseCommand):
+    help = 'Fail if importing the project exceeds the import-time budget or opens a Mongo connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=None, help='Override STARTUP_SETTINGS import budget')
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest modules to list')
+
+    def handle(self, *args, **options):
+        budget_ms = options['budget_ms']
+        if budget_ms is None:
+            budget_ms = getattr(settings, 'STARTUP_SETTINGS', {}).get('import_budget_ms', 1500)
+
+        # Measure in a fresh interpreter, this process has already imported everything
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Import failed:\n{result.stderr[-2000:]}")
+
+        elapsed_ms, connected = result.stdout.split()
+        elapsed_ms = float(elapsed_ms)
+
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        modules = []
+        for line in result.stderr.splitlines():
+            parts = line.split('|')
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            modules.append((int(parts[1]), parts[2].rstrip()))
+        modules.sort(reverse=True)
+
+        self.stdout.write(f"Import time: {elapsed_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+        for cumulative_us, name in modules[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:>8.1f} ms {name}")
+
+        if connected == '1':
+            raise CommandError('A MongoDB connection was opened at import time')
+        if elapsed_ms > budget_ms:
+            raise CommandError(f"Import time {elapsed_ms:.1f} ms exceeds budget of {budget_ms:.0f} ms")
+        self.stdout.write(self.style.SUCCESS('Import time within budget'))
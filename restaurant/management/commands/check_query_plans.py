@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant.models import FoodService, MenuService
+from restaurant_management import tenancy
+from restaurant_management.database import FoodModel, MenuModel
+
+MENU_FILTER_VALUES = {
+    'category': 'Dinner',
+    'active_from': datetime.utcnow(),
+    'active_to': datetime.utcnow() + timedelta(days=7),
+}
+
+FOOD_FILTER_VALUES = {
+    'menu_id': 'sample-menu',
+    'min_price': 5,
+    'max_price': 25,
+}
+
+
+def plan_stages(plan):
+    """Flatten a winning plan into its stage names, outermost first"""
+    stages = [plan.get('stage')]
+    if 'inputStage' in plan:
+        stages += plan_stages(plan['inputStage'])
+    for child in plan.get('inputStages', []):
+        stages += plan_stages(child)
+    return stages
+
+
+def find_stages(plan, name):
+    """Every stage called `name` in a plan tree"""
+    found = [plan] if plan.get('stage') == name else []
+    for child in [plan.get('inputStage'), *plan.get('inputStages', [])]:
+        if child:
+            found += find_stages(child, name)
+    return found
+
+
+def is_bounded(bounds):
+    """False for a field an index scan walks end to end"""
+    return bounds not in (['[MinKey, MaxKey]'], ['[MaxKey, MinKey]'])
+
+
+def unbounded_fields(plan, fields):
+    """
+    Filter fields that are not constrained by the bounds of every index scan
+    in the plan. An index picked only for the created_at sort walks its whole
+    range and leaves the filter to FETCH, so it bounds none of them.
+    """
+    scans = find_stages(plan, 'IXSCAN')
+    if not scans:
+        return list(fields)
+    return [
+        field for field in fields
+        if not all(is_bounded(scan.get('indexBounds', {}).get(field, ['[MinKey, MaxKey]'])) for scan in scans)
+    ]
+
+
+def winning_plan(model, filter_dict, sort):
+    explain = model.collection.find(model.scope(filter_dict)).sort(sort).limit(10).explain()
+    plan = explain['queryPlanner']['winningPlan']
+    # Slot-based engine plans nest the classic plan under queryPlan
+    return plan.get('queryPlan', plan)
+
+
+class Command(BaseCommand):
+    help = 'Explain every menu and food list filter combination and fail unless an index bounds every filter field'
+
+    def check(self, label, model, filter_dict, sort):
+        if not filter_dict:
+            return True
+        plan = winning_plan(model, filter_dict, sort)
+        stages = plan_stages(plan)
+        unbounded = unbounded_fields(plan, [field for field in model.scope(filter_dict) if not field.startswith('$')])
+        index_backed = not unbounded
+        style = self.style.SUCCESS if index_backed else self.style.ERROR
+        detail = ' <- '.join(stages) + (f" (not bounded: {', '.join(unbounded)})" if unbounded else '')
+        self.stdout.write(style(f"{'ok  ' if index_backed else 'SCAN'} {label:<50} {detail}"))
+        return index_backed
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant-id', help='Restaurant whose queries to explain (default: the first one found)')
+
+    def handle(self, *args, **options):
+        restaurant_id = options['restaurant_id']
+        if restaurant_id is None and tenancy.is_enabled():
+            restaurant_ids = tenancy.restaurant_ids()
+            if not restaurant_ids:
+                raise CommandError('No restaurants found, pass --restaurant-id')
+            restaurant_id = restaurant_ids[0]
+        with tenancy.use_restaurant(restaurant_id):
+            self.check_all()
+
+    def check_all(self):
+        sort = [('created_at', -1)]
+        failures = 0
+
+        menu_fields = list(MENU_FILTER_VALUES)
+        for size in range(1, len(menu_fields) + 1):
+            for fields in combinations(menu_fields, size):
+                filter_dict = MenuService.build_filter(**{field: MENU_FILTER_VALUES[field] for field in fields})
+                if not self.check(f"menus: {', '.join(fields)}", MenuModel, filter_dict, sort):
+                    failures += 1
+
+        # Category and active window filters are resolved to menu_id lists,
+        # so every food filter reduces to a mix of menu_id and price
+        food_fields = list(FOOD_FILTER_VALUES)
+        for size in range(1, len(food_fields) + 1):
+            for fields in combinations(food_fields, size):
+                filter_dict = FoodService.build_filter(**{field: FOOD_FILTER_VALUES[field] for field in fields})
+                if not self.check(f"foods: {', '.join(fields)}", FoodModel, filter_dict, sort):
+                    failures += 1
+        in_filter = {'menu_id': {'$in': ['menu-a', 'menu-b']}, 'price': {'$gte': 5, '$lte': 25}}
+        if not self.check('foods: category/active window + price', FoodModel, in_filter, sort):
+            failures += 1
+
+        if failures:
+            raise CommandError(f"{failures} filter combination(s) are not bounded by an index, run ensure_indexes")
+        self.stdout.write(self.style.SUCCESS('Every filter combination is bounded by an index'))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant_management import tenancy
+from restaurant_management.database import MongoBaseModel, mongodb
+
+
+class Command(BaseCommand):
+    help = 'Create the declared MongoDB indexes and optionally shard collections by restaurant_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant-id', action='append', default=[],
+            help='Restaurant whose database to index (repeatable, needed for per-tenant database routing)'
+        )
+        parser.add_argument('--shard', action='store_true', help='Shard tenant collections on the shard key')
+
+    def handle(self, *args, **options):
+        restaurant_ids = options['restaurant_id']
+        if tenancy.is_enabled() and tenancy.routing() == 'database':
+            if options['shard']:
+                raise CommandError('--shard only applies to shared routing')
+            restaurant_ids = restaurant_ids or tenancy.restaurant_ids()
+            if not restaurant_ids:
+                raise CommandError('Per-tenant database routing needs at least one --restaurant-id')
+        else:
+            restaurant_ids = [None]
+
+        if options['shard']:
+            mongodb.client.admin.command('enableSharding', settings.MONGODB_SETTINGS['db_name'])
+
+        for restaurant_id in restaurant_ids:
+            # With shared routing one pass indexes every restaurant's documents
+            with tenancy.use_restaurant(restaurant_id), tenancy.unscoped():
+                for model in MongoBaseModel.registry:
+                    names = model.ensure_indexes(shard=options['shard'])
+                    self.stdout.write(f"{model.collection.full_name}: {', '.join(names)}")
+                    if options['shard'] and model.tenant_scoped and tenancy.is_enabled():
+                        mongodb.client.admin.command(
+                            'shardCollection', model.collection.full_name, key=dict(model.shard_key())
+                        )
+                        self.stdout.write(f"  sharded on {dict(model.shard_key())}")
+
+        self.stdout.write(self.style.SUCCESS('Indexes are up to date'))
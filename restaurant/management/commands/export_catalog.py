@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant import catalog
+from restaurant_management import tenancy
+
+
+class Command(BaseCommand):
+    help = 'Stream menus or foods to CSV or NDJSON in the import_catalog format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=('menus', 'foods'))
+        parser.add_argument('--format', choices=('csv', 'ndjson'), default='csv')
+        parser.add_argument('--output', help='Output file (default: stdout)')
+        parser.add_argument('--restaurant-id', default=None, help='Restaurant to export')
+
+    def handle(self, *args, **options):
+        if tenancy.is_enabled() and not options['restaurant_id']:
+            raise CommandError('--restaurant-id is required when tenancy is enabled')
+        with tenancy.use_restaurant(options['restaurant_id']):
+            lines = catalog.export_lines(options['kind'], options['format'])
+            if options['output']:
+                with open(options['output'], 'wb') as f:
+                    f.writelines(lines)
+            else:
+                sys.stdout.buffer.writelines(lines)
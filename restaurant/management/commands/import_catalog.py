@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant import catalog
+from restaurant_management import tenancy
+
+
+class Command(BaseCommand):
+    help = 'Upsert menus and foods from CSV, NDJSON or JSON files, matched by natural key'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menus', help='Menus file (name, category, start_date, end_date)')
+        parser.add_argument('--foods', help='Foods file (name, price, food_image, menu or menu_id)')
+        parser.add_argument('--format', choices=catalog.FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Override CATALOG_SETTINGS import_batch_size')
+        parser.add_argument('--restaurant-id', default=None, help='Restaurant to import into')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing')
+
+    def handle(self, *args, **options):
+        if tenancy.is_enabled() and not options['restaurant_id']:
+            raise CommandError('--restaurant-id is required when tenancy is enabled')
+        if not options['menus'] and not options['foods']:
+            raise CommandError('Pass --menus and/or --foods')
+
+        failed = 0
+        with tenancy.use_restaurant(options['restaurant_id']):
+            # Menus first so foods can reference menus from the same run
+            for kind in ('menus', 'foods'):
+                path = options[kind]
+                if not path:
+                    continue
+                start = time.perf_counter()
+                with open(path, 'rb') as f:
+                    rows = catalog.read_rows(f, options['format'] or catalog.format_for(path), kind=kind)
+                    report = catalog.import_rows(kind, rows, batch_size=options['batch_size'], dry_run=options['dry_run'])
+                elapsed = time.perf_counter() - start
+
+                for error in report.errors:
+                    self.stderr.write(f"{kind} row {error['row']}: {error['error']}")
+                if report.failed > len(report.errors):
+                    self.stderr.write(f"... {report.failed - len(report.errors)} more {kind} error(s)")
+                self.stdout.write(self.style.SUCCESS(
+                    f"{kind}: {report.rows} row(s) in {elapsed:.1f}s, {report.inserted} inserted, "
+                    f"{report.updated} updated, {report.failed} failed"
+                ))
+                failed += report.failed
+        if failed:
+            raise CommandError(f"{failed} row(s) failed")
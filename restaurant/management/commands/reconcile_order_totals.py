@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from restaurant import tasks
+from restaurant_management import tenancy
+
+
+class Command(BaseCommand):
+    help = "Check each order's subtotal and item_count against its items and repair drifted totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order-day', help='Only orders from this day, YYYY-MM-DD')
+        parser.add_argument('--restaurant-id', action='append', default=[], help='Restaurant to check (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Report mismatches without fixing them')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--enqueue', action='store_true', help='Queue the check for a job worker instead of running it here')
+
+    def handle(self, *args, **options):
+        kwargs = {'order_day': options['order_day'], 'fix': not options['dry_run'], 'batch_size': options['batch_size']}
+        for restaurant_id in options['restaurant_id'] or tenancy.restaurant_ids():
+            label = f" for {restaurant_id}" if restaurant_id else ''
+            with tenancy.use_restaurant(restaurant_id):
+                if options['enqueue']:
+                    job_id = tasks.reconcile_order_totals.apply_async(kwargs=kwargs)
+                    self.stdout.write(self.style.SUCCESS(f"Queued job {job_id}{label}"))
+                    continue
+                result = tasks.reconcile_order_totals(**kwargs)
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['checked']} order(s) checked{label}, {result['mismatched']} mismatched, {result['fixed']} fixed"
+            ))
@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+
+from restaurant_management import jobs
+from restaurant_management.database import mongodb
+
+
+def work(max_jobs, exit_when_idle):
+    """One worker loop; SIGTERM or Ctrl-C stops it after the current job"""
+    worker = jobs.Worker()
+
+    def stop(signum, frame):
+        worker.stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    return worker.run(max_jobs=max_jobs, exit_when_idle=exit_when_idle)
+
+
+def work_in_child(max_jobs, exit_when_idle):
+    # Forked children must not reuse the parent's MongoClient sockets
+    mongodb.reset()
+    work(max_jobs, exit_when_idle)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after this many jobs per worker')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        # Register every app's tasks.py before claiming jobs
+        autodiscover_modules('tasks')
+
+        if options['workers'] <= 1:
+            processed = work(options['max_jobs'], options['once'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
+            return
+
+        processes = [
+            multiprocessing.Process(target=work_in_child, args=(options['max_jobs'], options['once']))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(signum, frame):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS(f"{len(processes)} worker(s) stopped"))
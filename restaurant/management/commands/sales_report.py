@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from restaurant import reports
+from restaurant_management import tenancy
+
+
+class Command(BaseCommand):
+    help = 'Build per-outlet, per-server, per-food and payment-method sales reports in parallel, one shard per day'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='First day, YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', help='Last day, YYYY-MM-DD (default: --from)')
+        parser.add_argument('--output-dir', help='Report directory (default: REPORT_OUTPUT_DIR/<from>_<to>)')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+        parser.add_argument('--restaurant-id', action='append', default=[], help='Restaurant to report on (repeatable)')
+        parser.add_argument('--force', action='store_true', help='Rebuild shards that were already written')
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start'])
+        end = parse_date(options['end']) if options['end'] else start
+        if start is None or end is None:
+            raise CommandError('--from and --to must be YYYY-MM-DD')
+        if end < start:
+            raise CommandError('--to must not be before --from')
+
+        output_dir = options['output_dir'] or os.path.join(
+            reports.report_settings().get('output_dir', 'reports'), f"{start}_{end}"
+        )
+        report = reports.run_report(
+            start, end, output_dir,
+            restaurant_ids=options['restaurant_id'] or tenancy.restaurant_ids(),
+            workers=options['workers'],
+            force=options['force'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.get('orders', 0)} order(s), gross sales {report.get('gross_sales', 0):.2f}, "
+            f"tax {report.get('tax', 0):.2f}. Report written to {output_dir}"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from restaurant_management import warmup
+
+
+class Command(BaseCommand):
+    help = 'Pre-open Mongo pool connections and prime hot caches'
+
+    def handle(self, *args, **options):
+        timings = warmup.run()
+        for step, elapsed_ms in timings.items():
+            self.stdout.write(f"{step:<20} {elapsed_ms:>8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Warm-up finished in {sum(timings.values()):.1f} ms"))
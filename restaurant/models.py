@@ -1,7 +1,96 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta, timezone
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from django.utils.dateparse import parse_date, parse_datetime
+from restaurant_management import read_cache, tenancy, warmup
 from restaurant_management.database import (
-    MenuModel, FoodModel, TableModel, OrderModel, OrderItemModel, InvoiceModel
+    mongodb, MenuModel, FoodModel, TableModel, OrderModel, OrderItemModel, InvoiceModel,
+    OrderArchiveModel, OrderItemArchiveModel, InvoiceArchiveModel, ReservationModel, SalesRollupModel
 )
+from . import allocation, catalog_store, kitchen, search, tasks
+
+
+PAYMENT_METHODS = ('CARD', 'CASH', 'UPI', 'NET_BANKING')
+PAYMENT_STATUSES = ('PENDING', 'PAID', 'FAILED', 'REFUNDED')
+
+
+def parse_datetime_value(value, field):
+    """Accept datetimes, dates or ISO strings and return a datetime BSON can store"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None and isinstance(value, str):
+        parsed_date = parse_date(value)
+        parsed = datetime.combine(parsed_date, time.min) if parsed_date else None
+    if parsed is None:
+        raise ValueError(f"{field} must be an ISO 8601 date or datetime")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def order_day(order_date):
+    """Day bucket an order belongs to, e.g. '2024-01-31'"""
+    return order_date.strftime('%Y-%m-%d')
+
+
+def food_snapshots(food_ids, foods=None):
+    """
+    What an order item records about each food: name, menu, category and
+    catalog price. One batched food lookup (skipped when `foods` is passed)
+    and one batched menu lookup.
+    """
+    if foods is None:
+        foods = {
+            food['food_id']: food
+            for food in FoodModel.find_many(
+                {'food_id': {'$in': list(food_ids)}}, projection={'food_id': 1, 'name': 1, 'price': 1, 'menu_id': 1}
+            )
+        }
+    menus = {
+        menu['menu_id']: menu
+        for menu in MenuModel.find_many(
+            {'menu_id': {'$in': list({food.get('menu_id') for food in foods.values()})}},
+            projection={'menu_id': 1, 'name': 1, 'category': 1}
+        )
+    }
+    snapshots = {}
+    for food_id in food_ids:
+        food = foods.get(food_id)
+        if food is None:
+            continue
+        menu = menus.get(food.get('menu_id'), {})
+        snapshots[food_id] = {
+            'food_name': food.get('name'),
+            'menu_id': food.get('menu_id'),
+            'menu_name': menu.get('name'),
+            'category': menu.get('category'),
+            'unit_price': round(float(food['price']), 2),
+        }
+    return snapshots
+
+
+def snapshot_items(items, foods=None):
+    """Copy the food snapshot, including the server-side price, onto new order items"""
+    snapshots = food_snapshots({item['food_id'] for item in items}, foods)
+    for item in items:
+        snapshot = snapshots.get(item['food_id'])
+        if snapshot is None:
+            raise ValueError(f"Food item not found: {item['food_id']}")
+        item.update(snapshot)
+    return items
+
+
+def find_with_archive(live_model, archive_model, ids, profile=None):
+    """Batch lookup by IDs in the live collection, then in the archive for the misses"""
+    documents = live_model.find_by_ids(ids, profile=profile)
+    missing = [document_id for document_id, document in zip(ids, documents) if document is None]
+    if missing:
+        archived = dict(zip(missing, archive_model.find_by_ids(missing, profile=profile)))
+        documents = [document or archived.get(document_id) for document_id, document in zip(ids, documents)]
+    return documents
 
 
 class MenuService:
@@ -11,12 +100,18 @@ class MenuService:
         menu_data = {
             'name': data['name'],
             'category': data['category'],
-            'start_date': data['start_date'],
-            'end_date': data['end_date'],
+            'start_date': parse_datetime_value(data['start_date'], 'start_date'),
+            'end_date': parse_datetime_value(data['end_date'], 'end_date'),
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        return MenuModel.create(menu_data)
+        try:
+            menu_id = MenuModel.create(menu_data)
+        except DuplicateKeyError:
+            raise ValueError(f"A menu named {data['name']} already exists")
+        search.menu_changed(menu_data)
+        catalog_store.menu_changed(menu_data)
+        return menu_id
     
     @staticmethod
     def get_menu(menu_id):
@@ -24,25 +119,68 @@ class MenuService:
         return MenuModel.find_one({'menu_id': menu_id})
     
     @staticmethod
-    def get_menus(skip=0, limit=None, sort=None):
+    def get_menus_by_ids(ids):
+        """Menus for a list of IDs in request order, None for misses"""
+        return MenuModel.find_by_ids(ids, profile='catalog_read', cache=read_cache.get_read_cache())
+    
+    @staticmethod
+    def build_filter(category=None, active_from=None, active_to=None):
+        """Mongo filter for menus in a category and/or active at some point in [active_from, active_to]"""
+        filter_dict = {}
+        if category:
+            filter_dict['category'] = category
+        if active_to is not None:
+            filter_dict['start_date'] = {'$lte': active_to}
+        if active_from is not None:
+            filter_dict['end_date'] = {'$gte': active_from}
+        return filter_dict
+    
+    @staticmethod
+    def get_menus(skip=0, limit=None, sort=None, filters=None):
         """Get all menus with pagination"""
         if sort is None:
             sort = [('created_at', -1)]
-        return MenuModel.find_many(skip=skip, limit=limit, sort=sort)
+        return MenuModel.find_many(filters, skip=skip, limit=limit, sort=sort, profile='catalog_read')
     
     @staticmethod
-    def count_menus():
+    def count_menus(filters=None):
         """Count total menus"""
-        return MenuModel.count()
+        return MenuModel.count(filters, profile='catalog_read')
+    
+    @staticmethod
+    def page_menus(skip=0, limit=None, category=None, active_from=None, active_to=None):
+        """(total_count, menus) for one list page, from the in-memory catalog store when it is enabled"""
+        if catalog_store.is_enabled():
+            return catalog_store.get_store().menu_page(skip, limit, category, active_from, active_to)
+        menu_filter = MenuService.build_filter(category, active_from, active_to)
+        return MenuService.count_menus(menu_filter), MenuService.get_menus(skip=skip, limit=limit, filters=menu_filter)
     
     @staticmethod
     def update_menu(menu_id, data):
         """Update a menu"""
+        for field in ('start_date', 'end_date'):
+            if field in data:
+                data[field] = parse_datetime_value(data[field], field)
         data['updated_at'] = datetime.utcnow()
-        return MenuModel.update_one({'menu_id': menu_id}, data)
+        try:
+            updated = MenuModel.update_one({'menu_id': menu_id}, data)
+        except DuplicateKeyError:
+            raise ValueError(f"A menu named {data.get('name')} already exists")
+        read_cache.invalidate(MenuModel, [menu_id])
+        if updated:
+            menu = MenuModel.find_one({'menu_id': menu_id})
+            if 'category' in data:
+                search.menu_changed(menu)
+            catalog_store.menu_changed(menu)
+        return updated
 
 
 class FoodService:
+    @staticmethod
+    def search_foods(query, limit=10):
+        """Type-ahead search over food names and menu categories"""
+        return search.search_foods(query, limit=limit)
+    
     @staticmethod
     def create_food(data):
         """Create a new food item"""
@@ -54,7 +192,13 @@ class FoodService:
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        return FoodModel.create(food_data)
+        try:
+            food_id = FoodModel.create(food_data)
+        except DuplicateKeyError:
+            raise ValueError(f"The menu already has a food named {data['name']}")
+        search.food_changed(food_data)
+        catalog_store.food_changed(food_data)
+        return food_id
     
     @staticmethod
     def get_food(food_id):
@@ -62,16 +206,55 @@ class FoodService:
         return FoodModel.find_one({'food_id': food_id})
     
     @staticmethod
-    def get_foods(skip=0, limit=None, sort=None):
+    def get_foods_by_ids(ids):
+        """Foods for a list of IDs in request order, None for misses"""
+        return FoodModel.find_by_ids(ids, profile='catalog_read', cache=read_cache.get_read_cache())
+    
+    @staticmethod
+    def build_filter(menu_id=None, min_price=None, max_price=None, category=None, active_from=None, active_to=None):
+        """
+        Mongo filter for foods. Category and active window are menu fields,
+        so they are resolved to a menu_id list with one indexed menu query.
+        """
+        filter_dict = {}
+        menu_ids = None
+        if category or active_from is not None or active_to is not None:
+            menu_filter = MenuService.build_filter(category, active_from, active_to)
+            menus = MenuModel.find_many(menu_filter, profile='catalog_read', projection={'menu_id': 1})
+            menu_ids = [menu['menu_id'] for menu in menus]
+        if menu_id:
+            menu_ids = [menu_id] if menu_ids is None or menu_id in menu_ids else []
+        if menu_ids is not None:
+            filter_dict['menu_id'] = menu_ids[0] if len(menu_ids) == 1 else {'$in': menu_ids}
+
+        price_range = {}
+        if min_price is not None:
+            price_range['$gte'] = float(min_price)
+        if max_price is not None:
+            price_range['$lte'] = float(max_price)
+        if price_range:
+            filter_dict['price'] = price_range
+        return filter_dict
+    
+    @staticmethod
+    def get_foods(skip=0, limit=None, sort=None, filters=None):
         """Get all foods with pagination"""
         if sort is None:
             sort = [('created_at', -1)]
-        return FoodModel.find_many(skip=skip, limit=limit, sort=sort)
+        return FoodModel.find_many(filters, skip=skip, limit=limit, sort=sort, profile='catalog_read')
     
     @staticmethod
-    def count_foods():
+    def count_foods(filters=None):
         """Count total foods"""
-        return FoodModel.count()
+        return FoodModel.count(filters, profile='catalog_read')
+    
+    @staticmethod
+    def page_foods(skip=0, limit=None, **filters):
+        """(total_count, foods) for one list page, from the in-memory catalog store when it is enabled"""
+        if catalog_store.is_enabled():
+            return catalog_store.get_store().food_page(skip, limit, **filters)
+        food_filter = FoodService.build_filter(**filters)
+        return FoodService.count_foods(food_filter), FoodService.get_foods(skip=skip, limit=limit, filters=food_filter)
     
     @staticmethod
     def update_food(food_id, data):
@@ -79,7 +262,16 @@ class FoodService:
         if 'price' in data:
             data['price'] = float(data['price'])
         data['updated_at'] = datetime.utcnow()
-        return FoodModel.update_one({'food_id': food_id}, data)
+        try:
+            updated = FoodModel.update_one({'food_id': food_id}, data)
+        except DuplicateKeyError:
+            raise ValueError(f"The menu already has a food named {data.get('name')}")
+        read_cache.invalidate(FoodModel, [food_id])
+        if updated:
+            food = FoodModel.find_one({'food_id': food_id})
+            search.food_changed(food)
+            catalog_store.food_changed(food)
+        return updated
 
 
 class TableService:
@@ -89,51 +281,218 @@ class TableService:
         table_data = {
             'table_number': data['table_number'],
             'number_of_guests': data['number_of_guests'],
+            'zone': data.get('zone'),
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        return TableModel.create(table_data)
+        table_id = TableModel.create(table_data)
+        allocation.tables_changed()
+        catalog_store.table_changed(table_data)
+        return table_id
     
     @staticmethod
     def get_table(table_id):
         """Get a table by ID"""
         return TableModel.find_one({'table_id': table_id})
     
+    @staticmethod
+    def get_tables_by_ids(ids):
+        """Tables for a list of IDs in request order, None for misses"""
+        return TableModel.find_by_ids(ids, profile='catalog_read', cache=read_cache.get_read_cache())
+    
     @staticmethod
     def get_tables(skip=0, limit=None, sort=None):
         """Get all tables with pagination"""
         if sort is None:
             sort = [('table_number', 1)]
-        return TableModel.find_many(skip=skip, limit=limit, sort=sort)
+        return TableModel.find_many(skip=skip, limit=limit, sort=sort, profile='catalog_read')
     
     @staticmethod
     def count_tables():
         """Count total tables"""
-        return TableModel.count()
+        return TableModel.count(profile='catalog_read')
+    
+    @staticmethod
+    def page_tables(skip=0, limit=None):
+        """(total_count, tables) for one list page, from the in-memory catalog store when it is enabled"""
+        if catalog_store.is_enabled():
+            return catalog_store.get_store().table_page(skip, limit)
+        return TableService.count_tables(), TableService.get_tables(skip=skip, limit=limit)
     
     @staticmethod
     def update_table(table_id, data):
         """Update a table"""
         data['updated_at'] = datetime.utcnow()
-        return TableModel.update_one({'table_id': table_id}, data)
+        updated = TableModel.update_one({'table_id': table_id}, data)
+        read_cache.invalidate(TableModel, [table_id])
+        allocation.tables_changed()
+        if updated:
+            catalog_store.table_changed(TableModel.find_one({'table_id': table_id}))
+        return updated
+
+
+class ReservationService:
+    @staticmethod
+    def parse_window(data):
+        """Reservation start and end; the end defaults to start plus duration_minutes"""
+        if not data.get('start_time'):
+            raise ValueError('start_time is required')
+        start_time = parse_datetime_value(data['start_time'], 'start_time')
+        if data.get('end_time'):
+            end_time = parse_datetime_value(data['end_time'], 'end_time')
+        else:
+            duration = int(data.get('duration_minutes') or
+                           allocation.allocation_settings().get('default_duration_minutes', 90))
+            end_time = start_time + timedelta(minutes=duration)
+        if end_time <= start_time:
+            raise ValueError('end_time must be after start_time')
+        return start_time, end_time
+
+    @staticmethod
+    def parse_party_size(value):
+        try:
+            party_size = int(value)
+        except (TypeError, ValueError):
+            raise ValueError('party_size must be a number')
+        if party_size < 1 or party_size > 100:
+            raise ValueError('party_size must be between 1 and 100')
+        return party_size
+
+    @staticmethod
+    def suggest_tables(party_size, start_time, end_time, limit=3):
+        """Best free tables or joined tables for a party"""
+        return allocation.get_allocator().suggest(party_size, start_time, end_time, limit=limit)
+
+    @staticmethod
+    def create_reservation(data):
+        """
+        Book tables for a party. Without table_ids the best suggestion is
+        used. The conflict check runs in a transaction that also writes every
+        booked table, so concurrent bookings of the same table cannot both
+        succeed.
+        """
+        party_size = ReservationService.parse_party_size(data.get('party_size'))
+        start_time, end_time = ReservationService.parse_window(data)
+        table_ids = data.get('table_ids')
+        if not table_ids:
+            suggestions = ReservationService.suggest_tables(party_size, start_time, end_time, limit=1)
+            if not suggestions:
+                raise ValueError(f"No free table seats {party_size} guests at that time")
+            table_ids = suggestions[0]['table_ids']
+
+        now = datetime.utcnow()
+        reservation_data = {
+            'table_ids': list(table_ids),
+            'party_size': party_size,
+            'start_time': start_time,
+            'end_time': end_time,
+            'name': data.get('name'),
+            'phone': data.get('phone'),
+            'status': allocation.SEATED if data.get('seated') else allocation.BOOKED,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        def book(session):
+            seats = 0
+            for table_id in reservation_data['table_ids']:
+                table = TableModel.find_one_and_update(
+                    {'table_id': table_id}, {'$inc': {'reservation_version': 1}}, session=session
+                )
+                if table is None:
+                    raise ValueError(f"Table not found: {table_id}")
+                seats += int(table.get('number_of_guests') or 0)
+            if seats < party_size:
+                raise ValueError(f"Tables seat {seats} guests, party_size is {party_size}")
+            conflict = ReservationModel.find_one({
+                'table_ids': {'$in': reservation_data['table_ids']},
+                'status': {'$in': list(allocation.ACTIVE_STATUSES)},
+                'start_time': {'$lt': end_time},
+                'end_time': {'$gt': start_time},
+            }, session=session)
+            if conflict:
+                raise ValueError(
+                    f"Table already reserved from {conflict['start_time'].isoformat()} to {conflict['end_time'].isoformat()}"
+                )
+            reservation = dict(reservation_data)
+            ReservationModel.create(reservation, session=session)
+            return reservation
+
+        # On a standalone server the check and the write are not atomic; see README
+        reservation = mongodb.run_transaction(book, fallback=True)
+        allocation.reservations_changed([reservation])
+        return reservation
+
+    @staticmethod
+    def get_reservation(reservation_id):
+        """Get a reservation by ID"""
+        return ReservationModel.find_one({'reservation_id': reservation_id})
+
+    @staticmethod
+    def get_reservations(day, skip=0, limit=None):
+        """Reservations starting on one day, in start order"""
+        start = datetime.combine(day, time.min)
+        return ReservationModel.find_many(
+            {'start_time': {'$gte': start, '$lt': start + timedelta(days=1)}},
+            skip=skip, limit=limit, sort=[('start_time', 1)]
+        )
+
+    @staticmethod
+    def update_status(reservation_id, status):
+        """
+        Move a reservation to SEATED, COMPLETED or CANCELLED. Completing a
+        reservation early frees its tables from now on.
+        """
+        allowed_from = {
+            allocation.SEATED: [allocation.BOOKED],
+            allocation.COMPLETED: [allocation.SEATED],
+            allocation.CANCELLED: [allocation.BOOKED, allocation.SEATED],
+        }
+        if status not in allowed_from:
+            raise ValueError(f"status must be one of {', '.join(allowed_from)}")
+        now = datetime.utcnow()
+        update = {'status': status, 'updated_at': now}
+        if status == allocation.COMPLETED:
+            reservation = ReservationModel.find_one({'reservation_id': reservation_id})
+            if reservation and reservation['end_time'] > now:
+                update['end_time'] = now
+        reservation = ReservationModel.find_one_and_update(
+            {'reservation_id': reservation_id, 'status': {'$in': allowed_from[status]}}, {'$set': update}
+        )
+        if reservation is not None:
+            allocation.reservations_changed([reservation])
+        return reservation
 
 
 class OrderService:
     @staticmethod
     def create_order(data):
         """Create a new order"""
+        order_date = parse_datetime_value(data.get('order_date') or datetime.utcnow(), 'order_date')
         order_data = {
-            'order_date': data['order_date'],
+            'order_date': order_date,
+            'order_day': order_day(order_date),
             'table_id': data.get('table_id'),
+            'server_id': data.get('server_id'),
+            'subtotal': 0.0,
+            'item_count': 0,
+            'version': 0,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        return OrderModel.create(order_data)
+        order_id = OrderModel.create(order_data)
+        tasks.add_to_rollup(order_data['order_day'], orders=1)
+        return order_id
     
     @staticmethod
     def get_order(order_id):
-        """Get an order by ID"""
-        return OrderModel.find_one({'order_id': order_id})
+        """Get an order by ID, falling back to the archive"""
+        return OrderModel.find_one({'order_id': order_id}) or OrderArchiveModel.find_one({'order_id': order_id})
+    
+    @staticmethod
+    def get_orders_by_ids(ids):
+        """Orders for a list of IDs in request order, None for misses, falling back to the archive"""
+        return find_with_archive(OrderModel, OrderArchiveModel, ids)
     
     @staticmethod
     def get_orders(skip=0, limit=None, sort=None):
@@ -147,35 +506,176 @@ class OrderService:
         """Count total orders"""
         return OrderModel.count()
     
+    @staticmethod
+    def build_history_filter(start, end, table_id=None):
+        """
+        Filter for orders with start <= order_date < end. The order_day
+        bucket list keeps the scan on the touched days' index entries only.
+        """
+        days = []
+        day = start.date()
+        last_day = (end - timedelta(microseconds=1)).date()
+        while day <= last_day:
+            days.append(day.strftime('%Y-%m-%d'))
+            day += timedelta(days=1)
+        filter_dict = {
+            'order_day': days[0] if len(days) == 1 else {'$in': days},
+            'order_date': {'$gte': start, '$lt': end},
+        }
+        if table_id:
+            filter_dict['table_id'] = table_id
+        return filter_dict
+    
+    @staticmethod
+    def iter_order_history(start, end, table_id=None, include_items=False, batch_size=500):
+        """Stream orders in a date range oldest first, optionally with their items"""
+        filter_dict = OrderService.build_history_filter(start, end, table_id)
+        # The cursor is opened now, while the request's restaurant scope is active
+        orders = OrderModel.iter_many(filter_dict, sort=[('order_date', 1)], batch_size=batch_size, profile='report_read')
+        if not include_items:
+            return orders
+        return OrderService._with_items(orders, batch_size, tenancy.get_restaurant_id())
+    
+    @staticmethod
+    def _with_items(orders, batch_size, restaurant_id):
+        """Attach items to streamed orders with one $in lookup per batch"""
+        with tenancy.use_restaurant(restaurant_id):
+            batch = []
+            for order in orders:
+                batch.append(order)
+                if len(batch) == batch_size:
+                    yield from OrderService._attach_items(batch)
+                    batch = []
+            if batch:
+                yield from OrderService._attach_items(batch)
+    
+    @staticmethod
+    def _attach_items(orders):
+        items_by_order = {}
+        order_ids = [order['order_id'] for order in orders]
+        for item in OrderItemModel.find_many({'order_id': {'$in': order_ids}}, profile='report_read'):
+            items_by_order.setdefault(item['order_id'], []).append(item)
+        for order in orders:
+            order['order_items'] = items_by_order.get(order['order_id'], [])
+        return orders
+    
+    @staticmethod
+    def get_daily_sales(start_day, end_day):
+        """Sales rollups for order days in [start_day, end_day], moved by every order and item write"""
+        return SalesRollupModel.find_many(
+            {'order_day': {'$gte': order_day(start_day), '$lte': order_day(end_day)}},
+            sort=[('order_day', 1)], profile='report_read'
+        )
+    
+    @staticmethod
+    def get_order_totals(order_id):
+        """Subtotal and item count kept on the order itself, so no items are read"""
+        projection = {'order_id': 1, 'subtotal': 1, 'item_count': 1, 'version': 1}
+        order = (
+            OrderModel.find_one({'order_id': order_id}, projection=projection)
+            or OrderArchiveModel.find_one({'order_id': order_id}, projection=projection)
+        )
+        if order is None:
+            return None
+        return {
+            'order_id': order['order_id'],
+            'subtotal': round(order.get('subtotal') or 0.0, 2),
+            'item_count': order.get('item_count') or 0,
+            'version': order.get('version') or 0,
+        }
+    
+    @staticmethod
+    def apply_item_delta(order_id, amount, quantity, session=None):
+        """
+        Move an order's subtotal and item_count by an item change and bump its
+        version. Called right after the item write; the $inc is atomic.
+        """
+        order = OrderModel.find_one_and_update({'order_id': order_id}, {
+            '$inc': {'subtotal': amount, 'item_count': quantity, 'version': 1},
+            '$set': {'updated_at': datetime.utcnow()},
+        }, profile='fast_write', session=session)
+        if order is None:
+            raise ValueError(f"Order not found: {order_id}")
+        return order
+    
+    @staticmethod
+    def touch_order(order_id):
+        """Bump an order's version after its invoice changed, so cached bills are rebuilt"""
+        OrderModel.update_many(
+            {'order_id': order_id}, {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}}
+        )
+    
     @staticmethod
     def update_order(order_id, data):
         """Update an order"""
+        # Totals only move with their items
+        for field in ('subtotal', 'item_count', 'version'):
+            data.pop(field, None)
+        if 'order_date' in data:
+            data['order_date'] = parse_datetime_value(data['order_date'], 'order_date')
+            data['order_day'] = order_day(data['order_date'])
         data['updated_at'] = datetime.utcnow()
-        return OrderModel.update_one({'order_id': order_id}, data)
+        old = OrderModel.find_one_and_update(
+            {'order_id': order_id}, {'$set': data, '$inc': {'version': 1}}, return_new=False
+        )
+        if old is None:
+            return False
+        new_day = data.get('order_day', old.get('order_day'))
+        if new_day != old.get('order_day'):
+            totals = (old.get('subtotal') or 0, old.get('item_count') or 0)
+            tasks.add_to_rollup(old.get('order_day'), orders=-1, subtotal=-totals[0], items=-totals[1])
+            tasks.add_to_rollup(new_day, orders=1, subtotal=totals[0], items=totals[1])
+        return True
 
 
 class OrderItemService:
     @staticmethod
     def create_order_item(data):
-        """Create a new order item"""
+        """Create a new order item, priced from the catalog"""
         order_item_data = {
             'quantity': data['quantity'],
-            'unit_price': float(data['unit_price']),
             'food_id': data['food_id'],
             'order_id': data['order_id'],
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        return OrderItemModel.create(order_item_data)
+        snapshot_items([order_item_data])
+        kitchen.route_items([order_item_data])
+
+        # No transaction: the order's $inc is atomic on its own, and
+        # reconcile_order_totals repairs a pair interrupted between the writes
+        order_item = dict(order_item_data)
+        amount, quantity = order_item['quantity'] * order_item['unit_price'], order_item['quantity']
+        order = OrderService.apply_item_delta(order_item['order_id'], amount, quantity)
+        try:
+            OrderItemModel.create(order_item, profile='fast_write')
+        except Exception:
+            OrderService.apply_item_delta(order_item['order_id'], -amount, -quantity)
+            raise
+        kitchen.items_created([order_item])
+        tasks.add_to_rollup(order.get('order_day'), items=quantity, subtotal=amount)
+        return order_item['order_item_id']
     
     @staticmethod
     def get_order_item(order_item_id):
-        """Get an order item by ID"""
-        item = OrderItemModel.find_one({'order_item_id': order_item_id})
+        """Get an order item by ID, falling back to the archive"""
+        item = (
+            OrderItemModel.find_one({'order_item_id': order_item_id})
+            or OrderItemArchiveModel.find_one({'order_item_id': order_item_id})
+        )
         if item:
             item['total_price'] = item['quantity'] * item['unit_price']
         return item
     
+    @staticmethod
+    def get_order_items_by_ids(ids):
+        """Order items for a list of IDs in request order, None for misses, falling back to the archive"""
+        items = find_with_archive(OrderItemModel, OrderItemArchiveModel, ids)
+        for item in items:
+            if item:
+                item['total_price'] = item['quantity'] * item['unit_price']
+        return items
+    
     @staticmethod
     def get_order_items(skip=0, limit=None, sort=None):
         """Get all order items with pagination"""
@@ -194,11 +694,48 @@ class OrderItemService:
     
     @staticmethod
     def update_order_item(order_item_id, data):
-        """Update an order item"""
-        if 'unit_price' in data:
-            data['unit_price'] = float(data['unit_price'])
+        """
+        Update an order item; a new food_id takes a fresh snapshot and price.
+        The difference in amount and quantity is then applied to the order's
+        totals with an atomic $inc.
+        """
+        # Prices come from the catalog snapshot only, never from the caller
+        data.pop('unit_price', None)
+        if 'food_id' in data:
+            snapshot_items([data])
+        if 'quantity' in data:
+            data['quantity'] = int(data['quantity'])
         data['updated_at'] = datetime.utcnow()
-        return OrderItemModel.update_one({'order_item_id': order_item_id}, data)
+
+        if 'order_id' in data and OrderModel.find_one({'order_id': data['order_id']}, projection={'_id': 1}) is None:
+            raise ValueError(f"Order not found: {data['order_id']}")
+        old = OrderItemModel.find_one_and_update(
+            {'order_item_id': order_item_id}, {'$set': data}, return_new=False, profile='fast_write'
+        )
+        if old is None:
+            return False
+        new = {**old, **data}
+        old_amount = old['quantity'] * old['unit_price']
+        new_amount = new['quantity'] * new['unit_price']
+        if new['order_id'] == old['order_id']:
+            deltas = [(old['order_id'], new_amount - old_amount, new['quantity'] - old['quantity'])]
+        else:
+            deltas = [(old['order_id'], -old_amount, -old['quantity']), (new['order_id'], new_amount, new['quantity'])]
+        for order_id, amount, quantity in deltas:
+            order = OrderService.apply_item_delta(order_id, amount, quantity)
+            tasks.add_to_rollup(order.get('order_day'), items=quantity, subtotal=amount)
+        return True
+    
+    @staticmethod
+    def delete_order_item(order_item_id):
+        """Delete an order item and take it off its order's totals"""
+        item = OrderItemModel.find_one_and_delete({'order_item_id': order_item_id}, profile='fast_write')
+        if item is None:
+            return None
+        amount, quantity = -item['quantity'] * item['unit_price'], -item['quantity']
+        order = OrderService.apply_item_delta(item['order_id'], amount, quantity)
+        tasks.add_to_rollup(order.get('order_day'), items=quantity, subtotal=amount)
+        return item
 
 
 class InvoiceService:
@@ -213,27 +750,155 @@ class InvoiceService:
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        return InvoiceModel.create(invoice_data)
+        invoice_id = InvoiceModel.create(invoice_data, profile='financial')
+        # After the insert, so a bill built in between is never cached as current
+        OrderService.touch_order(invoice_data['order_id'])
+        return invoice_id
     
     @staticmethod
     def get_invoice(invoice_id):
-        """Get an invoice by ID"""
-        return InvoiceModel.find_one({'invoice_id': invoice_id})
+        """Get an invoice by ID, falling back to the archive"""
+        return (
+            InvoiceModel.find_one({'invoice_id': invoice_id}, profile='financial')
+            or InvoiceArchiveModel.find_one({'invoice_id': invoice_id}, profile='financial')
+        )
+    
+    @staticmethod
+    def get_invoices_by_ids(ids):
+        """Invoices for a list of IDs in request order, None for misses, falling back to the archive"""
+        return find_with_archive(InvoiceModel, InvoiceArchiveModel, ids, profile='financial')
     
     @staticmethod
     def get_invoices(skip=0, limit=None, sort=None):
         """Get all invoices with pagination"""
         if sort is None:
             sort = [('created_at', -1)]
-        return InvoiceModel.find_many(skip=skip, limit=limit, sort=sort)
+        return InvoiceModel.find_many(skip=skip, limit=limit, sort=sort, profile='financial')
     
     @staticmethod
     def count_invoices():
         """Count total invoices"""
-        return InvoiceModel.count()
+        return InvoiceModel.count(profile='financial')
     
     @staticmethod
     def update_invoice(invoice_id, data):
         """Update an invoice"""
         data['updated_at'] = datetime.utcnow()
-        return InvoiceModel.update_one({'invoice_id': invoice_id}, data)
+        invoice = InvoiceModel.find_one_and_update({'invoice_id': invoice_id}, {'$set': data}, profile='financial')
+        if invoice is None:
+            return False
+        OrderService.touch_order(invoice['order_id'])
+        return True
+
+
+class CheckoutService:
+    @staticmethod
+    def validate_ticket(data):
+        """Validate a whole ticket with one table lookup and one batched food lookup"""
+        errors = []
+        items = data.get('items') or []
+        if not items:
+            errors.append('items must contain at least one item')
+
+        table_id = data.get('table_id')
+        if table_id and not TableModel.find_one({'table_id': table_id}):
+            errors.append(f"Table not found: {table_id}")
+
+        food_ids = list({item.get('food_id') for item in items if item.get('food_id')})
+        foods = {
+            food['food_id']: food
+            for food in FoodModel.find_many({'food_id': {'$in': food_ids}})
+        } if food_ids else {}
+
+        for index, item in enumerate(items):
+            if item.get('food_id') not in foods:
+                errors.append(f"items[{index}]: Food item not found: {item.get('food_id')}")
+            quantity = item.get('quantity')
+            # bool is a subclass of int, but true is not a quantity
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1 or quantity > 100:
+                errors.append(f"items[{index}]: Quantity must be between 1 and 100.")
+
+        if data.get('payment_method') not in PAYMENT_METHODS:
+            errors.append(f"payment_method must be one of {', '.join(PAYMENT_METHODS)}")
+        if data.get('payment_status', 'PENDING') not in PAYMENT_STATUSES:
+            errors.append(f"payment_status must be one of {', '.join(PAYMENT_STATUSES)}")
+
+        if errors:
+            raise ValueError('; '.join(errors))
+        return foods
+
+    @staticmethod
+    def checkout(data, server_id=None):
+        """
+        Close a ticket in one call: validate every reference up front, then
+        write the order, its items and the invoice in a single transaction.
+        """
+        foods = CheckoutService.validate_ticket(data)
+        now = datetime.utcnow()
+        order_date = parse_datetime_value(data['order_date'], 'order_date') if data.get('order_date') else now
+        payment_due_date = parse_datetime_value(
+            data.get('payment_due_date') or now.date(), 'payment_due_date'
+        )
+
+        order_object_id = ObjectId()
+        order_id = str(order_object_id)
+        order_data = {
+            '_id': order_object_id,
+            'order_id': order_id,
+            'order_date': order_date,
+            'order_day': order_day(order_date),
+            'table_id': data.get('table_id'),
+            'server_id': data.get('server_id') or server_id,
+            'created_at': now,
+            'updated_at': now
+        }
+        order_items_data = []
+        for item in data['items']:
+            order_items_data.append({
+                'quantity': item['quantity'],
+                'food_id': item['food_id'],
+                'order_id': order_id,
+                'order_date': order_date,
+                'created_at': now,
+                'updated_at': now
+            })
+        snapshot_items(order_items_data, foods)
+        kitchen.route_items(order_items_data)
+        order_data['subtotal'] = sum(item['quantity'] * item['unit_price'] for item in order_items_data)
+        order_data['item_count'] = sum(item['quantity'] for item in order_items_data)
+        order_data['version'] = 0
+        invoice_data = {
+            'order_id': order_id,
+            'payment_method': data['payment_method'],
+            'payment_status': data.get('payment_status', 'PENDING'),
+            'payment_due_date': payment_due_date,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        def write_ticket(session):
+            # The callback may be retried, so work on fresh copies each attempt
+            order = dict(order_data)
+            order_items = [dict(item) for item in order_items_data]
+            invoice = dict(invoice_data)
+            OrderModel.create(order, session=session)
+            OrderItemModel.create_many(order_items, session=session)
+            InvoiceModel.create(invoice, session=session)
+            return order, order_items, invoice
+
+        order, order_items, invoice = mongodb.run_transaction(write_ticket)
+        kitchen.items_created(order_items)
+        tasks.add_to_rollup(order['order_day'], orders=1, items=order['item_count'], subtotal=order['subtotal'])
+        for item in order_items:
+            item['total_price'] = item['quantity'] * item['unit_price']
+        order['total_amount'] = round(order['subtotal'], 2)
+        return {'order': order, 'order_items': order_items, 'invoice': invoice}
+
+@warmup.register_per_restaurant
+def prime_catalog():
+    """Resolve collection handles and read the hot catalog pages once"""
+    for model in (MenuModel, FoodModel, TableModel, OrderModel, OrderItemModel, InvoiceModel):
+        model.collection
+    MenuService.get_menus(limit=100)
+    FoodService.get_foods(limit=100)
+    TableService.get_tables(limit=100)
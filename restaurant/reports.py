@@ -0,0 +1,233 @@
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import orjson
+from django.conf import settings
+
+from restaurant_management import tenancy
+from restaurant_management.database import (
+    mongodb, FoodModel, OrderModel, OrderItemModel, InvoiceModel,
+    OrderArchiveModel, OrderItemArchiveModel, InvoiceArchiveModel
+)
+from restaurant_management.renderers import ORJSON_OPTIONS, encode_default
+
+logger = logging.getLogger(__name__)
+
+# Live and archived collections; a day may be split across both after archiving
+SOURCES = (
+    (OrderModel, OrderItemModel, InvoiceModel),
+    (OrderArchiveModel, OrderItemArchiveModel, InvoiceArchiveModel),
+)
+CHUNK_SIZE = 1000
+
+
+def report_settings():
+    return getattr(settings, 'REPORT_SETTINGS', {})
+
+
+def split_tax(amount):
+    """(net, tax, gross) for an amount at the configured tax rate"""
+    conf = report_settings()
+    rate = conf.get('tax_rate', 0.0)
+    if conf.get('prices_include_tax', False):
+        net = amount / (1 + rate)
+        return net, amount - net, amount
+    return amount, amount * rate, amount * (1 + rate)
+
+
+def _add(totals, key, **amounts):
+    bucket = totals.setdefault(key, {})
+    for name, amount in amounts.items():
+        bucket[name] = bucket.get(name, 0) + amount
+
+
+def merge_into(total, part):
+    """Add every number in `part` to `total`, recursing into nested dicts"""
+    for key, value in part.items():
+        if isinstance(value, dict):
+            merge_into(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+        else:
+            total.setdefault(key, value)
+    return total
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def build_shard(restaurant_id, day):
+    """
+    Sales for one restaurant and one order_day, from the live and archive
+    collections. Returns a dict of plain numbers that merge_into() can sum.
+    """
+    outlet = restaurant_id or 'default'
+    shard = {'orders': 0, 'items': 0, 'net_sales': 0, 'tax': 0, 'gross_sales': 0,
+             'by_outlet': {}, 'by_server': {}, 'by_food': {}, 'by_payment_method': {}}
+    with tenancy.use_restaurant(restaurant_id):
+        for order_model, item_model, invoice_model in SOURCES:
+            orders = order_model.find_many(
+                {'order_day': day}, profile='report_read', projection={'order_id': 1, 'server_id': 1}
+            )
+            for chunk in _chunks(orders):
+                order_ids = [order['order_id'] for order in chunk]
+                order_totals = dict.fromkeys(order_ids, 0)
+                for item in item_model.find_many(
+                    {'order_id': {'$in': order_ids}}, profile='report_read',
+                    projection={'order_id': 1, 'food_id': 1, 'quantity': 1, 'unit_price': 1}
+                ):
+                    amount = (item.get('quantity') or 0) * (item.get('unit_price') or 0)
+                    order_totals[item['order_id']] += amount
+                    shard['items'] += item.get('quantity') or 0
+                    _add(shard['by_food'], item.get('food_id'), quantity=item.get('quantity') or 0, net_sales=amount)
+
+                order_gross = {}
+                for order in chunk:
+                    net, tax, gross = split_tax(order_totals[order['order_id']])
+                    order_gross[order['order_id']] = gross
+                    shard['orders'] += 1
+                    shard['net_sales'] += net
+                    shard['tax'] += tax
+                    shard['gross_sales'] += gross
+                    _add(shard['by_outlet'], outlet, orders=1, net_sales=net, tax=tax, gross_sales=gross)
+                    _add(shard['by_server'], order.get('server_id') or 'unassigned',
+                         orders=1, net_sales=net, tax=tax, gross_sales=gross)
+
+                # An order can have several invoices (e.g. a failed card payment, then cash);
+                # its amount is counted once, against the paid or else the latest invoice
+                billed = {}
+                for invoice in invoice_model.find_many(
+                    {'order_id': {'$in': order_ids}}, profile='report_read', sort=[('created_at', 1)],
+                    projection={'order_id': 1, 'payment_method': 1, 'payment_status': 1}
+                ):
+                    _add(shard['by_payment_method'], invoice.get('payment_method') or 'unknown', invoices=1)
+                    current = billed.get(invoice['order_id'])
+                    if current is None or current.get('payment_status') != 'PAID':
+                        billed[invoice['order_id']] = invoice
+                for order_id, invoice in billed.items():
+                    gross = order_gross.get(order_id, 0)
+                    paid = gross if invoice.get('payment_status') == 'PAID' else 0
+                    _add(shard['by_payment_method'], invoice.get('payment_method') or 'unknown',
+                         amount=gross, paid_amount=paid)
+    return shard
+
+
+def _init_worker():
+    """Child processes must not reuse the parent's MongoClient sockets"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    mongodb.reset()
+
+
+def _shard_path(output_dir, restaurant_id, day):
+    return os.path.join(output_dir, 'shards', f"{restaurant_id or 'default'}_{day}.json")
+
+
+def _write_json(path, data):
+    """Write through a temporary file so an interrupted run never leaves a truncated file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS | orjson.OPT_INDENT_2))
+    os.replace(tmp_path, path)
+
+
+def _run_shard(restaurant_id, day, path):
+    _write_json(path, build_shard(restaurant_id, day))
+    return restaurant_id, day
+
+
+def days_between(start, end):
+    """order_day buckets from start to end, inclusive"""
+    day = start
+    while day <= end:
+        yield day.strftime('%Y-%m-%d')
+        day += timedelta(days=1)
+
+
+def closed_before():
+    """
+    The first order_day whose orders may still change. Shards for it and
+    later days are never reused, since orders, items and payments keep
+    arriving until the day is settled.
+    """
+    settle_days = report_settings().get('settle_days', 1)
+    return (datetime.utcnow() - timedelta(days=settle_days - 1)).strftime('%Y-%m-%d')
+
+
+def run_report(start, end, output_dir, restaurant_ids=None, workers=None, force=False, progress=None):
+    """
+    Build the sales report for [start, end] (dates, inclusive) into
+    output_dir. Each (restaurant, day) shard runs in a worker process and is
+    written to its own file. A re-run skips shards that already have a
+    file, so an interrupted run resumes where it stopped; days that are not
+    yet closed are always rebuilt. Returns the merged report. Without
+    restaurant_ids, every restaurant is reported on.
+    """
+    if restaurant_ids is None:
+        restaurant_ids = tenancy.restaurant_ids()
+    os.makedirs(os.path.join(output_dir, 'shards'), exist_ok=True)
+    shards = [(restaurant_id, day) for restaurant_id in restaurant_ids for day in days_between(start, end)]
+    open_from = closed_before()
+    pending = [
+        shard for shard in shards
+        if force or shard[1] >= open_from or not os.path.exists(_shard_path(output_dir, *shard))
+    ]
+    if progress:
+        progress(f"{len(shards) - len(pending)} of {len(shards)} shard(s) already done")
+
+    if pending:
+        workers = workers or report_settings().get('workers') or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker) as executor:
+            futures = [
+                executor.submit(_run_shard, restaurant_id, day, _shard_path(output_dir, restaurant_id, day))
+                for restaurant_id, day in pending
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                restaurant_id, day = future.result()
+                if progress:
+                    progress(f"[{done}/{len(pending)}] {restaurant_id or 'default'} {day}")
+
+    report = {'from': start, 'to': end, 'by_day': {}}
+    for restaurant_id, day in shards:
+        with open(_shard_path(output_dir, restaurant_id, day), 'rb') as f:
+            shard = orjson.loads(f.read())
+        merge_into(report, shard)
+        _add(report['by_day'], day, orders=shard['orders'], net_sales=shard['net_sales'],
+             tax=shard['tax'], gross_sales=shard['gross_sales'])
+    _name_foods(report.get('by_food', {}), restaurant_ids)
+    write_report(report, output_dir)
+    return report
+
+
+def _name_foods(by_food, restaurant_ids):
+    food_ids = [food_id for food_id in by_food if food_id]
+    for restaurant_id in restaurant_ids:
+        with tenancy.use_restaurant(restaurant_id):
+            for chunk in _chunks(food_ids):
+                for food in FoodModel.find_many({'food_id': {'$in': chunk}}, projection={'food_id': 1, 'name': 1}):
+                    by_food[food['food_id']]['name'] = food.get('name')
+
+
+def _round(values):
+    return {key: round(value, 2) if isinstance(value, float) else value for key, value in values.items()}
+
+
+def write_report(report, output_dir):
+    """report.json plus one CSV per breakdown"""
+    _write_json(os.path.join(output_dir, 'report.json'), report)
+    for breakdown in ('by_day', 'by_outlet', 'by_server', 'by_food', 'by_payment_method'):
+        rows = report.get(breakdown, {})
+        columns = sorted({column for values in rows.values() for column in values})
+        with open(os.path.join(output_dir, f"{breakdown}.csv"), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['key', *columns])
+            for key in sorted(rows, key=str):
+                values = _round(rows[key])
+                writer.writerow([key, *(values.get(column, '') for column in columns)])
@@ -0,0 +1,350 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from restaurant_management import tenancy, warmup
+from restaurant_management.database import FoodModel, MenuModel
+
+logger = logging.getLogger(__name__)
+
+re_token = re.compile(r'[a-z0-9]+')
+
+# Score for each way a query token can hit an indexed token
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+# Matches in the menu category count for less than matches in the food name
+CATEGORY_WEIGHT = 0.5
+
+
+def tokenize(text):
+    return re_token.findall((text or '').lower())
+
+
+def deletes(token):
+    """Every variant of token with one character removed"""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def within_one_edit(a, b):
+    """True when a and b differ by at most one insert, delete, substitution or transposition"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class FoodSearchIndex:
+    """
+    In-memory search over food names and menu categories.
+    Terms are kept in a sorted list so a prefix lookup is a bisect, and a
+    one-deletion neighbourhood map (SymSpell style) gives typo tolerance
+    without scanning the vocabulary.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._foods = {}
+        self._food_tokens = {}
+        self._menu_categories = {}
+        self._postings = {}
+        self._terms = []
+        self._deletes = {}
+        self.built_at = None
+
+    def _add_token(self, token, food_id, field):
+        postings = self._postings.get(token)
+        if postings is None:
+            postings = self._postings[token] = {}
+            bisect.insort(self._terms, token)
+            for variant in deletes(token):
+                self._deletes.setdefault(variant, set()).add(token)
+        postings[food_id] = field
+
+    def _remove_token(self, token, food_id):
+        postings = self._postings.get(token)
+        if postings is None:
+            return
+        postings.pop(food_id, None)
+        if not postings:
+            del self._postings[token]
+            del self._terms[bisect.bisect_left(self._terms, token)]
+            for variant in deletes(token):
+                tokens = self._deletes.get(variant)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._deletes[variant]
+
+    def upsert_food(self, food):
+        """Index or re-index one food document"""
+        food_id = food['food_id']
+        with self._lock:
+            self.remove_food(food_id)
+            category = self._menu_categories.get(food.get('menu_id'))
+            self._foods[food_id] = {
+                'food_id': food_id,
+                'name': food.get('name'),
+                'price': food.get('price'),
+                'menu_id': food.get('menu_id'),
+                'category': category,
+            }
+            tokens = {}
+            for token in tokenize(category):
+                tokens[token] = 'category'
+            for token in tokenize(food.get('name')):
+                tokens[token] = 'name'
+            for token, field in tokens.items():
+                self._add_token(token, food_id, field)
+            self._food_tokens[food_id] = list(tokens)
+
+    def remove_food(self, food_id):
+        with self._lock:
+            for token in self._food_tokens.pop(food_id, []):
+                self._remove_token(token, food_id)
+            self._foods.pop(food_id, None)
+
+    def upsert_menu(self, menu):
+        """Record a menu's category and re-index its foods if the category changed"""
+        with self._lock:
+            menu_id = menu['menu_id']
+            if self._menu_categories.get(menu_id) == menu.get('category'):
+                return
+            self._menu_categories[menu_id] = menu.get('category')
+            for food in [food for food in self._foods.values() if food['menu_id'] == menu_id]:
+                self.upsert_food(food)
+
+    def build(self, menus, foods):
+        with self._lock:
+            for menu in menus:
+                self._menu_categories[menu['menu_id']] = menu.get('category')
+            for food in foods:
+                self.upsert_food(food)
+            self.built_at = time.monotonic()
+
+    def _matches(self, query_token, prefix):
+        """Yield indexed tokens matching one query token with their score: exact, then prefix, then fuzzy"""
+        seen = set()
+        if query_token in self._postings:
+            seen.add(query_token)
+            yield query_token, EXACT_SCORE
+        if prefix:
+            start = bisect.bisect_left(self._terms, query_token)
+            end = bisect.bisect_left(self._terms, query_token + '\uffff', start)
+            for i in range(start, end):
+                term = self._terms[i]
+                if term not in seen:
+                    seen.add(term)
+                    yield term, PREFIX_SCORE
+        if len(query_token) >= 4:
+            candidates = set(self._deletes.get(query_token, ()))
+            for variant in deletes(query_token) | {query_token}:
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(self._deletes.get(variant, ()))
+            for term in candidates:
+                if term not in seen and within_one_edit(query_token, term):
+                    seen.add(term)
+                    yield term, FUZZY_SCORE
+
+    def search(self, query, limit=10):
+        """
+        Foods matching every query token, ranked by match quality.
+        The last token is treated as a prefix for type-ahead. A very broad
+        prefix stops collecting candidates after a cap, so a one-letter
+        keystroke costs the same as a full word. The cap applies to the
+        prefix only: earlier tokens collect every match, and by the time the
+        prefix is read the candidates are already narrowed to foods that
+        matched them.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        last = len(query_tokens) - 1
+        with self._lock:
+            scores = None
+            for position, query_token in enumerate(query_tokens):
+                candidate_cap = max(limit * 20, 200) if position == last else None
+                token_scores = {}
+                for term, score in self._matches(query_token, prefix=position == last):
+                    for food_id, field in self._postings[term].items():
+                        if scores is not None and food_id not in scores:
+                            continue
+                        weighted = score * (CATEGORY_WEIGHT if field == 'category' else 1.0)
+                        if weighted > token_scores.get(food_id, 0):
+                            token_scores[food_id] = weighted
+                            if candidate_cap and len(token_scores) >= candidate_cap:
+                                break
+                    if candidate_cap and len(token_scores) >= candidate_cap:
+                        break
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {food_id: scores[food_id] + s for food_id, s in token_scores.items()}
+                if not scores:
+                    return []
+
+            foods = self._foods
+            ranked = heapq.nsmallest(
+                limit, scores.items(), key=lambda item: (-item[1], len(foods[item[0]]['name'] or ''))
+            )
+            return [dict(foods[food_id], score=score) for food_id, score in ranked]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+# Per restaurant, one buffer per build in progress: writes made while an
+# index is built are replayed onto it before it is installed
+_pending = {}
+_pending_lock = threading.Lock()
+_generations = {}
+
+
+def _build_index():
+    index = FoodSearchIndex()
+    index.build(MenuModel.find_many(), FoodModel.find_many())
+    return index
+
+
+def _build_and_install(restaurant_id):
+    """Build a fresh index for the current restaurant and install it with the writes made meanwhile"""
+    buffer = []
+    with _pending_lock:
+        _pending.setdefault(restaurant_id, []).append(buffer)
+        generation = _generations.get(restaurant_id, 0)
+    index = None
+    try:
+        index = _build_index()
+    finally:
+        # One locked step from replay to install, so no write can land in between
+        with _pending_lock:
+            _pending[restaurant_id].remove(buffer)
+            if not _pending[restaurant_id]:
+                del _pending[restaurant_id]
+            if index is not None:
+                for apply in buffer:
+                    apply(index)
+                # An invalidate() during the build means it may have read data from before a bulk change
+                if _generations.get(restaurant_id, 0) == generation:
+                    _indexes[restaurant_id] = index
+    return index
+
+
+def _refresh_in_background(restaurant_id):
+    def refresh():
+        with tenancy.use_restaurant(restaurant_id):
+            try:
+                _build_and_install(restaurant_id)
+            except Exception as e:
+                logger.error(f"Failed to rebuild food search index: {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(restaurant_id)
+
+    with _refreshing_lock:
+        if restaurant_id in _refreshing:
+            return
+        _refreshing.add(restaurant_id)
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def get_index():
+    """
+    Search index for the current restaurant, built on first use.
+    Indexes older than SEARCH_SETTINGS['max_age_seconds'] are rebuilt in the
+    background to pick up writes made through other workers.
+    """
+    restaurant_id = tenancy.get_restaurant_id()
+    index = _indexes.get(restaurant_id)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(restaurant_id)
+            if index is None:
+                index = _build_and_install(restaurant_id)
+        return index
+
+    max_age = getattr(settings, 'SEARCH_SETTINGS', {}).get('max_age_seconds', 60)
+    if time.monotonic() - index.built_at > max_age:
+        _refresh_in_background(restaurant_id)
+    return index
+
+
+def _changed(apply):
+    """Apply a write to the current index and to any index being built"""
+    restaurant_id = tenancy.get_restaurant_id()
+    with _pending_lock:
+        index = _indexes.get(restaurant_id)
+        if index is not None:
+            apply(index)
+        for buffer in _pending.get(restaurant_id, ()):
+            buffer.append(apply)
+
+
+def food_changed(food):
+    """Keep an already built index in sync with a food write"""
+    if food:
+        _changed(lambda index: index.upsert_food(food))
+
+
+def menu_changed(menu):
+    """Keep an already built index in sync with a menu write"""
+    if menu:
+        _changed(lambda index: index.upsert_menu(menu))
+
+
+def invalidate():
+    """Drop the current restaurant's index so the next search rebuilds it, e.g. after a bulk import"""
+    restaurant_id = tenancy.get_restaurant_id()
+    with _pending_lock:
+        _generations[restaurant_id] = _generations.get(restaurant_id, 0) + 1
+        _indexes.pop(restaurant_id, None)
+
+
+def mongo_search(query, limit=10):
+    """Fallback to the MongoDB text index on food names"""
+    foods = FoodModel.find_many(
+        {'$text': {'$search': query}},
+        limit=limit,
+        sort=[('score', {'$meta': 'textScore'})],
+        projection={'score': {'$meta': 'textScore'}},
+    )
+    return [{
+        'food_id': food['food_id'],
+        'name': food.get('name'),
+        'price': food.get('price'),
+        'menu_id': food.get('menu_id'),
+        'score': food.get('score'),
+    } for food in foods]
+
+
+def search_foods(query, limit=10):
+    """Search foods in memory, falling back to MongoDB when in-memory search is off or fails"""
+    if getattr(settings, 'SEARCH_SETTINGS', {}).get('in_memory', True):
+        try:
+            return get_index().search(query, limit=limit), 'memory'
+        except Exception as e:
+            logger.error(f"In-memory food search failed, falling back to MongoDB: {e}")
+    return mongo_search(query, limit=limit), 'mongo'
+
+
+@warmup.register_per_restaurant
+def build_food_search_index():
+    get_index()
@@ -1,14 +1,18 @@
 from rest_framework import serializers
-from .models import Menu, Food, Table, Order, OrderItem, Invoice
+from restaurant_management.fast_serializers import DocumentSerializer
+from .models import MenuService, FoodService, TableService, OrderService, OrderItemService, InvoiceService
 from django.utils import timezone
 from decimal import Decimal
 
 
-class MenuSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Menu
-        fields = '__all__'
-        read_only_fields = ('menu_id', 'created_at', 'updated_at')
+class MenuSerializer(DocumentSerializer):
+    menu_id = serializers.CharField(read_only=True)
+    name = serializers.CharField()
+    category = serializers.CharField()
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField()
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate(self, attrs):
         start_date = attrs.get('start_date')
@@ -22,12 +26,22 @@ class MenuSerializer(serializers.ModelSerializer):
         
         return attrs
 
+    def create(self, validated_data):
+        return MenuService.get_menu(MenuService.create_menu(dict(validated_data)))
 
-class FoodSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Food
-        fields = '__all__'
-        read_only_fields = ('food_id', 'created_at', 'updated_at')
+    def update(self, instance, validated_data):
+        MenuService.update_menu(instance['menu_id'], dict(validated_data))
+        return MenuService.get_menu(instance['menu_id'])
+
+
+class FoodSerializer(DocumentSerializer):
+    food_id = serializers.CharField(read_only=True)
+    name = serializers.CharField()
+    price = serializers.FloatField()
+    food_image = serializers.CharField(required=False, allow_null=True)
+    menu_id = serializers.CharField()
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_price(self, value):
         if value <= 0:
@@ -35,18 +49,25 @@ class FoodSerializer(serializers.ModelSerializer):
         return round(value, 2)
 
     def validate_menu_id(self, value):
-        try:
-            Menu.objects.get(menu_id=value)
-        except Menu.DoesNotExist:
+        if not MenuService.get_menu(value):
             raise serializers.ValidationError("Menu not found.")
         return value
 
+    def create(self, validated_data):
+        return FoodService.get_food(FoodService.create_food(dict(validated_data)))
+
+    def update(self, instance, validated_data):
+        FoodService.update_food(instance['food_id'], dict(validated_data))
+        return FoodService.get_food(instance['food_id'])
 
-class TableSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Table
-        fields = '__all__'
-        read_only_fields = ('table_id', 'created_at', 'updated_at')
+
+class TableSerializer(DocumentSerializer):
+    table_id = serializers.CharField(read_only=True)
+    table_number = serializers.IntegerField()
+    number_of_guests = serializers.IntegerField()
+    zone = serializers.CharField(required=False, allow_null=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_number_of_guests(self, value):
         if value < 1 or value > 20:
@@ -62,18 +83,29 @@ class TableSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def create(self, validated_data):
+        return TableService.get_table(TableService.create_table(dict(validated_data)))
+
+    def update(self, instance, validated_data):
+        TableService.update_table(instance['table_id'], dict(validated_data))
+        return TableService.get_table(instance['table_id'])
+
 
-class OrderSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Order
-        fields = '__all__'
-        read_only_fields = ('order_id', 'created_at', 'updated_at')
+class OrderSerializer(DocumentSerializer):
+    order_id = serializers.CharField(read_only=True)
+    order_date = serializers.DateTimeField()
+    order_day = serializers.CharField(read_only=True)
+    table_id = serializers.CharField(required=False, allow_null=True)
+    server_id = serializers.CharField(required=False, allow_null=True)
+    subtotal = serializers.FloatField(read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+    version = serializers.IntegerField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_table_id(self, value):
         if value:  # table_id is optional
-            try:
-                Table.objects.get(table_id=value)
-            except Table.DoesNotExist:
+            if not TableService.get_table(value):
                 raise serializers.ValidationError("Table not found.")
         return value
 
@@ -84,14 +116,31 @@ class OrderSerializer(serializers.ModelSerializer):
             )
         return value
 
-
-class OrderItemSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        return OrderService.get_order(OrderService.create_order(dict(validated_data)))
+
+    def update(self, instance, validated_data):
+        OrderService.update_order(instance['order_id'], dict(validated_data))
+        return OrderService.get_order(instance['order_id'])
+
+
+class OrderItemSerializer(DocumentSerializer):
+    order_item_id = serializers.CharField(read_only=True)
+    order_id = serializers.CharField()
+    food_id = serializers.CharField()
+    quantity = serializers.IntegerField()
+    # Snapshotted from the catalog when the item is created
+    food_name = serializers.CharField(read_only=True)
+    menu_id = serializers.CharField(read_only=True)
+    menu_name = serializers.CharField(read_only=True)
+    category = serializers.CharField(read_only=True)
+    unit_price = serializers.FloatField(read_only=True)
     total_price = serializers.ReadOnlyField()
-
-    class Meta:
-        model = OrderItem
-        fields = '__all__'
-        read_only_fields = ('order_item_id', 'created_at', 'updated_at', 'total_price')
+    station = serializers.CharField(read_only=True)
+    course = serializers.IntegerField(read_only=True)
+    kitchen_status = serializers.CharField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_quantity(self, value):
         if value < 1 or value > 100:
@@ -100,81 +149,51 @@ class OrderItemSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate_unit_price(self, value):
-        if value <= 0:
-            raise serializers.ValidationError("Unit price must be greater than 0.")
-        return round(value, 2)
-
     def validate_food_id(self, value):
-        try:
-            Food.objects.get(food_id=value)
-        except Food.DoesNotExist:
+        if not FoodService.get_food(value):
             raise serializers.ValidationError("Food item not found.")
         return value
 
     def validate_order_id(self, value):
-        try:
-            Order.objects.get(order_id=value)
-        except Order.DoesNotExist:
+        if not OrderService.get_order(value):
             raise serializers.ValidationError("Order not found.")
         return value
 
+    def create(self, validated_data):
+        return OrderItemService.get_order_item(OrderItemService.create_order_item(dict(validated_data)))
+
+    def update(self, instance, validated_data):
+        OrderItemService.update_order_item(instance['order_item_id'], dict(validated_data))
+        return OrderItemService.get_order_item(instance['order_item_id'])
 
-class InvoiceSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Invoice
-        fields = '__all__'
-        read_only_fields = ('invoice_id', 'created_at', 'updated_at')
+
+class InvoiceSerializer(DocumentSerializer):
+    invoice_id = serializers.CharField(read_only=True)
+    order_id = serializers.CharField()
+    payment_method = serializers.CharField(required=False, allow_null=True)
+    payment_status = serializers.CharField()
+    payment_due_date = serializers.DateTimeField()
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_order_id(self, value):
-        try:
-            Order.objects.get(order_id=value)
-        except Order.DoesNotExist:
+        if not OrderService.get_order(value):
             raise serializers.ValidationError("Order not found.")
         return value
 
     def validate_payment_due_date(self, value):
-        if value < timezone.now().date():
+        if value.date() < timezone.now().date():
             raise serializers.ValidationError(
                 "Payment due date cannot be in the past."
             )
         return value
 
+    def create(self, validated_data):
+        return InvoiceService.get_invoice(InvoiceService.create_invoice(dict(validated_data)))
 
-# Detailed serializers for responses with related data
-class FoodDetailSerializer(serializers.ModelSerializer):
-    menu = MenuSerializer(source='menu_id', read_only=True)
-
-    class Meta:
-        model = Food
-        fields = '__all__'
-
-
-class OrderDetailSerializer(serializers.ModelSerializer):
-    table = TableSerializer(source='table_id', read_only=True)
-    order_items = OrderItemSerializer(many=True, read_only=True)
-
-    class Meta:
-        model = Order
-        fields = '__all__'
-
-
-class OrderItemDetailSerializer(serializers.ModelSerializer):
-    food = FoodDetailSerializer(source='food_id', read_only=True)
-    order = OrderSerializer(source='order_id', read_only=True)
-    total_price = serializers.ReadOnlyField()
-
-    class Meta:
-        model = OrderItem
-        fields = '__all__'
-
-
-class InvoiceDetailSerializer(serializers.ModelSerializer):
-    order = OrderDetailSerializer(source='order_id', read_only=True)
-
-    class Meta:
-        model = Invoice
-        fields = '__all__'
+    def update(self, instance, validated_data):
+        InvoiceService.update_invoice(instance['invoice_id'], dict(validated_data))
+        return InvoiceService.get_invoice(instance['invoice_id'])
 
 
 # Summary serializers for aggregated data
@@ -1,3 +1,500 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import orjson
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from restaurant_management import jobs, tenancy
+from restaurant_management.database import (
+    JobModel, MenuModel, OrderItemModel, OrderModel, InvoiceModel, SalesRollupModel
+)
+from restaurant_management.middleware import CompressionMiddleware, parse_accept_encoding
+from restaurant_management.read_cache import ReadCache
+from restaurant_management.testing import MongoTestCase
+from restaurant_management.throttling import LocalBucketStore
+
+from . import bills, catalog, kitchen, reports
+from .allocation import TableAllocator, TableSchedule
+from .models import CheckoutService, FoodService, MenuService, OrderItemService, OrderService, TableService
+from .search import FoodSearchIndex
+from .serializers import OrderItemSerializer, OrderSerializer
+
+
+def create_catalog(category='Starters', price=4.5):
+    """A menu with one food; returns (menu_id, food_id)"""
+    menu_id = MenuService.create_menu({
+        'name': f"{category} menu", 'category': category,
+        'start_date': datetime(2020, 1, 1), 'end_date': datetime(2030, 1, 1),
+    })
+    food_id = FoodService.create_food({'name': f"{category} special", 'price': price, 'menu_id': menu_id})
+    return menu_id, food_id
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def choose(self, header):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+        return CompressionMiddleware(lambda request: None)._choose_encoding(request)
+
+    def test_parses_q_values(self):
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.8, br ; Q=0.5,identity, *;q=0'),
+            {'gzip': 0.8, 'br': 0.5, 'identity': 1.0, '*': 0.0},
+        )
+
+    def test_unparseable_q_value_counts_as_zero(self):
+        self.assertEqual(parse_accept_encoding('gzip;q=1.2.3'), {'gzip': 0.0})
+
+    def test_highest_q_value_wins_and_brotli_wins_a_tie(self):
+        self.assertEqual(self.choose('gzip;q=1.0, br;q=0.5'), 'gzip')
+        self.assertEqual(self.choose('gzip, br'), 'br')
+
+    def test_q_zero_and_wildcard(self):
+        self.assertIsNone(self.choose('br;q=0, gzip;q=0'))
+        self.assertIsNone(self.choose('identity'))
+        self.assertEqual(self.choose('br;q=0, *'), 'gzip')
+        self.assertIsNone(self.choose('*;q=0'))
+
+
+class TenantScopingTests(MongoTestCase):
+    @override_settings(TENANCY_SETTINGS={'enabled': True})
+    def test_models_need_a_restaurant_and_only_see_its_documents(self):
+        with self.assertRaises(tenancy.RestaurantRequired):
+            MenuModel.find_many({})
+        with tenancy.use_restaurant('north'):
+            MenuModel.create({'name': 'North menu', 'category': 'Starters'})
+        with tenancy.use_restaurant('south'):
+            MenuModel.create({'name': 'South menu', 'category': 'Starters'})
+            self.assertEqual([menu['name'] for menu in MenuModel.find_many({})], ['South menu'])
+            self.assertIsNone(MenuModel.find_one({'name': 'North menu'}))
+        with tenancy.unscoped():
+            self.assertEqual(len(MenuModel.find_many({})), 2)
+
+
+class CheckoutTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.food_id = create_catalog(price=4.5)
+        self.table_id = TableService.create_table({'table_number': 1, 'number_of_guests': 4})
+
+    def ticket(self, **overrides):
+        data = {
+            'table_id': self.table_id,
+            'order_date': '2026-01-05T12:00:00',
+            'items': [{'food_id': self.food_id, 'quantity': 2}],
+            'payment_method': 'CARD',
+        }
+        data.update(overrides)
+        return data
+
+    def test_reports_every_problem_and_writes_nothing(self):
+        data = self.ticket(
+            table_id='missing-table',
+            items=[{'food_id': 'missing-food', 'quantity': 1}, {'food_id': self.food_id, 'quantity': True}],
+            payment_method='CHEQUE',
+        )
+        with self.assertRaises(ValueError) as raised:
+            CheckoutService.checkout(data)
+        message = str(raised.exception)
+        self.assertIn('Table not found: missing-table', message)
+        self.assertIn('items[0]: Food item not found: missing-food', message)
+        self.assertIn('items[1]: Quantity must be between 1 and 100.', message)
+        self.assertIn('payment_method must be one of', message)
+        self.assertEqual((OrderModel.count(), OrderItemModel.count(), InvoiceModel.count()), (0, 0, 0))
+
+    def test_empty_ticket_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'items must contain at least one item'):
+            CheckoutService.checkout(self.ticket(items=[]))
+
+    def test_prices_come_from_the_catalog(self):
+        data = self.ticket(items=[{'food_id': self.food_id, 'quantity': 2, 'unit_price': 0.01}])
+        result = CheckoutService.checkout(data)
+        self.assertEqual(result['order']['subtotal'], 9.0)
+        self.assertEqual(result['order']['item_count'], 2)
+        self.assertEqual(result['order_items'][0]['unit_price'], 4.5)
+        self.assertEqual(result['invoice']['order_id'], result['order']['order_id'])
+
+    def test_order_and_item_writes_move_the_daily_rollup(self):
+        order_id = CheckoutService.checkout(self.ticket())['order']['order_id']
+        item_id = OrderItemService.create_order_item({'order_id': order_id, 'food_id': self.food_id, 'quantity': 1})
+        OrderItemService.update_order_item(item_id, {'quantity': 3})
+        rollup = SalesRollupModel.find_one({'order_day': '2026-01-05'})
+        self.assertEqual((rollup['orders'], rollup['items'], rollup['subtotal']), (1, 5, 22.5))
+
+        OrderService.update_order(order_id, {'order_date': '2026-01-06T12:00:00'})
+        moved = SalesRollupModel.find_one({'order_day': '2026-01-06'})
+        self.assertEqual((moved['orders'], moved['items'], moved['subtotal']), (1, 5, 22.5))
+        self.assertEqual(SalesRollupModel.find_one({'order_day': '2026-01-05'})['orders'], 0)
+
+
+class FoodSearchTests(SimpleTestCase):
+    def build(self, foods, menus=({'menu_id': 'mains', 'category': 'Main Course'},)):
+        index = FoodSearchIndex()
+        index.build(list(menus), [
+            {'food_id': food_id, 'name': name, 'price': 10, 'menu_id': 'mains'} for food_id, name in foods
+        ])
+        return index
+
+    def test_exact_beats_prefix_beats_typo(self):
+        index = self.build([('exact', 'Paneer Tikka'), ('prefix', 'Paneer Tikkas'), ('typo', 'Paneer Tika')])
+        self.assertEqual([food['food_id'] for food in index.search('tikka', limit=3)], ['exact', 'prefix', 'typo'])
+
+    def test_every_token_must_match(self):
+        index = self.build([('a', 'Chicken Tikka'), ('b', 'Chicken Curry'), ('c', 'Paneer Tikka')])
+        self.assertEqual([food['food_id'] for food in index.search('chicken tikka')], ['a'])
+        self.assertEqual(index.search('chicken biryani'), [])
+
+    def test_name_matches_outrank_category_matches(self):
+        index = self.build(
+            [('name', 'Main Street Burger'), ('category', 'Veg Burger')],
+            menus=({'menu_id': 'mains', 'category': 'Main Course'},),
+        )
+        self.assertEqual([food['food_id'] for food in index.search('main')], ['name', 'category'])
+
+    def test_broad_first_token_does_not_hide_later_matches(self):
+        foods = [(f"dish-{i}", f"Chicken Dish {i}") for i in range(500)] + [('target', 'Chicken Tikka')]
+        index = self.build(foods)
+        self.assertEqual([food['food_id'] for food in index.search('chicken tikka')], ['target'])
+        self.assertEqual([food['food_id'] for food in index.search('chicken tik')], ['target'])
+
+    def test_removed_food_is_no_longer_found(self):
+        index = self.build([('a', 'Mango Lassi')])
+        index.remove_food('a')
+        self.assertEqual(index.search('lassi'), [])
+
+
+class KitchenTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        _, food_id = create_catalog('Starters')
+        self.item_ids = []
+        # Tables that ordered earlier are served first
+        for hour in (11, 12, 13):
+            result = CheckoutService.checkout({
+                'order_date': f"2026-01-05T{hour}:00:00",
+                'items': [{'food_id': food_id, 'quantity': 1}],
+                'payment_method': 'CASH',
+            })
+            self.item_ids.append(result['order_items'][0]['order_item_id'])
+
+    def test_items_are_routed_to_their_station(self):
+        item = OrderItemModel.find_one({'order_item_id': self.item_ids[0]})
+        self.assertEqual((item['station'], item['course'], item['kitchen_status']), ('cold', 1, kitchen.QUEUED))
+
+    def test_workers_never_claim_the_same_item(self):
+        first, second = kitchen.KitchenScheduler(), kitchen.KitchenScheduler()
+        first.refresh(force=True)
+        second.refresh(force=True)
+        self.assertEqual(first.claim('cold', 'ann')['order_item_id'], self.item_ids[0])
+        # The second worker still holds the first item in memory, skips it and takes the next
+        self.assertEqual(second.claim('cold', 'bob')['order_item_id'], self.item_ids[1])
+        self.assertEqual(first.claim('cold', 'ann')['order_item_id'], self.item_ids[2])
+        self.assertIsNone(second.claim('cold', 'bob'))
+
+    def test_item_bumped_by_another_worker_is_requeued_not_lost(self):
+        first, second = kitchen.KitchenScheduler(), kitchen.KitchenScheduler()
+        first.refresh(force=True)
+        second.refresh(force=True)
+        second.bump(self.item_ids[2])
+        # The first worker's copy of the bumped item is stale; its claim fails and the item is requeued
+        claimed = [first.claim('cold', 'ann')['order_item_id'] for _ in self.item_ids]
+        self.assertEqual(sorted(claimed), sorted(self.item_ids))
+        self.assertIsNone(first.claim('cold', 'ann'))
+
+    @override_settings(KITCHEN_SETTINGS={'claim_timeout_seconds': 60, 'refresh_seconds': 0})
+    def test_abandoned_claims_go_back_to_the_queue(self):
+        scheduler = kitchen.KitchenScheduler()
+        claimed = scheduler.claim('cold', 'ann')
+        OrderItemModel.update_one(
+            {'order_item_id': claimed['order_item_id']}, {'claimed_at': datetime.utcnow() - timedelta(minutes=5)}
+        )
+        scheduler.refresh(force=True)
+        item = scheduler.claim('cold', 'bob')
+        self.assertEqual((item['order_item_id'], item['claimed_by']), (claimed['order_item_id'], 'bob'))
+
+
+class TableAllocationTests(SimpleTestCase):
+    def at(self, hour, minute=0):
+        return datetime(2026, 1, 5, hour, minute)
+
+    def test_conflicts_are_half_open(self):
+        schedule = TableSchedule()
+        schedule.add(self.at(10), self.at(11), 'r1')
+        schedule.add(self.at(12), self.at(13), 'r2')
+        self.assertFalse(schedule.conflicts(self.at(11), self.at(12)))
+        self.assertFalse(schedule.conflicts(self.at(13), self.at(14)))
+        self.assertTrue(schedule.conflicts(self.at(9), self.at(10, 1)))
+        self.assertTrue(schedule.conflicts(self.at(10, 15), self.at(10, 30)))
+        self.assertTrue(schedule.conflicts(self.at(11, 30), self.at(12, 30)))
+        schedule.remove(self.at(12), self.at(13), 'r2')
+        self.assertFalse(schedule.conflicts(self.at(11, 30), self.at(12, 30)))
+
+    def allocator(self):
+        allocator = TableAllocator()
+        allocator.load_tables([
+            {'table_id': 't1', 'table_number': 1, 'number_of_guests': 2, 'zone': 'hall'},
+            {'table_id': 't2', 'table_number': 2, 'number_of_guests': 2, 'zone': 'hall'},
+            {'table_id': 't3', 'table_number': 3, 'number_of_guests': 4, 'zone': 'hall'},
+            {'table_id': 't5', 'table_number': 5, 'number_of_guests': 4, 'zone': 'hall'},
+            {'table_id': 'p4', 'table_number': 4, 'number_of_guests': 2, 'zone': 'patio'},
+        ])
+        return allocator
+
+    def test_smallest_table_that_fits(self):
+        options = self.allocator().options(3, self.at(18), self.at(20))
+        self.assertEqual(options[0]['table_ids'], ['t3'])
+        self.assertEqual(options[0]['empty_seats'], 1)
+
+    def test_joins_only_adjacent_free_tables_in_one_zone(self):
+        allocator = self.allocator()
+        options = allocator.options(6, self.at(18), self.at(20))
+        self.assertEqual(options[0]['table_ids'], ['t2', 't3'])
+        self.assertTrue(all(len(option['table_ids']) > 1 for option in options))
+        # t3 and t5 are not adjacent and p4 is in another zone
+        self.assertNotIn(['t3', 't5'], [option['table_ids'] for option in options])
+        self.assertFalse(any('p4' in option['table_ids'] for option in options))
+
+        allocator.apply([{
+            'reservation_id': 'r1', 'table_ids': ['t2'], 'status': 'BOOKED',
+            'start_time': self.at(19), 'end_time': self.at(21),
+        }])
+        self.assertEqual(allocator.options(6, self.at(18), self.at(20)), [])
+        self.assertEqual(allocator.options(6, self.at(21), self.at(23))[0]['table_ids'], ['t2', 't3'])
+
+
+class LocalBucketStoreTests(SimpleTestCase):
+    @mock.patch('restaurant_management.throttling.time.monotonic')
+    def test_burst_then_refill(self, monotonic):
+        monotonic.return_value = 100.0
+        store = LocalBucketStore()
+        self.assertEqual(store.consume('client', 3, rate=1, burst=5), (True, 0))
+        self.assertEqual(store.consume('client', 2, rate=1, burst=5), (True, 0))
+        self.assertEqual(store.consume('client', 2, rate=1, burst=5), (False, 2))
+        # Other clients have their own bucket
+        self.assertEqual(store.consume('other', 5, rate=1, burst=5), (True, 0))
+
+        monotonic.return_value = 102.0
+        self.assertEqual(store.consume('client', 2, rate=1, burst=5), (True, 0))
+        # Refills never go past the burst size
+        monotonic.return_value = 1000.0
+        self.assertEqual(store.consume('client', 6, rate=1, burst=5), (False, 1))
+
+
+class CatalogImportTests(MongoTestCase):
+    def test_reports_bad_rows_and_imports_the_rest(self):
+        report = catalog.import_menus([
+            {'name': 'Lunch', 'category': 'Main Course', 'start_date': '2026-01-01', 'end_date': '2026-12-31'},
+            {'name': 'Broken', 'category': '', 'start_date': '2026-01-01', 'end_date': '2026-12-31'},
+            {'name': 'Backwards', 'category': 'Desserts', 'start_date': '2026-02-01', 'end_date': '2026-01-01'},
+        ])
+        self.assertEqual((report.rows, report.inserted, report.failed), (3, 1, 2))
+        self.assertEqual(report.errors, [
+            {'row': 2, 'error': 'category is required'},
+            {'row': 3, 'error': 'Start date must be before end date.'},
+        ])
+        self.assertEqual([menu['name'] for menu in MenuModel.find_many({})], ['Lunch'])
+
+    def test_last_row_wins_for_a_repeated_key(self):
+        catalog.import_menus([
+            {'name': 'Lunch', 'category': 'Main Course', 'start_date': '2026-01-01', 'end_date': '2026-12-31'},
+        ])
+        report = catalog.import_foods([
+            {'name': 'Soup', 'price': '3', 'menu': 'Lunch'},
+            {'name': 'Soup', 'price': '4.25', 'menu': 'Lunch'},
+            {'name': 'Stew', 'price': 'free', 'menu': 'Lunch'},
+            {'name': 'Pie', 'price': '5', 'menu': 'Dinner'},
+        ], batch_size=10)
+        self.assertEqual((report.inserted, report.failed), (1, 2))
+        self.assertEqual([error['row'] for error in report.errors], [3, 4])
+        self.assertIn('Menu not found: Dinner', report.errors[1]['error'])
+        foods = FoodService.get_foods()
+        self.assertEqual([(food['name'], food['price']) for food in foods], [('Soup', 4.25)])
+
+        again = catalog.import_foods([{'name': 'Soup', 'price': '5', 'menu': 'Lunch'}])
+        self.assertEqual((again.inserted, again.updated), (0, 1))
+        self.assertEqual(FoodService.count_foods(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        report = catalog.import_menus([
+            {'name': 'Lunch', 'category': 'Main Course', 'start_date': '2026-01-01', 'end_date': '2026-12-31'},
+        ], dry_run=True)
+        self.assertEqual((report.rows, report.failed), (1, 0))
+        self.assertEqual(MenuModel.count(), 0)
+
+
+class SalesReportTests(MongoTestCase):
+    def test_merge_into_sums_nested_numbers(self):
+        total = {'orders': 1, 'by_food': {'soup': {'quantity': 2, 'name': 'Soup'}}}
+        reports.merge_into(total, {'orders': 2, 'by_food': {'soup': {'quantity': 1, 'name': 'Other'}, 'pie': {'quantity': 4}}})
+        self.assertEqual(total, {'orders': 3, 'by_food': {'soup': {'quantity': 3, 'name': 'Soup'}, 'pie': {'quantity': 4}}})
+
+    def test_rerun_reuses_finished_shards_of_closed_days(self):
+        _, food_id = create_catalog(price=10)
+        for day in ('2026-01-01', '2026-01-02'):
+            CheckoutService.checkout({
+                'order_date': f"{day}T12:00:00", 'items': [{'food_id': food_id, 'quantity': 1}], 'payment_method': 'CARD',
+            })
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+
+        def run():
+            # Shards run in threads here: worker processes would not see the in-memory database
+            with mock.patch.object(reports, 'ProcessPoolExecutor', ThreadPoolExecutor), \
+                    mock.patch.object(reports, '_init_worker', lambda: None), \
+                    mock.patch.object(reports, '_run_shard', wraps=reports._run_shard) as run_shard:
+                report = reports.run_report(date(2026, 1, 1), date(2026, 1, 2), output_dir, restaurant_ids=[None])
+            return report, sorted(call.args[1] for call in run_shard.call_args_list)
+
+        report, built = run()
+        self.assertEqual((report['orders'], built), (2, ['2026-01-01', '2026-01-02']))
+
+        # An interrupted run left only the first shard behind
+        os.remove(reports._shard_path(output_dir, None, '2026-01-02'))
+        CheckoutService.checkout({
+            'order_date': '2026-01-01T13:00:00', 'items': [{'food_id': food_id, 'quantity': 1}], 'payment_method': 'CARD',
+        })
+        report, built = run()
+        self.assertEqual(built, ['2026-01-02'])
+        self.assertEqual(report['orders'], 2)
+        self.assertEqual(report['by_day']['2026-01-02']['orders'], 1)
+
+
+@jobs.task(name='restaurant.tests.failing_job')
+def failing_job():
+    raise RuntimeError('kitchen printer offline')
+
+
+class JobTests(MongoTestCase):
+    def running(self, job_id, attempts, locked_by='worker-1', locked_until=None):
+        """Mark a job as claimed, as Worker.claim does"""
+        JobModel.update_one({'job_id': job_id}, {
+            'status': jobs.RUNNING, 'attempts': attempts, 'locked_by': locked_by,
+            'locked_until': locked_until or datetime.utcnow() + timedelta(minutes=5),
+        })
+        return JobModel.find_one({'job_id': job_id})
+
+    def test_failed_job_is_retried_with_backoff_then_fails(self):
+        job_id = failing_job.apply_async()
+        worker = jobs.Worker('worker-1')
+        max_attempts = JobModel.find_one({'job_id': job_id})['max_attempts']
+
+        self.assertFalse(worker.run_job(self.running(job_id, attempts=1)))
+        job = JobModel.find_one({'job_id': job_id})
+        self.assertEqual((job['status'], job['last_error']), (jobs.QUEUED, 'kitchen printer offline'))
+        self.assertGreater(job['run_at'], datetime.utcnow())
+
+        worker.run_job(self.running(job_id, attempts=max_attempts))
+        self.assertEqual(JobModel.find_one({'job_id': job_id})['status'], jobs.FAILED)
+
+    def test_backoff_grows_and_is_capped(self):
+        with mock.patch('restaurant_management.jobs.random.uniform', return_value=1.0):
+            self.assertEqual([jobs.backoff_seconds(attempts) for attempts in (1, 2, 3)], [5, 10, 20])
+            self.assertEqual(jobs.backoff_seconds(30), 600)
+
+    def test_expired_claims_are_requeued_or_failed(self):
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        retry_id = failing_job.apply_async()
+        spent_id = failing_job.apply_async()
+        live_id = failing_job.apply_async()
+        self.running(retry_id, attempts=1, locked_until=expired)
+        self.running(spent_id, attempts=JobModel.find_one({'job_id': spent_id})['max_attempts'], locked_until=expired)
+        self.running(live_id, attempts=1)
+
+        jobs.Worker('worker-2').requeue_expired()
+        statuses = {job['job_id']: job['status'] for job in JobModel.find_many({})}
+        self.assertEqual(statuses, {retry_id: jobs.QUEUED, spent_id: jobs.FAILED, live_id: jobs.RUNNING})
+
+    def test_late_worker_does_not_overwrite_a_reclaimed_job(self):
+        job_id = failing_job.apply_async()
+        job = self.running(job_id, attempts=1)
+        # The claim expired and another worker took the job meanwhile
+        self.running(job_id, attempts=2, locked_by='worker-2')
+        jobs.Worker('worker-1').run_job(job)
+        self.assertEqual(JobModel.find_one({'job_id': job_id})['locked_by'], 'worker-2')
+
+
+class TableBillTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.food_id = create_catalog(price=5)
+        self.table_id = TableService.create_table({'table_number': 7, 'number_of_guests': 4, 'zone': 'patio'})
+        self.order_id = CheckoutService.checkout({
+            'table_id': self.table_id, 'order_date': '2026-01-05T12:00:00',
+            'items': [{'food_id': self.food_id, 'quantity': 2}], 'payment_method': 'CASH',
+        })['order']['order_id']
+
+    def test_etag_follows_the_order_version(self):
+        etag, bill = bills.get_table_bill(self.table_id, '2026-01-05')
+        self.assertEqual((bill['totals']['item_count'], bill['table']['table_number']), (2, 7))
+        self.assertEqual(bills.get_table_bill(self.table_id, '2026-01-05', if_none_match=etag), (etag, None))
+
+        OrderItemService.create_order_item({'order_id': self.order_id, 'food_id': self.food_id, 'quantity': 1})
+        new_etag, bill = bills.get_table_bill(self.table_id, '2026-01-05', if_none_match=etag)
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(bill['totals']['item_count'], 3)
+
+    def test_cached_bill_is_not_rebuilt(self):
+        bills.get_table_bill(self.table_id, '2026-01-05')
+        with mock.patch.object(OrderModel, 'aggregate') as aggregate:
+            etag, bill = bills.get_table_bill(self.table_id, '2026-01-05')
+        aggregate.assert_not_called()
+        self.assertIsNotNone(bill)
+
+    def test_view_answers_304_for_a_current_copy(self):
+        client = APIClient()
+        client.force_authenticate(mock.Mock(is_authenticated=True))
+        url = f"/api/tables/{self.table_id}/bill/?date=2026-01-05"
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(client.get(f"/api/tables/{self.table_id}/bill/?date=2026-01-04").status_code, 404)
+
+
+class BatchGetTests(MongoTestCase):
+    def test_find_by_ids_keeps_request_order_with_misses(self):
+        for menu_id in ('a', 'b', 'c'):
+            MenuModel.create({'menu_id': menu_id, 'name': menu_id.upper(), 'category': 'Starters'})
+        menus = MenuModel.find_by_ids(['c', 'missing', 'a', 'c'])
+        self.assertEqual([menu and menu['menu_id'] for menu in menus], ['c', None, 'a', 'c'])
+
+    def test_cached_documents_are_not_fetched_again(self):
+        MenuModel.create({'menu_id': 'a', 'name': 'A', 'category': 'Starters'})
+        cache = ReadCache(max_entries=10, ttl_seconds=60)
+        MenuModel.find_by_ids(['a'], cache=cache)
+        with mock.patch.object(MenuModel, 'find_many') as find_many:
+            self.assertEqual(MenuModel.find_by_ids(['a'], cache=cache)[0]['name'], 'A')
+        find_many.assert_not_called()
+
+    def test_endpoint_lists_missing_ids(self):
+        MenuModel.create({'menu_id': 'a', 'name': 'A', 'category': 'Starters'})
+        response = APIClient().post('/api/menus/batch-get/', {'ids': ['x', 'a']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([menu and menu['name'] for menu in response.json()['menus']], [None, 'A'])
+        self.assertEqual(response.json()['missing'], ['x'])
+        too_many = [str(i) for i in range(1000)]
+        self.assertEqual(APIClient().post('/api/menus/batch-get/', {'ids': too_many}, format='json').status_code, 400)
+
+
+class FastSerializerTests(SimpleTestCase):
+    def test_many_matches_drf_field_by_field(self):
+        now = datetime(2026, 1, 5, 12, 30, 15, 123000)
+        items = [
+            {'order_item_id': 'i1', 'order_id': 'o1', 'food_id': 'f1', 'quantity': 2, 'food_name': 'Soup',
+             'unit_price': 4, 'total_price': 8, 'course': 1, 'created_at': now, 'updated_at': now},
+            {'order_item_id': 'i2', 'order_id': 'o1', 'food_id': 'f2', 'quantity': 1, 'unit_price': 2.5,
+             'food_name': None, 'created_at': '2026-01-05T12:00:00Z'},
+        ]
+        orders = [
+            {'order_id': 'o1', 'order_date': now, 'order_day': '2026-01-05', 'table_id': None, 'subtotal': 10.5,
+             'item_count': 3, 'version': 2, 'created_at': now},
+            {'order_id': 'o2', 'order_date': now.replace(microsecond=0)},
+        ]
+        for serializer_class, documents in ((OrderItemSerializer, items), (OrderSerializer, orders)):
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = [serializer_class(document).data for document in documents]
+                actual = serializer_class(documents, many=True).data
+                self.assertEqual(orjson.dumps(list(actual)), orjson.dumps([dict(row) for row in expected]))
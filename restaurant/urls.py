@@ -4,37 +4,74 @@ from . import views
 urlpatterns = [
     # Menu endpoints
     path('menus/', views.get_menus, name='get-menus'),
-    path('menus/<str:menu_id>/', views.get_menu, name='get-menu'),
+    path('menus/batch-get/', views.batch_get_menus, name='batch-get-menus'),
     path('menus/create/', views.create_menu, name='create-menu'),
+    path('menus/<str:menu_id>/', views.get_menu, name='get-menu'),
     path('menus/update/<str:menu_id>/', views.update_menu, name='update-menu'),
     
     # Food endpoints
     path('foods/', views.get_foods, name='get-foods'),
-    path('foods/<str:food_id>/', views.get_food, name='get-food'),
+    path('foods/search/', views.search_foods, name='search-foods'),
+    path('foods/batch-get/', views.batch_get_foods, name='batch-get-foods'),
     path('foods/create/', views.create_food, name='create-food'),
+    path('foods/<str:food_id>/', views.get_food, name='get-food'),
     path('foods/update/<str:food_id>/', views.update_food, name='update-food'),
     
     # Table endpoints
     path('tables/', views.get_tables, name='get-tables'),
-    path('tables/<str:table_id>/', views.get_table, name='get-table'),
+    path('tables/suggest/', views.suggest_tables, name='suggest-tables'),
+    path('tables/batch-get/', views.batch_get_tables, name='batch-get-tables'),
     path('tables/create/', views.create_table, name='create-table'),
+    path('tables/<str:table_id>/', views.get_table, name='get-table'),
+    path('tables/<str:table_id>/bill/', views.get_table_bill, name='get-table-bill'),
     path('tables/update/<str:table_id>/', views.update_table, name='update-table'),
     
     # Order endpoints
     path('orders/', views.get_orders, name='get-orders'),
-    path('orders/<str:order_id>/', views.get_order, name='get-order'),
+    path('orders/history/', views.get_order_history, name='get-order-history'),
+    path('orders/daily-sales/', views.get_daily_sales, name='get-daily-sales'),
+    path('orders/batch-get/', views.batch_get_orders, name='batch-get-orders'),
     path('orders/create/', views.create_order, name='create-order'),
+    path('orders/<str:order_id>/', views.get_order, name='get-order'),
+    path('orders/<str:order_id>/totals/', views.get_order_totals, name='get-order-totals'),
     path('orders/update/<str:order_id>/', views.update_order, name='update-order'),
     
     # Order Item endpoints
     path('orderItems/', views.get_order_items, name='get-order-items'),
-    path('orderItems/<str:order_item_id>/', views.get_order_item, name='get-order-item'),
+    path('orderItems/batch-get/', views.batch_get_order_items, name='batch-get-order-items'),
     path('orderItems/create/', views.create_order_item, name='create-order-item'),
+    path('orderItems/<str:order_item_id>/', views.get_order_item, name='get-order-item'),
     path('orderItems/update/<str:order_item_id>/', views.update_order_item, name='update-order-item'),
+    path('orderItems/delete/<str:order_item_id>/', views.delete_order_item, name='delete-order-item'),
     
     # Invoice endpoints
     path('invoices/', views.get_invoices, name='get-invoices'),
-    path('invoices/<str:invoice_id>/', views.get_invoice, name='get-invoice'),
+    path('invoices/batch-get/', views.batch_get_invoices, name='batch-get-invoices'),
     path('invoices/create/', views.create_invoice, name='create-invoice'),
+    path('invoices/<str:invoice_id>/', views.get_invoice, name='get-invoice'),
     path('invoices/update/<str:invoice_id>/', views.update_invoice, name='update-invoice'),
+
+    # Reservation endpoints
+    path('reservations/', views.get_reservations, name='get-reservations'),
+    path('reservations/create/', views.create_reservation, name='create-reservation'),
+    path('reservations/status/<str:reservation_id>/', views.update_reservation_status, name='update-reservation-status'),
+    path('reservations/<str:reservation_id>/', views.get_reservation, name='get-reservation'),
+
+    # Checkout endpoints
+    path('checkout/', views.checkout, name='checkout'),
+
+    # Kitchen endpoints
+    path('kitchen/<str:station>/queue/', views.get_station_queue, name='get-station-queue'),
+    path('kitchen/<str:station>/claim/', views.claim_station_item, name='claim-station-item'),
+    path('kitchen/items/<str:order_item_id>/bump/', views.bump_kitchen_item, name='bump-kitchen-item'),
+    path('kitchen/items/<str:order_item_id>/complete/', views.complete_kitchen_item, name='complete-kitchen-item'),
+
+    # Catalog endpoints
+    path('catalog/import/<str:kind>/', views.import_catalog, name='import-catalog'),
+    path('catalog/export/<str:kind>/', views.export_catalog, name='export-catalog'),
+
+    # Metrics endpoints
+    path('metrics/db/', views.get_db_metrics, name='get-db-metrics'),
+    path('metrics/middleware/', views.get_middleware_metrics, name='get-middleware-metrics'),
+    path('metrics/jobs/', views.get_job_metrics, name='get-job-metrics'),
 ]
\ No newline at end of file
@@ -1,47 +1,145 @@
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import datetime
+from django.utils.dateparse import parse_date
+from datetime import datetime, timedelta
+import orjson
 
+from restaurant_management import jobs
+from restaurant_management.admission import get_limiter
+from restaurant_management.metrics import db_latency, middleware_latency
+from restaurant_management.read_cache import get_read_cache
+from restaurant_management.renderers import ORJSON_OPTIONS, encode_default
+from . import bills, catalog, catalog_store, kitchen
 from .models import (
     MenuService, FoodService, TableService, 
-    OrderService, OrderItemService, InvoiceService
+    OrderService, OrderItemService, InvoiceService,
+    CheckoutService, ReservationService, parse_datetime_value
 )
+from .serializers import (
+    MenuSerializer, FoodSerializer, TableSerializer,
+    OrderSerializer, OrderItemSerializer, InvoiceSerializer
+)
+
+
+def page_rows(serializer_class, documents):
+    """One list page as the serializer renders it; the catalog store's pages are already encoded that way"""
+    if catalog_store.is_enabled():
+        return documents
+    return serializer_class(documents, many=True).data
+
+
+def parse_catalog_filters(request):
+    """Read the category and active date window filters shared by menu and food lists"""
+    filters = {'category': request.GET.get('category') or None}
+    active_on = request.GET.get('active_on')
+    active_from = request.GET.get('active_from', active_on)
+    active_to = request.GET.get('active_to', active_on)
+    filters['active_from'] = parse_datetime_value(active_from, 'active_from') if active_from else None
+    filters['active_to'] = parse_datetime_value(active_to, 'active_to') if active_to else None
+    return filters
+
+
+def parse_history_range(request):
+    """
+    Read the from/to range of the order history. Date-only bounds cover
+    whole days, so from=2024-01-02&to=2024-01-02 is all of that day.
+    """
+    start_value = request.GET.get('from')
+    if not start_value:
+        raise ValueError('from is required')
+    end_value = request.GET.get('to', start_value)
+    
+    start = parse_datetime_value(start_value, 'from')
+    end = parse_datetime_value(end_value, 'to')
+    if parse_date(end_value):
+        end += timedelta(days=1)
+    if end <= start:
+        raise ValueError('to must not be before from')
+    max_days = getattr(settings, 'ORDER_HISTORY_MAX_DAYS', 366)
+    if end - start > timedelta(days=max_days):
+        raise ValueError(f"The range may cover at most {max_days} days")
+    return start, end
+
+
+def batch_get_response(request, fetch, name):
+    """
+    Look up the IDs in the request body's `ids` list with one batched query.
+    Results keep the request order, with null where an ID was not found.
+    """
+    try:
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(document_id, str) for document_id in ids):
+            raise ValueError('ids must be a list of strings')
+        if len(ids) > settings.BATCH_GET_MAX_IDS:
+            raise ValueError(f"At most {settings.BATCH_GET_MAX_IDS} ids per request")
+    except (ValueError, AttributeError) as e:
+        return Response({
+            'success': False,
+            'message': 'Invalid batch request',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        documents = fetch(ids)
+        
+        return Response({
+            'success': True,
+            name: documents,
+            'missing': [document_id for document_id, document in zip(ids, documents) if document is None]
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f"Error occurred while fetching {name.replace('_', ' ')}",
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def parse_food_filters(request):
+    """Read the food list filters: menu, price range, menu category and active window"""
+    filters = parse_catalog_filters(request)
+    filters['menu_id'] = request.GET.get('menu_id') or None
+    for field in ('min_price', 'max_price'):
+        value = request.GET.get(field)
+        try:
+            filters[field] = float(value) if value else None
+        except ValueError:
+            raise ValueError(f"{field} must be a number")
+    return filters
 
 
 # Menu Views
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_menus(request):
+    try:
+        filters = parse_catalog_filters(request)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': 'Invalid menu filters',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('recordPerPage', 10))
         
-        total_count = MenuService.count_menus()
-        
         # Pagination
         start_index = (page - 1) * per_page
-        menus = MenuService.get_menus(skip=start_index, limit=per_page)
-        
-        # Convert ObjectId and datetime to string for JSON serialization
-        for menu in menus:
-            if '_id' in menu:
-                menu['_id'] = str(menu['_id'])
-            if 'created_at' in menu:
-                menu['created_at'] = menu['created_at'].isoformat()
-            if 'updated_at' in menu:
-                menu['updated_at'] = menu['updated_at'].isoformat()
-            if 'start_date' in menu:
-                menu['start_date'] = menu['start_date'].isoformat() if hasattr(menu['start_date'], 'isoformat') else str(menu['start_date'])
-            if 'end_date' in menu:
-                menu['end_date'] = menu['end_date'].isoformat() if hasattr(menu['end_date'], 'isoformat') else str(menu['end_date'])
+        total_count, menus = MenuService.page_menus(skip=start_index, limit=per_page, **filters)
         
         return Response({
             'success': True,
             'total_count': total_count,
-            'menus': menus,
+            'menus': page_rows(MenuSerializer, menus),
             'page': page,
             'per_page': per_page
         }, status=status.HTTP_200_OK)
@@ -54,11 +152,23 @@ def get_menus(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_get_menus(request):
+    return batch_get_response(request, MenuService.get_menus_by_ids, 'menus')
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_menu(request, menu_id):
     try:
-        menu = get_object_or_404(Menu, menu_id=menu_id)
+        menu = MenuService.get_menu(menu_id)
+        if not menu:
+            return Response({
+                'success': False,
+                'message': 'Menu not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         menu_data = MenuSerializer(menu).data
         
         return Response({
@@ -102,7 +212,13 @@ def create_menu(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_menu(request, menu_id):
     try:
-        menu = get_object_or_404(Menu, menu_id=menu_id)
+        menu = MenuService.get_menu(menu_id)
+        if not menu:
+            return Response({
+                'success': False,
+                'message': 'Menu not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         serializer = MenuSerializer(menu, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         updated_menu = serializer.save()
@@ -127,24 +243,27 @@ def update_menu(request, menu_id):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_foods(request):
+    try:
+        filters = parse_food_filters(request)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': 'Invalid food filters',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('recordPerPage', 10))
         
-        foods = Food.objects.all().order_by('-created_at')
-        total_count = foods.count()
-        
         # Pagination
         start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_foods = foods[start_index:end_index]
-        
-        foods_data = FoodSerializer(paginated_foods, many=True).data
+        total_count, foods = FoodService.page_foods(skip=start_index, limit=per_page, **filters)
         
         return Response({
             'success': True,
             'total_count': total_count,
-            'food_items': foods_data,
+            'food_items': page_rows(FoodSerializer, foods),
             'page': page,
             'per_page': per_page
         }, status=status.HTTP_200_OK)
@@ -157,11 +276,54 @@ def get_foods(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def search_foods(request):
+    try:
+        query = request.GET.get('q', '').strip()
+        limit = min(int(request.GET.get('limit', 10)), 50)
+        
+        if not query:
+            return Response({
+                'success': False,
+                'message': 'Search query is required',
+                'error': 'Missing q parameter'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        food_items, source = FoodService.search_foods(query, limit=limit)
+        
+        return Response({
+            'success': True,
+            'query': query,
+            'source': source,
+            'food_items': food_items
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while searching food items',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_get_foods(request):
+    return batch_get_response(request, FoodService.get_foods_by_ids, 'foods')
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_food(request, food_id):
     try:
-        food = get_object_or_404(Food, food_id=food_id)
+        food = FoodService.get_food(food_id)
+        if not food:
+            return Response({
+                'success': False,
+                'message': 'Food item not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         food_data = FoodSerializer(food).data
         
         return Response({
@@ -211,7 +373,13 @@ def create_food(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_food(request, food_id):
     try:
-        food = get_object_or_404(Food, food_id=food_id)
+        food = FoodService.get_food(food_id)
+        if not food:
+            return Response({
+                'success': False,
+                'message': 'Food item not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         serializer = FoodSerializer(food, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         
@@ -246,20 +414,14 @@ def get_tables(request):
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('recordPerPage', 10))
         
-        tables = Table.objects.all().order_by('table_number')
-        total_count = tables.count()
-        
         # Pagination
         start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_tables = tables[start_index:end_index]
-        
-        tables_data = TableSerializer(paginated_tables, many=True).data
+        total_count, tables = TableService.page_tables(skip=start_index, limit=per_page)
         
         return Response({
             'success': True,
             'total_count': total_count,
-            'tables': tables_data,
+            'tables': page_rows(TableSerializer, tables),
             'page': page,
             'per_page': per_page
         }, status=status.HTTP_200_OK)
@@ -272,11 +434,23 @@ def get_tables(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_get_tables(request):
+    return batch_get_response(request, TableService.get_tables_by_ids, 'tables')
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_table(request, table_id):
     try:
-        table = get_object_or_404(Table, table_id=table_id)
+        table = TableService.get_table(table_id)
+        if not table:
+            return Response({
+                'success': False,
+                'message': 'Table not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         table_data = TableSerializer(table).data
         
         return Response({
@@ -292,6 +466,36 @@ def get_table(request, table_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_table_bill(request, table_id):
+    try:
+        day = parse_date(request.GET.get('date') or '') or datetime.utcnow().date()
+        etag, bill = bills.get_table_bill(table_id, day.strftime('%Y-%m-%d'), request.META.get('HTTP_IF_NONE_MATCH'))
+        if etag is None:
+            return Response({
+                'success': False,
+                'message': 'No order for this table on that day'
+            }, status=status.HTTP_404_NOT_FOUND)
+        if bill is None:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({
+                'success': True,
+                'bill': bill
+            }, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching the table bill',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_table(request):
@@ -320,7 +524,13 @@ def create_table(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_table(request, table_id):
     try:
-        table = get_object_or_404(Table, table_id=table_id)
+        table = TableService.get_table(table_id)
+        if not table:
+            return Response({
+                'success': False,
+                'message': 'Table not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         serializer = TableSerializer(table, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         updated_table = serializer.save()
@@ -346,7 +556,7 @@ def update_table(request, table_id):
 @permission_classes([permissions.AllowAny])
 def get_orders(request):
     try:
-        orders = Order.objects.all().order_by('-created_at')
+        orders = OrderService.get_orders()
         orders_data = OrderSerializer(orders, many=True).data
         
         return Response({
@@ -362,16 +572,72 @@ def get_orders(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def get_order_history(request):
+    try:
+        start, end = parse_history_range(request)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': 'Invalid order history range',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        orders = iter(OrderService.iter_order_history(
+            start, end,
+            table_id=request.GET.get('table_id') or None,
+            include_items=request.GET.get('include_items') in ('1', 'true', 'True'),
+        ))
+        # Read the first batch now, so a failing query still gets a 500 response
+        first = next(orders, None)
+        
+        def lines():
+            # One JSON document per line, written as the cursor is read. The
+            # status line has gone out by now, so a later error is the last line
+            try:
+                if first is not None:
+                    yield orjson.dumps(first, default=encode_default, option=ORJSON_OPTIONS) + b'\n'
+                for order in orders:
+                    yield orjson.dumps(order, default=encode_default, option=ORJSON_OPTIONS) + b'\n'
+            except Exception as e:
+                yield orjson.dumps({
+                    'success': False,
+                    'message': 'Error occurred while fetching order history',
+                    'error': str(e)
+                }) + b'\n'
+        
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching order history',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_get_orders(request):
+    return batch_get_response(request, OrderService.get_orders_by_ids, 'orders')
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_order(request, order_id):
     try:
-        order = get_object_or_404(Order, order_id=order_id)
-        order_data = OrderSerializer(order).data
+        order = OrderService.get_order(order_id)
+        if not order:
+            return Response({
+                'success': False,
+                'message': 'Order not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
         return Response({
             'success': True,
-            'order': order_data
+            'order': order
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -382,6 +648,30 @@ def get_order(request, order_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def get_order_totals(request, order_id):
+    try:
+        totals = OrderService.get_order_totals(order_id)
+        if not totals:
+            return Response({
+                'success': False,
+                'message': 'Order not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'totals': totals
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching order totals',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_order(request):
@@ -414,7 +704,13 @@ def create_order(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_order(request, order_id):
     try:
-        order = get_object_or_404(Order, order_id=order_id)
+        order = OrderService.get_order(order_id)
+        if not order:
+            return Response({
+                'success': False,
+                'message': 'Order not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         serializer = OrderSerializer(order, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         updated_order = serializer.save()
@@ -443,13 +739,8 @@ def get_order_items(request):
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('recordPerPage', 10))
         
-        order_items = OrderItem.objects.all().order_by('-created_at')
-        total_count = order_items.count()
-        
-        # Pagination
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_items = order_items[start_index:end_index]
+        total_count = OrderItemService.count_order_items()
+        paginated_items = OrderItemService.get_order_items(skip=(page - 1) * per_page, limit=per_page)
         
         items_data = OrderItemSerializer(paginated_items, many=True).data
         
@@ -469,16 +760,26 @@ def get_order_items(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_get_order_items(request):
+    return batch_get_response(request, OrderItemService.get_order_items_by_ids, 'order_items')
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_order_item(request, order_item_id):
     try:
-        order_item = get_object_or_404(OrderItem, order_item_id=order_item_id)
-        item_data = OrderItemSerializer(order_item).data
+        order_item = OrderItemService.get_order_item(order_item_id)
+        if not order_item:
+            return Response({
+                'success': False,
+                'message': 'Order item not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
         return Response({
             'success': True,
-            'order_item': item_data
+            'order_item': order_item
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -495,9 +796,10 @@ def create_order_item(request):
     try:
         serializer = OrderItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        order_item = serializer.save()
+        # The service prices the item and moves the order's totals in one transaction
+        order_item_id = OrderItemService.create_order_item(dict(serializer.validated_data))
         
-        item_data = OrderItemSerializer(order_item).data
+        item_data = OrderItemSerializer(OrderItemService.get_order_item(order_item_id)).data
         
         return Response({
             'success': True,
@@ -517,12 +819,15 @@ def create_order_item(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_order_item(request, order_item_id):
     try:
-        order_item = get_object_or_404(OrderItem, order_item_id=order_item_id)
-        serializer = OrderItemSerializer(order_item, data=request.data, partial=True)
+        serializer = OrderItemSerializer(data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        updated_item = serializer.save()
+        if not OrderItemService.update_order_item(order_item_id, dict(serializer.validated_data)):
+            return Response({
+                'success': False,
+                'message': 'Order item not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        item_data = OrderItemSerializer(updated_item).data
+        item_data = OrderItemSerializer(OrderItemService.get_order_item(order_item_id)).data
         
         return Response({
             'success': True,
@@ -538,6 +843,31 @@ def update_order_item(request, order_item_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def delete_order_item(request, order_item_id):
+    try:
+        order_item = OrderItemService.delete_order_item(order_item_id)
+        if not order_item:
+            return Response({
+                'success': False,
+                'message': 'Order item not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'message': 'Order item deleted successfully',
+            'order_item_id': order_item_id
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Order item deletion failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
 # Invoice Views
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -546,13 +876,8 @@ def get_invoices(request):
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('recordPerPage', 10))
         
-        invoices = Invoice.objects.all().order_by('-created_at')
-        total_count = invoices.count()
-        
-        # Pagination
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_invoices = invoices[start_index:end_index]
+        total_count = InvoiceService.count_invoices()
+        paginated_invoices = InvoiceService.get_invoices(skip=(page - 1) * per_page, limit=per_page)
         
         invoices_data = InvoiceSerializer(paginated_invoices, many=True).data
         
@@ -572,16 +897,26 @@ def get_invoices(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_get_invoices(request):
+    return batch_get_response(request, InvoiceService.get_invoices_by_ids, 'invoices')
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_invoice(request, invoice_id):
     try:
-        invoice = get_object_or_404(Invoice, invoice_id=invoice_id)
-        invoice_data = InvoiceSerializer(invoice).data
+        invoice = InvoiceService.get_invoice(invoice_id)
+        if not invoice:
+            return Response({
+                'success': False,
+                'message': 'Invoice not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
         return Response({
             'success': True,
-            'invoice': invoice_data
+            'invoice': invoice
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -620,7 +955,13 @@ def create_invoice(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_invoice(request, invoice_id):
     try:
-        invoice = get_object_or_404(Invoice, invoice_id=invoice_id)
+        invoice = InvoiceService.get_invoice(invoice_id)
+        if not invoice:
+            return Response({
+                'success': False,
+                'message': 'Invoice not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         serializer = InvoiceSerializer(invoice, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         updated_invoice = serializer.save()
@@ -639,3 +980,372 @@ def update_invoice(request, invoice_id):
             'message': 'Invoice update failed',
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Checkout Views
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def checkout(request):
+    try:
+        result = CheckoutService.checkout(request.data, server_id=str(request.user.pk))
+        
+        return Response({
+            'success': True,
+            'message': 'Checkout completed successfully',
+            'order': result['order'],
+            'order_items': result['order_items'],
+            'invoice': result['invoice']
+        }, status=status.HTTP_201_CREATED)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Checkout failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_daily_sales(request):
+    try:
+        start = parse_date(request.GET.get('from') or '') or datetime.utcnow().date()
+        end = parse_date(request.GET.get('to') or '') or start
+        rollups = OrderService.get_daily_sales(start, end)
+        
+        return Response({
+            'success': True,
+            'from': start,
+            'to': end,
+            'days': rollups
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching daily sales',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Kitchen Views
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_station_queue(request, station):
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 100)
+        order_items = kitchen.get_scheduler().queue(station, limit=limit)
+        
+        return Response({
+            'success': True,
+            'station': station,
+            'order_items': order_items
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching the station queue',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def claim_station_item(request, station):
+    try:
+        cook = request.data.get('cook') or str(request.user.pk)
+        order_item = kitchen.get_scheduler().claim(station, cook)
+        if order_item is None:
+            return Response({
+                'success': False,
+                'message': 'No items waiting at this station'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'message': 'Order item claimed',
+            'order_item': order_item
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Order item claim failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bump_kitchen_item(request, order_item_id):
+    try:
+        order_item = kitchen.get_scheduler().bump(order_item_id)
+        if order_item is None:
+            return Response({
+                'success': False,
+                'message': 'Order item is not waiting in the kitchen'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'message': 'Order item bumped',
+            'order_item': order_item
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Order item bump failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def complete_kitchen_item(request, order_item_id):
+    try:
+        order_item = kitchen.get_scheduler().complete(order_item_id)
+        if order_item is None:
+            return Response({
+                'success': False,
+                'message': 'Order item is not open in the kitchen'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'message': 'Order item completed',
+            'order_item': order_item
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Order item completion failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Reservation Views
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def suggest_tables(request):
+    try:
+        party_size = ReservationService.parse_party_size(request.GET.get('party_size'))
+        start_time, end_time = ReservationService.parse_window({
+            'start_time': request.GET.get('start_time') or datetime.utcnow(),
+            'end_time': request.GET.get('end_time'),
+            'duration_minutes': request.GET.get('duration_minutes'),
+        })
+        limit = min(int(request.GET.get('limit', 3)), 20)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': 'Invalid table suggestion request',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        suggestions = ReservationService.suggest_tables(party_size, start_time, end_time, limit=limit)
+        
+        return Response({
+            'success': True,
+            'party_size': party_size,
+            'start_time': start_time,
+            'end_time': end_time,
+            'suggestions': suggestions
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while suggesting tables',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_reservations(request):
+    try:
+        day = parse_date(request.GET.get('date') or '') or datetime.utcnow().date()
+        reservations = ReservationService.get_reservations(day)
+        
+        return Response({
+            'success': True,
+            'date': day,
+            'total_count': len(reservations),
+            'reservations': reservations
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching reservations',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_reservation(request, reservation_id):
+    try:
+        reservation = ReservationService.get_reservation(reservation_id)
+        if not reservation:
+            return Response({
+                'success': False,
+                'message': 'Reservation not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'reservation': reservation
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching the reservation',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_reservation(request):
+    try:
+        reservation = ReservationService.create_reservation(request.data)
+        
+        return Response({
+            'success': True,
+            'message': 'Reservation created successfully',
+            'reservation': reservation
+        }, status=status.HTTP_201_CREATED)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Reservation creation failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def update_reservation_status(request, reservation_id):
+    try:
+        reservation = ReservationService.update_status(reservation_id, request.data.get('status'))
+        if reservation is None:
+            return Response({
+                'success': False,
+                'message': 'Reservation not found or cannot move to that status'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'message': 'Reservation updated successfully',
+            'reservation': reservation
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Reservation update failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Catalog Views
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+@parser_classes([MultiPartParser])
+def import_catalog(request, kind):
+    try:
+        # Either a multipart upload in `file` or the raw CSV / NDJSON / JSON body
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                raise ValueError('file is required')
+            lines, filename = upload, upload.name
+        else:
+            lines, filename = request.stream, None
+        # Not `format`: DRF reserves that query parameter for renderer selection
+        fmt = request.GET.get('file_format') or catalog.format_for(
+            filename, default='ndjson' if 'ndjson' in request.content_type else 'json' if 'json' in request.content_type else 'csv'
+        )
+        report = catalog.import_rows(
+            kind, catalog.read_rows(lines, fmt, kind=kind),
+            dry_run=request.GET.get('dry_run') in ('1', 'true', 'True'),
+        )
+        
+        return Response({
+            'success': report.failed == 0,
+            'message': f"Imported {report.rows - report.failed} of {report.rows} {kind}",
+            'report': report.as_dict()
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Catalog import failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_catalog(request, kind):
+    try:
+        fmt = request.GET.get('file_format', 'csv')
+        lines = catalog.export_lines(kind, fmt)
+        
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+        return response
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Catalog export failed',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Metrics Views
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_db_metrics(request):
+    return Response({
+        'success': True,
+        'latency_by_profile': db_latency.snapshot(),
+        'admission': get_limiter().snapshot(),
+        'read_cache': get_read_cache().snapshot() if get_read_cache() else None
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_middleware_metrics(request):
+    return Response({
+        'success': True,
+        'enabled': settings.MIDDLEWARE_TIMING,
+        'latency_by_middleware': middleware_latency.snapshot().get('middleware', {})
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_job_metrics(request):
+    try:
+        return Response({
+            'success': True,
+            'jobs': jobs.stats()
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error occurred while fetching job metrics',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,167 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import JsonResponse
+
+# Per-request flag set when a database call was shed, read back by AdmissionMiddleware
+_request_state = ContextVar('admission_state', default=None)
+
+
+def admission_settings():
+    return getattr(settings, 'ADMISSION_SETTINGS', {})
+
+
+def is_enabled():
+    return admission_settings().get('enabled', True)
+
+
+class Overloaded(Exception):
+    """Raised instead of running a database call when the process is out of database slots"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Database is overloaded, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the database calls a process runs at once. A call that finds every
+    slot busy waits up to wait_timeout_ms for one; when the wait queue is
+    full or the wait times out the call is shed, so a slow database sheds
+    excess load instead of piling up requests until latency collapses.
+    """
+
+    def __init__(self, max_in_flight, max_waiting, wait_timeout_ms, retry_after_seconds=1):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout_ms / 1000
+        self.retry_after = retry_after_seconds
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    def is_saturated(self):
+        return self.waiting >= self.max_waiting
+
+    def _shed(self):
+        self.shed += 1
+        state = _request_state.get()
+        if state is not None:
+            state['shed'] = True
+        raise Overloaded(self.retry_after)
+
+    def acquire(self):
+        with self._condition:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return
+            if self.waiting >= self.max_waiting:
+                self._shed()
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.wait_timeout
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._shed()
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self):
+        return {
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'shed': self.shed,
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Process-wide database concurrency limiter, configured from ADMISSION_SETTINGS on first use"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                conf = admission_settings()
+                _limiter = ConcurrencyLimiter(
+                    max_in_flight=conf.get('max_in_flight', 64),
+                    max_waiting=conf.get('max_waiting', 128),
+                    wait_timeout_ms=conf.get('wait_timeout_ms', 200),
+                    retry_after_seconds=conf.get('retry_after_seconds', 1),
+                )
+    return _limiter
+
+
+@contextmanager
+def db_slot():
+    """Hold a database slot for the duration of the block"""
+    if not is_enabled():
+        yield
+        return
+    with get_limiter().slot():
+        yield
+
+
+def overloaded_response(retry_after):
+    response = JsonResponse({
+        'success': False,
+        'message': 'Service is overloaded',
+        'error': 'Too many requests in progress, retry later'
+    }, status=503)
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+class AdmissionMiddleware:
+    """
+    Reject API requests with 503 while the database wait queue is full, and
+    turn any response whose database calls were shed into a 503. Views catch
+    exceptions themselves, so the shed is tracked per request rather than
+    relying on Overloaded reaching the middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_enabled() or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        limiter = get_limiter()
+        if limiter.is_saturated():
+            limiter.shed += 1
+            return overloaded_response(limiter.retry_after)
+
+        state = {'shed': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state['shed'] and not response.streaming:
+            return overloaded_response(limiter.retry_after)
+        return response
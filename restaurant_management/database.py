@@ -1,103 +1,333 @@
 import pymongo
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, read_preferences
+from pymongo.errors import OperationFailure
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
 from django.conf import settings
 from bson import ObjectId
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from . import admission, tenancy
+from .metrics import db_latency
 
 logger = logging.getLogger(__name__)
 
+# Server error codes for an index that exists with other options or another name
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_KEY_SPECS_CONFLICT = 86
+# IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+TRANSACTIONS_NOT_SUPPORTED = 20
+
 
 class MongoDBConnection:
     """
     MongoDB connection utility for the restaurant management system.
     Provides singleton pattern for database connections.
+    The client is created lazily on first use, so importing this module
+    never blocks on server selection.
     """
     _instance = None
     _client = None
     _db = None
+    generation = 0
+    # None until a transaction is refused by a standalone server
+    transactions_supported = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(MongoDBConnection, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if self._client is None:
-            self.connect()
-
     def connect(self):
         """Establish connection to MongoDB"""
         try:
             mongodb_settings = settings.MONGODB_SETTINGS
-            self._client = MongoClient(mongodb_settings['host'])
+            self._client = MongoClient(
+                mongodb_settings['host'],
+                serverSelectionTimeoutMS=mongodb_settings.get('server_selection_timeout_ms', 5000),
+                maxPoolSize=mongodb_settings.get('max_pool_size', 100),
+                minPoolSize=mongodb_settings.get('min_pool_size', 0),
+            )
             self._db = self._client[mongodb_settings['db_name']]
+            self.generation += 1
             logger.info("Connected to MongoDB successfully")
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
 
+    def _ensure_connected(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self.connect()
+
+    @property
+    def is_connected(self):
+        return self._client is not None
+
     @property
     def client(self):
+        self._ensure_connected()
         return self._client
 
     @property
     def db(self):
+        self._ensure_connected()
         return self._db
 
     def get_collection(self, collection_name):
         """Get a specific collection"""
-        return self._db[collection_name]
+        return self.db[collection_name]
+
+    def get_database(self, restaurant_id=None):
+        """Database holding a restaurant's data, per-tenant when routing is 'database'"""
+        if restaurant_id is not None and tenancy.routing() == 'database':
+            return self.client[f"{settings.MONGODB_SETTINGS['db_name']}_{restaurant_id}"]
+        return self.db
+
+    def warm_pool(self, connections):
+        """Open up to `connections` pooled sockets by running concurrent pings"""
+        client = self.client
+        if connections <= 1:
+            client.admin.command('ping')
+            return
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
+
+    def run_transaction(self, callback, fallback=False):
+        """
+        Run callback(session) in a multi-document transaction. Transient
+        errors and unknown commit results are retried by with_transaction.
+        Requires a replica set or sharded cluster; with fallback=True a
+        standalone server runs callback(None) without one instead.
+        """
+        if fallback and self.transactions_supported is False:
+            return callback(None)
+        try:
+            with self.client.start_session() as session:
+                return session.with_transaction(
+                    callback,
+                    read_concern=ReadConcern('snapshot'),
+                    write_concern=WriteConcern(w='majority'),
+                    read_preference=read_preferences.Primary(),
+                )
+        except OperationFailure as e:
+            # The first operation is refused, so nothing was written
+            if e.code != TRANSACTIONS_NOT_SUPPORTED:
+                raise
+            self.transactions_supported = False
+            if not fallback:
+                raise
+            logger.warning("MongoDB does not support transactions (not a replica set); writing without them")
+            return callback(None)
 
     def close(self):
         """Close MongoDB connection"""
         if self._client:
             self._client.close()
 
+    def reset(self):
+        """Drop the client without closing it, e.g. in a forked child process"""
+        with self._lock:
+            self._client = None
+            self._db = None
+
 
 # Singleton instance
 mongodb = MongoDBConnection()
 
 
+READ_PREFERENCES = {
+    'primary': read_preferences.Primary,
+    'primaryPreferred': read_preferences.PrimaryPreferred,
+    'secondary': read_preferences.Secondary,
+    'secondaryPreferred': read_preferences.SecondaryPreferred,
+    'nearest': read_preferences.Nearest,
+}
+
+
+def consistency_options(profile):
+    """
+    Translate a named profile from MONGODB_SETTINGS['consistency_profiles']
+    into Collection.with_options() keyword arguments.
+    """
+    profiles = settings.MONGODB_SETTINGS.get('consistency_profiles', {})
+    if profile not in profiles:
+        raise ValueError(f"Unknown consistency profile: {profile}")
+    profile_settings = profiles[profile]
+
+    options = {}
+    if 'read_preference' in profile_settings:
+        mode = READ_PREFERENCES[profile_settings['read_preference']]
+        max_staleness = profile_settings.get('max_staleness_seconds')
+        if max_staleness and mode is not read_preferences.Primary:
+            options['read_preference'] = mode(max_staleness=max_staleness)
+        else:
+            options['read_preference'] = mode()
+    if 'write_concern' in profile_settings:
+        options['write_concern'] = WriteConcern(**profile_settings['write_concern'])
+    if 'read_concern' in profile_settings:
+        options['read_concern'] = ReadConcern(profile_settings['read_concern'])
+    return options
+
+
 class MongoBaseModel:
     """Base model for MongoDB documents"""
-    
-    def __init__(self, collection_name):
+
+    registry = []
+
+    def __init__(self, collection_name, id_field=None, indexes=None, tenant_scoped=True):
         self.collection_name = collection_name
-        self.collection = mongodb.get_collection(collection_name)
-    
-    def create(self, data):
+        self.id_field = id_field or f"{collection_name}_id"
+        self.indexes = indexes or []
+        self.tenant_scoped = tenant_scoped
+        self._collections = {}
+        self._generation = None
+        MongoBaseModel.registry.append(self)
+
+    @property
+    def restaurant_id(self):
+        """
+        Restaurant the current call is scoped to, None for global collections.
+        With tenancy enabled a restaurant must be selected, so nothing reads
+        or writes across outlets by accident.
+        """
+        if not self.tenant_scoped:
+            return None
+        restaurant_id = tenancy.get_restaurant_id()
+        if restaurant_id is None and tenancy.is_enabled() and not tenancy.is_unscoped():
+            raise tenancy.RestaurantRequired(
+                f"{self.collection_name} belongs to a restaurant, but none is selected"
+            )
+        return restaurant_id
+
+    @property
+    def collection(self):
+        """Collection handle, resolved on first use and routed to the current restaurant"""
+        return self.collection_for(None)
+
+    def collection_for(self, profile):
+        """Collection handle carrying the read preference and concerns of a consistency profile"""
+        db = mongodb.get_database(self.restaurant_id)
+        if self._generation != mongodb.generation:
+            self._collections = {}
+            self._generation = mongodb.generation
+        key = (db.name, profile)
+        collection = self._collections.get(key)
+        if collection is None:
+            collection = db[self.collection_name]
+            if profile is not None:
+                collection = collection.with_options(**consistency_options(profile))
+            self._collections[key] = collection
+        return collection
+
+    def scope(self, filter_dict=None):
+        """Restrict a filter to the current restaurant"""
+        if filter_dict is None:
+            filter_dict = {}
+        restaurant_id = self.restaurant_id
+        if restaurant_id is None:
+            return filter_dict
+        return {**filter_dict, 'restaurant_id': restaurant_id}
+
+    def index_prefix(self):
+        """Leading index keys: restaurant_id first so every scoped query is a prefix match"""
+        if self.tenant_scoped and tenancy.is_enabled():
+            return [('restaurant_id', pymongo.ASCENDING)]
+        return []
+
+    def ensure_indexes(self, shard=False):
+        """Create the declared indexes (and the shard key index when sharding)"""
+        prefix = self.index_prefix()
+        names = [self.collection.create_index(prefix + [(self.id_field, pymongo.ASCENDING)])]
+        for index in self.indexes:
+            keys, options = index if isinstance(index, tuple) else (index, {})
+            if prefix and options.get('unique') and 'partialFilterExpression' not in options:
+                # Unique per restaurant; documents from before tenancy carry no restaurant_id
+                options = {**options, 'partialFilterExpression': {'restaurant_id': {'$exists': True}}}
+            names.append(self._create_index(prefix + list(keys), options))
+        if shard and prefix:
+            names.append(self.collection.create_index(self.shard_key()))
+        return names
+
+    def _create_index(self, keys, options):
+        """Create an index, replacing an existing one on the same keys whose options changed"""
+        try:
+            return self.collection.create_index(keys, **options)
+        except OperationFailure as e:
+            if e.code not in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                raise
+        for name, info in self.collection.index_information().items():
+            if info['key'] == keys:
+                logger.info(f"Replacing index {name} on {self.collection_name} with new options {options}")
+                self.collection.drop_index(name)
+        return self.collection.create_index(keys, **options)
+
+    def shard_key(self):
+        """Range on restaurant_id keeps an outlet's data together, hashed _id spreads its writes"""
+        return [('restaurant_id', pymongo.ASCENDING), ('_id', pymongo.HASHED)]
+
+    @contextmanager
+    def _call(self, profile, operation):
+        """Hold a database slot and record the call's latency"""
+        with admission.db_slot(), db_latency.timer(profile or 'default', operation):
+            yield
+
+    def _prepare(self, data):
+        """Assign _id, the custom ID field and restaurant_id to a new document"""
+        # Add ObjectId if not present
+        if '_id' not in data:
+            data['_id'] = ObjectId()
+
+        # Set the custom ID field based on the ObjectId
+        if self.id_field not in data:
+            data[self.id_field] = str(data['_id'])
+
+        if self.restaurant_id is not None:
+            data['restaurant_id'] = self.restaurant_id
+        return data
+
+    def create(self, data, profile=None, session=None):
         """Create a new document"""
         try:
-            # Add ObjectId if not present
-            if '_id' not in data:
-                data['_id'] = ObjectId()
-            
-            # Set the custom ID field based on the ObjectId
-            id_field = f"{self.collection_name}_id"
-            if id_field not in data:
-                data[id_field] = str(data['_id'])
-            
-            result = self.collection.insert_one(data)
+            self._prepare(data)
+            with self._call(profile, 'insert_one'):
+                result = self.collection_for(profile).insert_one(data, session=session)
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Error creating document in {self.collection_name}: {e}")
             raise
+
+    def create_many(self, documents, profile=None, session=None):
+        """Create several documents in one round trip"""
+        try:
+            for data in documents:
+                self._prepare(data)
+            with self._call(profile, 'insert_many'):
+                result = self.collection_for(profile).insert_many(documents, session=session)
+            return [str(inserted_id) for inserted_id in result.inserted_ids]
+        except Exception as e:
+            logger.error(f"Error creating documents in {self.collection_name}: {e}")
+            raise
     
-    def find_one(self, filter_dict):
+    def find_one(self, filter_dict, profile=None, session=None, projection=None):
         """Find a single document"""
         try:
-            return self.collection.find_one(filter_dict)
+            with self._call(profile, 'find_one'):
+                return self.collection_for(profile).find_one(self.scope(filter_dict), projection, session=session)
         except Exception as e:
             logger.error(f"Error finding document in {self.collection_name}: {e}")
             raise
     
-    def find_many(self, filter_dict=None, skip=0, limit=None, sort=None):
+    def find_many(self, filter_dict=None, skip=0, limit=None, sort=None, profile=None, session=None, projection=None):
         """Find multiple documents"""
         try:
-            if filter_dict is None:
-                filter_dict = {}
-            
-            cursor = self.collection.find(filter_dict)
+            cursor = self.collection_for(profile).find(self.scope(filter_dict), projection, session=session)
             
             if sort:
                 cursor = cursor.sort(sort)
@@ -106,45 +336,232 @@ class MongoBaseModel:
             if limit:
                 cursor = cursor.limit(limit)
             
-            return list(cursor)
+            with self._call(profile, 'find_many'):
+                return list(cursor)
         except Exception as e:
             logger.error(f"Error finding documents in {self.collection_name}: {e}")
             raise
     
-    def count(self, filter_dict=None):
+    def find_by_ids(self, ids, profile=None, cache=None):
+        """
+        Documents for a list of IDs from one $in query, in the order asked
+        for, with None for each ID that was not found. With a ReadCache, cached
+        documents are used and the rest are fetched and added to it.
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        found = cache.get_many(self, unique_ids) if cache is not None else {}
+        missing = [document_id for document_id in unique_ids if document_id not in found]
+        if missing:
+            fetched = {
+                document[self.id_field]: document
+                for document in self.find_many({self.id_field: {'$in': missing}}, profile=profile)
+            }
+            if cache is not None:
+                cache.put_many(self, fetched)
+            found.update(fetched)
+        return [found.get(document_id) for document_id in ids]
+
+    def iter_many(self, filter_dict=None, sort=None, batch_size=500, profile=None, projection=None):
+        """
+        Stream large results batch by batch instead of loading them into a
+        list. The filter is scoped when the cursor is opened, so it is safe to
+        iterate after the request context ends. Each batch is fetched under
+        admission control and recorded in the latency metrics.
+        """
+        try:
+            cursor = self.collection_for(profile).find(self.scope(filter_dict), projection, batch_size=batch_size)
+            if sort:
+                cursor = cursor.sort(sort)
+        except Exception as e:
+            logger.error(f"Error finding documents in {self.collection_name}: {e}")
+            raise
+        return self._stream(cursor, profile, batch_size)
+
+    def _stream(self, cursor, profile, batch_size):
+        """Yield a cursor's documents, fetching each batch under a database slot and timing it"""
+        while True:
+            with self._call(profile, 'iter_many'):
+                batch = list(islice(cursor, batch_size))
+            if not batch:
+                return
+            yield from batch
+    
+    def aggregate(self, filter_dict, pipeline, profile=None, session=None):
+        """
+        Run an aggregation starting with a scoped $match. Later $lookup stages
+        join by globally unique IDs, so they need no scope of their own.
+        """
+        try:
+            stages = [{'$match': self.scope(filter_dict)}, *pipeline]
+            with self._call(profile, 'aggregate'):
+                return list(self.collection_for(profile).aggregate(stages, session=session))
+        except Exception as e:
+            logger.error(f"Error aggregating documents in {self.collection_name}: {e}")
+            raise
+
+    def count(self, filter_dict=None, profile=None):
         """Count documents"""
         try:
-            if filter_dict is None:
-                filter_dict = {}
-            return self.collection.count_documents(filter_dict)
+            with self._call(profile, 'count'):
+                return self.collection_for(profile).count_documents(self.scope(filter_dict))
         except Exception as e:
             logger.error(f"Error counting documents in {self.collection_name}: {e}")
             raise
     
-    def update_one(self, filter_dict, update_dict):
+    def update_one(self, filter_dict, update_dict, profile=None, session=None):
         """Update a single document"""
         try:
-            result = self.collection.update_one(filter_dict, {"$set": update_dict})
+            with self._call(profile, 'update_one'):
+                result = self.collection_for(profile).update_one(
+                    self.scope(filter_dict), {"$set": update_dict}, session=session
+                )
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error updating document in {self.collection_name}: {e}")
             raise
     
-    def delete_one(self, filter_dict):
+    def find_one_and_update(self, filter_dict, update, return_new=True, upsert=False, sort=None, profile=None, session=None):
+        """Atomically update one document with a full update spec (or pipeline) and return it"""
+        try:
+            with self._call(profile, 'find_one_and_update'):
+                return self.collection_for(profile).find_one_and_update(
+                    self.scope(filter_dict), update,
+                    return_document=ReturnDocument.AFTER if return_new else ReturnDocument.BEFORE,
+                    upsert=upsert,
+                    sort=sort,
+                    session=session,
+                )
+        except Exception as e:
+            logger.error(f"Error updating document in {self.collection_name}: {e}")
+            raise
+    
+    def update_many(self, filter_dict, update, profile=None):
+        """Update every matching document with a full update spec"""
+        try:
+            with self._call(profile, 'update_many'):
+                result = self.collection_for(profile).update_many(self.scope(filter_dict), update)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error updating documents in {self.collection_name}: {e}")
+            raise
+    
+    def bulk_write(self, requests, ordered=False, profile=None, session=None):
+        """Send a batch of write operations in one round trip"""
+        try:
+            with self._call(profile, 'bulk_write'):
+                return self.collection_for(profile).bulk_write(requests, ordered=ordered, session=session)
+        except Exception as e:
+            logger.error(f"Error in bulk write to {self.collection_name}: {e}")
+            raise
+    
+    def delete_many(self, filter_dict, profile=None, session=None):
+        """Delete every matching document"""
+        try:
+            with self._call(profile, 'delete_many'):
+                result = self.collection_for(profile).delete_many(self.scope(filter_dict), session=session)
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting documents in {self.collection_name}: {e}")
+            raise
+    
+    def delete_one(self, filter_dict, profile=None):
         """Delete a single document"""
         try:
-            result = self.collection.delete_one(filter_dict)
+            with self._call(profile, 'delete_one'):
+                result = self.collection_for(profile).delete_one(self.scope(filter_dict))
             return result.deleted_count > 0
         except Exception as e:
             logger.error(f"Error deleting document in {self.collection_name}: {e}")
             raise
 
+    def find_one_and_delete(self, filter_dict, profile=None, session=None):
+        """Atomically delete one document and return it"""
+        try:
+            with self._call(profile, 'find_one_and_delete'):
+                return self.collection_for(profile).find_one_and_delete(self.scope(filter_dict), session=session)
+        except Exception as e:
+            logger.error(f"Error deleting document in {self.collection_name}: {e}")
+            raise
+
+
+def discover_restaurant_ids():
+    """Every restaurant with data: per-tenant databases by name, or restaurant_id values in the shared one"""
+    if tenancy.routing() == 'database':
+        prefix = f"{settings.MONGODB_SETTINGS['db_name']}_"
+        return sorted(name[len(prefix):] for name in mongodb.client.list_database_names() if name.startswith(prefix))
+    found = set()
+    with tenancy.unscoped():
+        for model in MongoBaseModel.registry:
+            if model.tenant_scoped:
+                found.update(model.collection.distinct('restaurant_id'))
+    return sorted(restaurant_id for restaurant_id in found if restaurant_id is not None)
+
 
 # Model instances for each collection
-UserModel = MongoBaseModel('user')
-MenuModel = MongoBaseModel('menu')
-FoodModel = MongoBaseModel('food')
-TableModel = MongoBaseModel('table')
-OrderModel = MongoBaseModel('order')
-OrderItemModel = MongoBaseModel('orderItem')
-InvoiceModel = MongoBaseModel('invoice')
\ No newline at end of file
+# API users for every restaurant; users moved from SQLite keep their old primary key as legacy_id
+UserModel = MongoBaseModel('user', tenant_scoped=False, indexes=[
+    ([('email', 1)], {'unique': True}),
+    ([('legacy_id', 1)], {'sparse': True}),
+    # Polled by each worker for users changed elsewhere
+    [('updated_at', 1)],
+])
+# Revoked JWT IDs, keyed by jti; an entry expires with the token it revokes
+RevokedTokenModel = MongoBaseModel('revoked_token', id_field='jti', tenant_scoped=False, indexes=[
+    [('revoked_at', 1)],
+    ([('expires_at', 1)], {'expireAfterSeconds': 0}),
+])
+# Token buckets shared by all workers; idle buckets expire after an hour
+RateLimitModel = MongoBaseModel('rate_limit', tenant_scoped=False, indexes=[
+    ([('updated_at', 1)], {'expireAfterSeconds': 3600}),
+])
+# Background jobs for every restaurant; finished jobs are kept for a week
+JobModel = MongoBaseModel('job', tenant_scoped=False, indexes=[
+    [('status', 1), ('priority', -1), ('run_at', 1)],
+    [('status', 1), ('locked_until', 1)],
+    ([('finished_at', 1)], {'expireAfterSeconds': 7 * 24 * 3600}),
+])
+# Compound indexes follow equality, sort, range order for the list filters
+MenuModel = MongoBaseModel('menu', indexes=[
+    [('created_at', -1)],
+    [('category', 1), ('created_at', -1)],
+    [('start_date', 1), ('end_date', 1)],
+    [('category', 1), ('start_date', 1), ('end_date', 1)],
+    # Natural key for catalog imports
+    ([('name', 1)], {'unique': True}),
+])
+FoodModel = MongoBaseModel('food', indexes=[
+    [('created_at', -1)],
+    [('menu_id', 1), ('created_at', -1), ('price', 1)],
+    [('price', 1)],
+    # Natural key for catalog imports
+    ([('menu_id', 1), ('name', 1)], {'unique': True}),
+    ([('name', 'text')], {'default_language': 'none'}),
+])
+TableModel = MongoBaseModel('table', indexes=[[('table_number', 1)]])
+# Orders are bucketed by order_day so date-range history touches only those days
+OrderModel = MongoBaseModel('order', indexes=[
+    [('created_at', -1)],
+    [('order_day', 1), ('order_date', 1)],
+    [('order_day', 1), ('table_id', 1), ('order_date', 1)],
+    [('order_date', 1)],
+])
+OrderItemModel = MongoBaseModel('orderItem', id_field='order_item_id', indexes=[
+    [('created_at', -1)],
+    [('order_id', 1)],
+    [('kitchen_status', 1), ('updated_at', 1)],
+])
+InvoiceModel = MongoBaseModel('invoice', indexes=[[('created_at', -1)], [('order_id', 1)]])
+SalesRollupModel = MongoBaseModel('sales_rollup', indexes=[[('order_day', 1)]])
+ReservationModel = MongoBaseModel('reservation', indexes=[
+    [('start_time', 1)],
+    [('table_ids', 1), ('start_time', 1)],
+    [('status', 1), ('end_time', 1)],
+    [('updated_at', 1)],
+])
+
+# Cold storage for closed orders, their items and paid invoices
+OrderArchiveModel = MongoBaseModel('order_archive', id_field='order_id', indexes=[
+    [('order_day', 1), ('order_date', 1)],
+])
+OrderItemArchiveModel = MongoBaseModel('orderItem_archive', id_field='order_item_id', indexes=[[('order_id', 1)]])
+InvoiceArchiveModel = MongoBaseModel('invoice_archive', id_field='invoice_id', indexes=[[('order_id', 1)]])
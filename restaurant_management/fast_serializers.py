@@ -0,0 +1,132 @@
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timezone as dt_timezone
+
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601, SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+_MISSING = object()
+
+# Field types whose to_representation returns values of this exact type unchanged
+PASSTHROUGH_TYPES = (
+    (serializers.CharField, str),
+    (serializers.IntegerField, int),
+    (serializers.FloatField, float),
+    (serializers.BooleanField, bool),
+)
+
+
+def _writer(field):
+    """Set one field on an output row exactly as DRF would, for everything the fast path skips"""
+    def write(instance, row):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        row[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+    return write
+
+
+def _is_utc(tz):
+    return tz is dt_timezone.utc or getattr(tz, 'key', None) == 'UTC'
+
+
+def _naive_utc_iso(field):
+    """True when DRF renders a naive datetime for this field as its isoformat() plus 'Z'"""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    return isinstance(output_format, str) and output_format.lower() == ISO_8601 and _is_utc(field_timezone)
+
+
+def _field_code(index, field, namespace):
+    """Source lines reading one field from `doc` into `row`, or None when the field needs DRF's own path"""
+    source_attrs = field.source_attrs
+    if len(source_attrs) != 1 or isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+        return None
+    key, name = source_attrs[0], field.field_name
+    namespace[f"w{index}"] = _writer(field)
+    namespace[f"c{index}"] = field.to_representation
+    lines = [f"    v = get({key!r}, M)"]
+    if isinstance(field, serializers.ReadOnlyField):
+        lines += [
+            f"    if v is M: w{index}(doc, row)",
+            f"    else: row[{name!r}] = v",
+        ]
+        return lines
+
+    fast_type = next((value_type for field_type, value_type in PASSTHROUGH_TYPES if isinstance(field, field_type)), None)
+    if fast_type is not None:
+        namespace[f"t{index}"] = fast_type
+        lines.append(f"    if v.__class__ is t{index}: row[{name!r}] = v")
+    elif isinstance(field, serializers.DateTimeField) and _naive_utc_iso(field):
+        lines.append(f"    if v.__class__ is datetime and v.tzinfo is None: row[{name!r}] = v.isoformat() + 'Z'")
+    else:
+        lines.append("    if False: pass")
+    lines += [
+        f"    elif v is None: row[{name!r}] = None",
+        f"    elif v is M: w{index}(doc, row)",
+        f"    else: row[{name!r}] = c{index}(v)",
+    ]
+    return lines
+
+
+def compile_row_function(serializer):
+    """
+    A function turning one document (a dict) into the same dict
+    serializer.to_representation() returns, generated from the serializer's
+    readable fields. Plain keys of common types are copied or converted
+    inline; nested serializers, method fields, dotted sources and missing
+    keys go through the field's own DRF methods.
+    """
+    namespace = {'M': _MISSING, 'datetime': datetime}
+    lines = ["def to_row(doc):", "    row = {}", "    get = doc.get"]
+    for index, field in enumerate(serializer._readable_fields):
+        code = _field_code(index, field, namespace)
+        if code is None:
+            namespace[f"w{index}"] = _writer(field)
+            code = [f"    w{index}(doc, row)"]
+        lines += code
+    lines.append("    return row")
+    exec(compile('\n'.join(lines), f"<{type(serializer).__name__} row>", 'exec'), namespace)
+    return namespace['to_row']
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def row_function(serializer):
+    """Compiled row function for the serializer's class, built on first use"""
+    serializer_class = type(serializer)
+    to_row = _compiled.get(serializer_class)
+    if to_row is None:
+        with _compiled_lock:
+            to_row = _compiled.get(serializer_class)
+            if to_row is None:
+                to_row = _compiled[serializer_class] = compile_row_function(serializer)
+    return to_row
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """
+    many=True reads through a row function compiled once per serializer
+    class, instead of walking field objects for every row. Rows that are
+    not mappings fall back to the child serializer. Serializers whose
+    fields vary per instance (e.g. with the request) should not use it.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        to_row = row_function(self.child)
+        child = self.child
+        return [to_row(item) if isinstance(item, Mapping) else child.to_representation(item) for item in iterable]
+
+
+class DocumentSerializer(serializers.Serializer):
+    """Serializer for MongoDB documents; many=True uses the compiled fast path"""
+
+    class Meta:
+        list_serializer_class = CompiledListSerializer
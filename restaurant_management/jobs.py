@@ -0,0 +1,196 @@
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from . import tenancy
+from .database import JobModel
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+_tasks = {}
+
+
+def job_settings():
+    return getattr(settings, 'JOB_SETTINGS', {})
+
+
+class Task:
+    """A function registered with @task. Call it to run inline, or .delay() to run it in a job worker"""
+
+    def __init__(self, func, name, priority=0, max_attempts=None, visibility_timeout=None):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, priority=None, countdown=0):
+        return enqueue(
+            self.name, args, kwargs,
+            priority=self.priority if priority is None else priority,
+            countdown=countdown,
+            max_attempts=self.max_attempts,
+            visibility_timeout=self.visibility_timeout,
+        )
+
+
+def task(name=None, priority=0, max_attempts=None, visibility_timeout=None):
+    """
+    Register a function as a background job. Arguments must be storable in
+    MongoDB, and the function should be safe to run more than once: a job
+    whose worker dies is run again after its visibility timeout.
+    """
+    def decorator(func):
+        registered = Task(func, name or f"{func.__module__}.{func.__name__}", priority, max_attempts, visibility_timeout)
+        _tasks[registered.name] = registered
+        return registered
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, priority=0, countdown=0, max_attempts=None, visibility_timeout=None):
+    """
+    Store a job for the task registered as `name`, scoped to the current
+    restaurant. Higher priorities run first. With JOB_SETTINGS['eager'] the
+    task runs inline instead, e.g. in development.
+    """
+    conf = job_settings()
+    if conf.get('eager', False):
+        _tasks[name](*args, **(kwargs or {}))
+        return None
+    now = datetime.utcnow()
+    return JobModel.create({
+        'name': name,
+        'args': list(args),
+        'kwargs': kwargs or {},
+        'restaurant_id': tenancy.get_restaurant_id(),
+        'status': QUEUED,
+        'priority': priority,
+        'attempts': 0,
+        'max_attempts': max_attempts or conf.get('max_attempts', 5),
+        'visibility_timeout': visibility_timeout or conf.get('visibility_timeout_seconds', 300),
+        'run_at': now + timedelta(seconds=countdown),
+        'locked_until': None,
+        'locked_by': None,
+        'last_error': None,
+        'created_at': now,
+        'updated_at': now,
+    })
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with jitter: roughly base, 2x base, 4x base ... up to the cap"""
+    conf = job_settings()
+    delay = min(conf.get('max_backoff_seconds', 600), conf.get('backoff_seconds', 5) * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class Worker:
+    """
+    Claims jobs one at a time, highest priority first. A claim sets
+    locked_until, and a job still RUNNING past that time (its worker died
+    or hung) goes back to the queue, or fails once out of attempts.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        self._expired_checked = 0.0
+
+    def requeue_expired(self):
+        now = datetime.utcnow()
+        expired = {'status': RUNNING, 'locked_until': {'$lt': now}}
+        JobModel.update_many(
+            {**expired, '$expr': {'$gte': ['$attempts', '$max_attempts']}},
+            {'$set': {'status': FAILED, 'last_error': 'Visibility timeout expired', 'finished_at': now, 'updated_at': now}},
+        )
+        JobModel.update_many(expired, {'$set': {'status': QUEUED, 'locked_by': None, 'updated_at': now}})
+
+    def claim(self):
+        now = datetime.utcnow()
+        # Pipeline update so each job's own visibility_timeout sets locked_until in the same write
+        return JobModel.find_one_and_update(
+            {'status': QUEUED, 'run_at': {'$lte': now}},
+            [{'$set': {
+                'status': RUNNING,
+                'locked_by': {'$literal': self.worker_id},
+                'locked_until': {'$add': [now, {'$multiply': ['$visibility_timeout', 1000]}]},
+                'attempts': {'$add': ['$attempts', 1]},
+                'updated_at': now,
+            }}],
+            sort=[('priority', -1), ('run_at', 1)],
+        )
+
+    def _finish(self, job, update):
+        """Record the outcome unless the job was already handed to another worker"""
+        update['updated_at'] = datetime.utcnow()
+        return JobModel.update_one({'_id': job['_id'], 'locked_by': self.worker_id, 'status': RUNNING}, update)
+
+    def run_job(self, job):
+        registered = _tasks.get(job['name'])
+        start = time.perf_counter()
+        try:
+            if registered is None:
+                raise LookupError(f"Unknown task: {job['name']}")
+            with tenancy.use_restaurant(job.get('restaurant_id')):
+                registered.func(*job['args'], **job['kwargs'])
+        except Exception as e:
+            now = datetime.utcnow()
+            if registered is None or job['attempts'] >= job['max_attempts']:
+                logger.error(f"Job {job['job_id']} ({job['name']}) failed permanently: {e}")
+                self._finish(job, {'status': FAILED, 'last_error': str(e), 'finished_at': now})
+            else:
+                delay = backoff_seconds(job['attempts'])
+                logger.warning(f"Job {job['job_id']} ({job['name']}) failed, retrying in {delay:.0f}s: {e}")
+                self._finish(job, {
+                    'status': QUEUED, 'last_error': str(e), 'locked_by': None,
+                    'run_at': now + timedelta(seconds=delay),
+                })
+            return False
+        self._finish(job, {'status': DONE, 'finished_at': datetime.utcnow()})
+        logger.info(f"Job {job['job_id']} ({job['name']}) done in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return True
+
+    def run_once(self):
+        """Run the next due job. Returns False when there was nothing to do"""
+        if time.monotonic() - self._expired_checked > job_settings().get('poll_interval_seconds', 1.0) * 10:
+            self.requeue_expired()
+            self._expired_checked = time.monotonic()
+        job = self.claim()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def run(self, max_jobs=None, exit_when_idle=False):
+        """Work until stopped, polling every poll_interval_seconds while the queue is empty"""
+        processed = 0
+        while not self.stopping and (max_jobs is None or processed < max_jobs):
+            if self.run_once():
+                processed += 1
+            elif exit_when_idle:
+                break
+            else:
+                time.sleep(job_settings().get('poll_interval_seconds', 1.0))
+        return processed
+
+
+def stats():
+    """Job counts by status"""
+    return {status: JobModel.count({'status': status}) for status in (QUEUED, RUNNING, DONE, FAILED)}
@@ -0,0 +1,73 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+
+
+class LatencyMetrics:
+    """
+    In-process latency histograms keyed by (profile, operation).
+    Cheap enough to record on every database call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, profile, operation, elapsed_ms):
+        key = (profile, operation)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * len(BUCKETS_MS)}
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            for i, upper in enumerate(BUCKETS_MS):
+                if elapsed_ms <= upper:
+                    stats['buckets'][i] += 1
+                    break
+
+    @contextmanager
+    def timer(self, profile, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(profile, operation, (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _percentile(stats, quantile):
+        threshold = stats['count'] * quantile
+        cumulative = 0
+        for upper, count in zip(BUCKETS_MS, stats['buckets']):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(upper, stats['max_ms'])
+        return stats['max_ms']
+
+    def snapshot(self):
+        """Summary per profile and operation: count, avg, p50, p99 and max in ms"""
+        with self._lock:
+            items = [(key, dict(stats, buckets=list(stats['buckets']))) for key, stats in self._stats.items()]
+        summary = {}
+        for (profile, operation), stats in items:
+            summary.setdefault(profile, {})[operation] = {
+                'count': stats['count'],
+                'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                'p50_ms': round(self._percentile(stats, 0.5), 3),
+                'p99_ms': round(self._percentile(stats, 0.99), 3),
+                'max_ms': round(stats['max_ms'], 3),
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+db_latency = LatencyMetrics()
+# Per-middleware time, recorded only when MIDDLEWARE_TIMING instruments the stack
+middleware_latency = LatencyMetrics()
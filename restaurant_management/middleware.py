@@ -0,0 +1,104 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+re_qvalue = re.compile(r'^q=([0-9.]+)$')
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an Accept-Encoding header to its q-value; unparseable q-values count as 0"""
+    qvalues = {}
+    for part in header.split(','):
+        coding, *params = [piece.strip() for piece in part.split(';')]
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params:
+            match = re_qvalue.match(param.replace(' ', '').lower())
+            if match:
+                try:
+                    qvalue = float(match.group(1))
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[coding.lower()] = qvalue
+    return qvalues
+
+
+def _brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, depending on Accept-Encoding.
+    Responses smaller than COMPRESSION_SETTINGS['min_size'] are sent as-is,
+    since compressing them costs more CPU than it saves on the wire.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        compression_settings = getattr(settings, 'COMPRESSION_SETTINGS', {})
+        self.min_size = compression_settings.get('min_size', 1024)
+        self.gzip_level = compression_settings.get('gzip_level', 6)
+        self.brotli_quality = compression_settings.get('brotli_quality', 4)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def _choose_encoding(self, request):
+        qvalues = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        wildcard = qvalues.get('*', 0.0)
+        candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+        # Highest q-value wins, brotli on a tie; q=0 means "not acceptable"
+        best = max(candidates, key=lambda coding: qvalues.get(coding, wildcard))
+        return best if qvalues.get(best, wildcard) > 0 else None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self._choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = _brotli_sequence(
+                    response.streaming_content, self.brotli_quality
+                )
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=self.gzip_level, mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # A strong ETag no longer matches the encoded body
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
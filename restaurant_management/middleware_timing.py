@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+
+from .metrics import middleware_latency
+
+
+def instrument(middleware):
+    """
+    MIDDLEWARE with a timing probe in front of every entry and one in front
+    of the view. Each probe times everything below it and subtracts what the
+    next probe timed, so a middleware is charged only for its own work.
+    """
+    instrumented = []
+    for index, path in enumerate(middleware):
+        instrumented += [f"{__name__}.probe_{index}", path]
+    instrumented.append(f"{__name__}.probe_{len(middleware)}")
+    return instrumented
+
+
+class MiddlewareProbe:
+    label = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._inner_ms = 0.0
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = (time.perf_counter() - start) * 1000
+        middleware_latency.record('middleware', self.label, elapsed - request._inner_ms)
+        request._inner_ms = elapsed
+        return response
+
+
+def __getattr__(name):
+    """probe_<n>: the probe in front of the n-th middleware of the instrumented stack, or of the view"""
+    if not name.startswith('probe_'):
+        raise AttributeError(name)
+    index = int(name[len('probe_'):])
+    # Entries alternate probe, middleware, ..., probe; the last probe times the view
+    wrapped = settings.MIDDLEWARE[2 * index + 1:2 * index + 2]
+    label = wrapped[0].rsplit('.', 1)[-1] if wrapped else 'view'
+    return type(f"MiddlewareProbe_{index}", (MiddlewareProbe,), {'label': label})
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import tenancy
+
+
+def read_cache_settings():
+    return getattr(settings, 'READ_CACHE_SETTINGS', {})
+
+
+class ReadCache:
+    """
+    Recently read documents in process memory, keyed by collection,
+    restaurant and ID, least recently used dropped first. Other workers do
+    not see this worker's invalidations, so entries also expire after
+    ttl_seconds; only use it for data that may be that stale.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model, document_id):
+        # Shared collections (e.g. users) have one entry whichever restaurant is active
+        restaurant_id = tenancy.get_restaurant_id() if model.tenant_scoped else None
+        return model.collection_name, restaurant_id, document_id
+
+    def get_many(self, model, ids):
+        """Cached copies of the documents for ids that are present and fresh, by ID"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for document_id in ids:
+                key = self._key(model, document_id)
+                entry = self._entries.get(key)
+                if entry is None or now - entry[1] > self.ttl:
+                    self._entries.pop(key, None)
+                    continue
+                self._entries.move_to_end(key)
+                found[document_id] = dict(entry[0])
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+        return found
+
+    def put_many(self, model, documents):
+        """Store documents, a dict of ID -> document"""
+        now = time.monotonic()
+        with self._lock:
+            for document_id, document in documents.items():
+                key = self._key(model, document_id)
+                self._entries[key] = (dict(document), now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model, ids=None):
+        """Drop the given IDs, or the model's whole collection for the current restaurant"""
+        with self._lock:
+            if ids is not None:
+                for document_id in ids:
+                    self._entries.pop(self._key(model, document_id), None)
+                return
+            restaurant_id = tenancy.get_restaurant_id() if model.tenant_scoped else None
+            for key in [key for key in self._entries if key[0] == model.collection_name and key[1] == restaurant_id]:
+                del self._entries[key]
+
+    def snapshot(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_read_cache():
+    """Process-wide read cache, or None when READ_CACHE_SETTINGS disables it"""
+    global _cache
+    conf = read_cache_settings()
+    if not conf.get('enabled', True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReadCache(conf.get('max_entries', 10000), conf.get('ttl_seconds', 30))
+    return _cache
+
+
+def invalidate(model, ids=None):
+    cache = get_read_cache()
+    if cache is not None:
+        cache.invalidate(model, ids)
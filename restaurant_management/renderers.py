@@ -0,0 +1,89 @@
+import datetime
+from decimal import Decimal
+
+import msgpack
+import orjson
+from bson import ObjectId
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj):
+    """Encode types that orjson/msgpack can't handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class _HasFragments(Exception):
+    pass
+
+
+def msgpack_default(obj):
+    if isinstance(obj, orjson.Fragment):
+        raise _HasFragments
+    return encode_default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON renderer backed by orjson instead of the stdlib encoder"""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack renderer for clients sending Accept: application/msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        try:
+            return msgpack.packb(data, default=msgpack_default, use_bin_type=True)
+        except _HasFragments:
+            # Pre-encoded orjson.Fragment values can only be read back by decoding the JSON
+            data = orjson.loads(orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS))
+            return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class ORJSONParser(BaseParser):
+    """JSON parser backed by orjson"""
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as e:
+            raise ParseError(f"JSON parse error - {e}")
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack parser for bulk uploads"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+            raise ParseError(f"MessagePack parse error - {e}")
@@ -11,8 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,6 +49,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'restaurant_management.admission.AdmissionMiddleware',
+    'restaurant_management.middleware.CompressionMiddleware',
+    'restaurant_management.tenancy.TenantMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +61,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Time every middleware and the view, exposed at /api/metrics/middleware/
+MIDDLEWARE_TIMING = config('MIDDLEWARE_TIMING', default=False, cast=bool)
+if MIDDLEWARE_TIMING:
+    from .middleware_timing import instrument
+    MIDDLEWARE = instrument(MIDDLEWARE)
+
 ROOT_URLCONF = 'restaurant_management.urls'
 
 TEMPLATES = [
@@ -89,8 +99,204 @@ DATABASES = {
 
 # MongoDB Configuration for PyMongo
 MONGODB_SETTINGS = {
+    # Checkout and archiving use multi-document transactions, which need a replica set
+    # (e.g. mongodb://localhost:27017/?replicaSet=rs0); a standalone server refuses them
     'host': config('DB_HOST', default='mongodb://localhost:27017'),
     'db_name': config('DB_NAME', default='restaurant'),
+    'server_selection_timeout_ms': config('DB_SERVER_SELECTION_TIMEOUT_MS', default=5000, cast=int),
+    'max_pool_size': config('DB_MAX_POOL_SIZE', default=100, cast=int),
+    'min_pool_size': config('DB_MIN_POOL_SIZE', default=0, cast=int),
+    # Named read preference / concern profiles, selected per service method
+    'consistency_profiles': {
+        'catalog_read': {'read_preference': 'secondaryPreferred', 'max_staleness_seconds': 90},
+        'report_read': {'read_preference': 'secondaryPreferred', 'max_staleness_seconds': 300},
+        'fast_write': {'write_concern': {'w': 1}},
+        'financial': {
+            'read_preference': 'primary',
+            'read_concern': 'majority',
+            'write_concern': {'w': 'majority', 'j': True},
+        },
+    },
+}
+
+# Multi-location tenancy: every query is scoped to the X-Restaurant-Id header.
+# 'shared' routing keeps all outlets in one database (shard it on restaurant_id),
+# 'database' routing gives each outlet its own <db_name>_<restaurant_id> database.
+TENANCY_SETTINGS = {
+    'enabled': config('TENANCY_ENABLED', default=False, cast=bool),
+    'routing': config('TENANCY_ROUTING', default='shared'),
+    'header': 'HTTP_X_RESTAURANT_ID',
+    'default_restaurant_id': config('DEFAULT_RESTAURANT_ID', default=None),
+    # Restaurants that warm-up, reports and backfills run for (default: every restaurant found in MongoDB)
+    'restaurant_ids': config('TENANCY_RESTAURANT_IDS', default='', cast=Csv()),
+    # Restaurants whose GET endpoints anyone may read; everything else needs a member's token
+    'public_restaurant_ids': config('TENANCY_PUBLIC_RESTAURANT_IDS', default='', cast=Csv()),
+    # Endpoints for data shared by every restaurant, which take no X-Restaurant-Id
+    'global_paths': ('/api/auth/', '/api/metrics/'),
+}
+
+# Food search: in-memory index, rebuilt in the background once older than max_age_seconds
+SEARCH_SETTINGS = {
+    'in_memory': config('SEARCH_IN_MEMORY', default=True, cast=bool),
+    'max_age_seconds': config('SEARCH_MAX_AGE_SECONDS', default=60, cast=int),
+}
+
+# Longest range the streamed order history endpoint accepts
+ORDER_HISTORY_MAX_DAYS = config('ORDER_HISTORY_MAX_DAYS', default=366, cast=int)
+
+# Hot/cold tiering: paid orders older than older_than_days move to *_archive collections
+ARCHIVE_SETTINGS = {
+    'older_than_days': config('ARCHIVE_OLDER_THAN_DAYS', default=90, cast=int),
+    'batch_size': config('ARCHIVE_BATCH_SIZE', default=500, cast=int),
+}
+
+# Kitchen scheduling: menu category -> station and course
+KITCHEN_SETTINGS = {
+    'stations': {
+        'Starters': 'cold',
+        'Salads': 'cold',
+        'Main Course': 'hot',
+        'Grill': 'grill',
+        'Desserts': 'pastry',
+        'Beverages': 'bar',
+    },
+    'courses': {
+        'Starters': 1,
+        'Salads': 1,
+        'Main Course': 2,
+        'Grill': 2,
+        'Desserts': 3,
+        'Beverages': 0,
+    },
+    'default_station': 'hot',
+    'default_course': 2,
+    'refresh_seconds': 1.0,
+    'claim_timeout_seconds': 900,
+    # How often each worker returns timed-out claims to the queue
+    'sweep_seconds': 30,
+}
+
+# Background jobs (python manage.py run_jobs). With JOBS_EAGER=True jobs run inline instead.
+JOB_SETTINGS = {
+    'eager': config('JOBS_EAGER', default=False, cast=bool),
+    'poll_interval_seconds': 1.0,
+    'visibility_timeout_seconds': 300,
+    'max_attempts': 5,
+    'backoff_seconds': 5,
+    'max_backoff_seconds': 600,
+}
+
+# End-of-day sales reports
+REPORT_SETTINGS = {
+    'tax_rate': config('TAX_RATE', default=0.0, cast=float),
+    'prices_include_tax': config('PRICES_INCLUDE_TAX', default=False, cast=bool),
+    'workers': config('REPORT_WORKERS', default=0, cast=int),  # 0 = one per CPU
+    'output_dir': config('REPORT_OUTPUT_DIR', default='reports'),
+    # Shards for the last settle_days days (including today) are rebuilt on every run
+    'settle_days': config('REPORT_SETTLE_DAYS', default=1, cast=int),
+}
+
+# Menus, foods and tables held per worker as compact records with pre-encoded JSON,
+# serving the list endpoints; rebuilt in the background after max_age_seconds, so
+# pages may lag writes made through other workers by that long. Off by default.
+# With a snapshot_dir, workers instead share one memory-mapped snapshot file per restaurant
+CATALOG_STORE_SETTINGS = {
+    'enabled': config('CATALOG_STORE_ENABLED', default=False, cast=bool),
+    'max_age_seconds': config('CATALOG_STORE_MAX_AGE_SECONDS', default=60, cast=int),
+    'snapshot_dir': config('CATALOG_SNAPSHOT_DIR', default=''),
+}
+
+# Batch reads by ID: most IDs one request may ask for, and the per-worker cache
+# that catalog batch reads (menus, foods, tables) go through
+BATCH_GET_MAX_IDS = config('BATCH_GET_MAX_IDS', default=100, cast=int)
+READ_CACHE_SETTINGS = {
+    'enabled': config('READ_CACHE_ENABLED', default=True, cast=bool),
+    'max_entries': config('READ_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    'ttl_seconds': config('READ_CACHE_TTL_SECONDS', default=30, cast=int),
+    # Users changed through any worker are dropped from every worker's cache within this interval
+    'user_sync_seconds': config('READ_CACHE_USER_SYNC_SECONDS', default=1.0, cast=float),
+}
+
+# Revoked token IDs: a per-worker Bloom filter answers "not revoked" without I/O,
+# and each worker polls for other workers' revocations every poll_interval_seconds
+TOKEN_REVOCATION_SETTINGS = {
+    'enabled': config('TOKEN_REVOCATION_ENABLED', default=True, cast=bool),
+    'capacity': config('TOKEN_REVOCATION_CAPACITY', default=100000, cast=int),
+    'false_positive_rate': config('TOKEN_REVOCATION_FALSE_POSITIVE_RATE', default=0.001, cast=float),
+    'poll_interval_seconds': config('TOKEN_REVOCATION_POLL_INTERVAL_SECONDS', default=1.0, cast=float),
+    'rebuild_seconds': config('TOKEN_REVOCATION_REBUILD_SECONDS', default=3600, cast=int),
+}
+
+# Table bills cached per worker; an entry is reused only while its order's version is unchanged
+BILL_SETTINGS = {
+    'max_entries': config('BILL_CACHE_MAX_ENTRIES', default=1000, cast=int),
+    'max_age_seconds': config('BILL_CACHE_MAX_AGE_SECONDS', default=300, cast=int),
+}
+
+# Bulk catalog import: rows per bulk_write, and how many row errors a report lists
+CATALOG_SETTINGS = {
+    'import_batch_size': config('CATALOG_IMPORT_BATCH_SIZE', default=1000, cast=int),
+    'max_reported_errors': 1000,
+}
+
+# Table allocation and reservations
+ALLOCATION_SETTINGS = {
+    'default_duration_minutes': config('RESERVATION_DURATION_MINUTES', default=90, cast=int),
+    'max_join': 3,
+    'join_penalty_seats': 2,
+    'refresh_seconds': 5.0,
+    'table_refresh_seconds': 300,
+}
+
+# Per-client token buckets: `rate` tokens per second refill a bucket of `burst` tokens.
+# Each request costs costs[url_name] tokens, or default_cost.
+RATE_LIMIT_SETTINGS = {
+    'enabled': config('RATE_LIMIT_ENABLED', default=True, cast=bool),
+    # 'mongo' shares buckets across workers, 'local' keeps them per process
+    'backend': config('RATE_LIMIT_BACKEND', default='mongo'),
+    'client_header': 'HTTP_X_API_KEY',
+    'api_keys': config('RATE_LIMIT_API_KEYS', default='', cast=Csv()),
+    'limits': {
+        'anon': {'rate': 5, 'burst': 50},
+        'user': {'rate': 20, 'burst': 200},
+        'client': {'rate': 50, 'burst': 500},
+    },
+    'default_cost': 1,
+    'costs': {
+        'get-menus': 5,
+        'get-foods': 5,
+        'get-tables': 5,
+        'get-orders': 5,
+        'get-order-items': 5,
+        'get-invoices': 5,
+        'get-users': 5,
+        'get-reservations': 5,
+        'search-foods': 2,
+        'get-order-history': 20,
+        'batch-get-menus': 5,
+        'batch-get-foods': 5,
+        'batch-get-tables': 5,
+        'batch-get-orders': 5,
+        'batch-get-order-items': 5,
+        'batch-get-invoices': 5,
+    },
+}
+
+# Database admission control: concurrent MongoDB calls per process, and how long
+# and how many calls may wait for a slot before requests are shed with 503
+ADMISSION_SETTINGS = {
+    'enabled': config('ADMISSION_ENABLED', default=True, cast=bool),
+    'max_in_flight': config('DB_MAX_IN_FLIGHT', default=64, cast=int),
+    'max_waiting': config('DB_MAX_WAITING', default=128, cast=int),
+    'wait_timeout_ms': config('DB_WAIT_TIMEOUT_MS', default=200, cast=int),
+    'retry_after_seconds': 1,
+}
+
+# Worker startup: warm-up before serving and import-time budget
+STARTUP_SETTINGS = {
+    'warmup_on_start': config('WARMUP_ON_START', default=False, cast=bool),
+    'warm_pool_connections': config('WARM_POOL_CONNECTIONS', default=4, cast=int),
+    'import_budget_ms': config('IMPORT_BUDGET_MS', default=1500, cast=int),
 }
 
 
@@ -138,7 +344,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.MongoJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -146,13 +352,25 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'restaurant_management.renderers.ORJSONRenderer',
+        'restaurant_management.renderers.MessagePackRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'restaurant_management.renderers.ORJSONParser',
+        'restaurant_management.renderers.MessagePackParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'restaurant_management.throttling.TokenBucketThrottle',
     ],
 }
 
+# Response compression (brotli preferred, gzip fallback)
+COMPRESSION_SETTINGS = {
+    'min_size': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),
+    'gzip_level': 6,
+    'brotli_quality': 4,
+}
+
 # Simple JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
@@ -171,7 +389,7 @@ SIMPLE_JWT = {
     
     'AUTH_HEADER_TYPES': ('Bearer', 'token'),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
-    'USER_ID_FIELD': 'id',
+    'USER_ID_FIELD': 'user_id',
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
     
@@ -194,7 +412,16 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:8080",
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, 'x-restaurant-id', 'x-api-key')
+CORS_EXPOSE_HEADERS = ['Retry-After', 'ETag']
+
 CORS_ALLOW_ALL_ORIGINS = config('CORS_ALLOW_ALL_ORIGINS', default=True, cast=bool)
 
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
+
+# API users live in MongoDB; the local database only holds admin site accounts
+AUTHENTICATION_BACKENDS = [
+    'authentication.backends.MongoUserBackend',
+    'authentication.backends.AdminModelBackend',
+]
@@ -0,0 +1,43 @@
+"""
+API-only settings: what JWT-authenticated API traffic needs and nothing more.
+
+No admin, sessions, messages, static files or templates, and only the
+middleware API requests use. Run the API workers with
+DJANGO_SETTINGS_MODULE=restaurant_management.settings_api and serve the admin
+from a separate process on the default settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE_TIMING
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'corsheaders',
+    'authentication',
+    'restaurant',
+]
+
+# DRF views are CSRF exempt and authenticate with JWT themselves, so the session,
+# CSRF, auth, messages and clickjacking middleware only add per-request work
+MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'restaurant_management.admission.AdmissionMiddleware',
+    'restaurant_management.middleware.CompressionMiddleware',
+    'restaurant_management.tenancy.TenantMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+if MIDDLEWARE_TIMING:
+    from .middleware_timing import instrument
+    MIDDLEWARE = instrument(MIDDLEWARE)
+
+ROOT_URLCONF = 'restaurant_management.urls_api'
+
+# No admin here, so logins only ever check the users in MongoDB
+AUTHENTICATION_BACKENDS = ['authentication.backends.MongoUserBackend']
+
+TEMPLATES = []
@@ -0,0 +1,126 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+_current_restaurant_id = ContextVar('restaurant_id', default=None)
+_unscoped = ContextVar('tenancy_unscoped', default=False)
+
+re_restaurant_id = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def tenancy_settings():
+    return getattr(settings, 'TENANCY_SETTINGS', {})
+
+
+def is_enabled():
+    return tenancy_settings().get('enabled', False)
+
+
+class RestaurantRequired(Exception):
+    """A restaurant's collection was used with tenancy enabled but no restaurant selected"""
+
+
+def routing():
+    """'shared' keeps every outlet in one (optionally sharded) database, 'database' gives each its own"""
+    return tenancy_settings().get('routing', 'shared')
+
+
+def get_restaurant_id():
+    """Restaurant the current request or job is scoped to, None when tenancy is disabled"""
+    if not is_enabled():
+        return None
+    return _current_restaurant_id.get()
+
+
+@contextmanager
+def use_restaurant(restaurant_id):
+    """Scope every model call inside the block to `restaurant_id`"""
+    token = _current_restaurant_id.set(restaurant_id)
+    try:
+        yield
+    finally:
+        _current_restaurant_id.reset(token)
+
+
+@contextmanager
+def unscoped():
+    """
+    Let code inside the block use tenant collections without a restaurant,
+    across every restaurant at once: index builds and restaurant discovery.
+    """
+    token = _unscoped.set(True)
+    try:
+        yield
+    finally:
+        _unscoped.reset(token)
+
+
+def is_unscoped():
+    return _unscoped.get()
+
+
+def restaurant_ids():
+    """
+    Restaurants to run per-restaurant work for (warm-up, reports, backfills):
+    [None] without tenancy, TENANCY_SETTINGS['restaurant_ids'] when set,
+    otherwise every restaurant that has data in MongoDB.
+    """
+    if not is_enabled():
+        return [None]
+    configured = tenancy_settings().get('restaurant_ids')
+    if configured:
+        return list(configured)
+    # Imported here: the database module imports this one
+    from .database import discover_restaurant_ids
+    return discover_restaurant_ids()
+
+
+class TenantMiddleware:
+    """
+    Read the restaurant ID from the request header, check the caller may act
+    for that restaurant and scope the request to it
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.can_access = import_string(
+            tenancy_settings().get('access_check', 'authentication.backends.can_access_restaurant')
+        )
+
+    def __call__(self, request):
+        if not is_enabled():
+            return self.get_response(request)
+
+        conf = tenancy_settings()
+        if request.path.startswith(tuple(conf.get('global_paths', ()))):
+            return self.get_response(request)
+        restaurant_id = request.META.get(conf.get('header', 'HTTP_X_RESTAURANT_ID')) or conf.get('default_restaurant_id')
+        if restaurant_id is None:
+            if request.path.startswith('/api/'):
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Restaurant ID is required',
+                    'error': 'Missing X-Restaurant-Id header'
+                }, status=400)
+            return self.get_response(request)
+        if not re_restaurant_id.match(restaurant_id):
+            return JsonResponse({
+                'success': False,
+                'message': 'Invalid restaurant ID',
+                'error': 'Restaurant ID may only contain letters, digits, "_" and "-"'
+            }, status=400)
+
+        if request.path.startswith('/api/') and not self.can_access(request, restaurant_id):
+            return JsonResponse({
+                'success': False,
+                'message': 'Access to this restaurant is not allowed',
+                'error': f"Not a member of restaurant {restaurant_id}"
+            }, status=403)
+
+        request.restaurant_id = restaurant_id
+        with use_restaurant(restaurant_id):
+            return self.get_response(request)
@@ -0,0 +1,71 @@
+import os
+from unittest import mock
+
+import mongomock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from mongomock.collection import BulkOperationBuilder
+
+from .database import MongoDBConnection, mongodb
+
+
+def _run_without_transaction(self, callback, fallback=False):
+    # mongomock has no sessions
+    return callback(None)
+
+
+def _without_sort(add):
+    # pymongo passes sort to bulk updates and replaces; mongomock predates it
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+def _start_without_thread(self):
+    # Tests call sync() themselves instead of polling in the background
+    self.pid = os.getpid()
+
+
+@override_settings(
+    RATE_LIMIT_SETTINGS={**settings.RATE_LIMIT_SETTINGS, 'enabled': False, 'backend': 'local'},
+    JOB_SETTINGS={**settings.JOB_SETTINGS, 'eager': False},
+)
+class MongoTestCase(TestCase):
+    """
+    TestCase with MongoDB replaced by an empty in-memory mongomock database
+    for every test, and the per-worker caches and indexes emptied.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Imported here: these modules register models and warm-up hooks on import
+        from authentication import revocation, users
+        from restaurant import allocation, bills, catalog_store, kitchen, search
+        from restaurant_management import read_cache, throttling
+
+        patches = [
+            mock.patch('restaurant_management.database.MongoClient', mongomock.MongoClient),
+            mock.patch.object(MongoDBConnection, 'run_transaction', _run_without_transaction),
+            mock.patch.object(mongodb, 'transactions_supported', None),
+            mock.patch.object(revocation.RevocationList, 'start', _start_without_thread),
+            mock.patch.object(revocation, '_revocations', None),
+            mock.patch.object(read_cache, '_cache', None),
+            mock.patch.object(bills, '_cache', None),
+            mock.patch.object(catalog_store, '_snapshot_error', None),
+        ]
+        patches += [
+            mock.patch.object(BulkOperationBuilder, name, _without_sort(getattr(BulkOperationBuilder, name)))
+            for name in ('add_update', 'add_replace', 'add_delete')
+        ]
+        patches += [
+            mock.patch.dict(registry, clear=True)
+            for registry in (
+                users._legacy_user_ids, throttling._stores, catalog_store._stores, catalog_store._generations,
+                search._indexes, search._generations, kitchen._schedulers, allocation._allocators,
+            )
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        mongodb.reset()
+        self.addCleanup(mongodb.reset)
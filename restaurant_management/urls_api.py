@@ -0,0 +1,13 @@
+"""
+URL configuration for API-only workers (settings_api): the API routes
+without the admin, which runs in a separate process on the default settings.
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    # Authentication API endpoints
+    path('api/auth/', include('authentication.urls')),
+    
+    # Restaurant management API endpoints
+    path('api/', include('restaurant.urls')),
+]
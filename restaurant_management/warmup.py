@@ -0,0 +1,70 @@
+import logging
+import time
+
+from django.conf import settings
+from django.urls import get_resolver
+
+from . import tenancy
+from .database import mongodb
+
+logger = logging.getLogger(__name__)
+
+_hooks = []
+
+
+def register(func):
+    """Register a callable to run once when a worker warms up"""
+    _hooks.append((func, False))
+    return func
+
+
+def register_per_restaurant(func):
+    """Register a callable to run for each restaurant, scoped to it, when a worker warms up"""
+    _hooks.append((func, True))
+    return func
+
+
+def _run_hook(hook, restaurant_id=None):
+    try:
+        hook()
+    except Exception as e:
+        label = f" for {restaurant_id}" if restaurant_id else ''
+        logger.error(f"Warm-up hook {hook.__name__} failed{label}: {e}")
+
+
+def run():
+    """
+    Warm up the current process before it takes traffic: load the URLconf
+    (which imports every view and service), pre-open pooled Mongo connections
+    and run the registered cache-priming hooks. Returns per-step timings in ms.
+    """
+    timings = {}
+    startup_settings = getattr(settings, 'STARTUP_SETTINGS', {})
+
+    start = time.perf_counter()
+    get_resolver().url_patterns
+    timings['urlconf'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    mongodb.warm_pool(startup_settings.get('warm_pool_connections', 4))
+    timings['mongo_pool'] = (time.perf_counter() - start) * 1000
+
+    restaurant_ids = None
+    for hook, per_restaurant in _hooks:
+        start = time.perf_counter()
+        if per_restaurant:
+            if restaurant_ids is None:
+                try:
+                    restaurant_ids = tenancy.restaurant_ids()
+                except Exception as e:
+                    logger.error(f"Could not list restaurants to warm up: {e}")
+                    restaurant_ids = []
+            for restaurant_id in restaurant_ids:
+                with tenancy.use_restaurant(restaurant_id):
+                    _run_hook(hook, restaurant_id)
+        else:
+            _run_hook(hook)
+        timings[hook.__name__] = (time.perf_counter() - start) * 1000
+
+    logger.info(f"Warm-up finished in {sum(timings.values()):.1f} ms")
+    return timings
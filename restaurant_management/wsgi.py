@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant_management.settings')
 
 application = get_wsgi_application()
+
+# Warm up each worker before it accepts its first request
+if settings.STARTUP_SETTINGS.get('warmup_on_start'):
+    from restaurant_management import warmup
+    warmup.run()